@@ -1,14 +1,71 @@
 # FLUXO E A LÓGICA:
 # 1. O arquivo principal inicializa o FastAPI.
 # 2. As configurações de segurança (Lifespan para Redis/Rate Limit e CORS) foram importadas, mas estão DESATIVADAS no main.py.
+#    O lifespan ativo pré-monta o cache de SQL no startup e encerra os pools de conexão do banco no desligamento.
 # 3. Ele atua como um 'coletor' de rotas, incluindo todos os módulos CRUD (`route_*.py`) sob o prefixo `/api`, 
 #    direcionando o tráfego e garantindo a modularidade da aplicação.
+# 4. Um middleware mede a latência de cada requisição por rota (template, não a URL concreta) e status;
+#    `/metrics` (fora do `/api`) expõe essas medidas no formato do Prometheus.
+# 5. Com `RETENTION_ENABLED=true`, uma thread aplica as políticas de retenção periodicamente (`model/retention.py`).
+# 6. A coleta MQTT (motor async, no mesmo event loop das rotas) começa e termina com a aplicação (`MQTT_AUTOSTART`).
+# 7. `/api/live/ws` e `/api/live/sse` entregam as mensagens MQTT em tempo real (fan-out em memória, sem MySQL).
+# 8. O logging é configurado aqui, uma única vez (fila não bloqueante + JSON), logo após os imports e antes do startup.
 
-from fastapi import FastAPI # Importa o framework principal. Razão: Base da API.
-from routes import route_get, route_post, route_update, route_delete # Importa as rotas CRUD. Razão: Modularidade do código.
+import time
+from contextlib import asynccontextmanager # Gerenciador do ciclo de vida da aplicação.
+from fastapi import FastAPI, Request # Importa o framework principal. Razão: Base da API.
+from routes import route_get, route_post, route_update, route_delete, route_export, route_rollups, route_live # Importa as rotas CRUD. Razão: Modularidade do código.
+from routes.extra import route_metrics, route_retention, route_indexes, route_mqtt # Métricas, retenção, índices e controle MQTT.
+from utils.metrics import METRICS_ENABLED, HTTP_REQUEST_SECONDS # Latência por rota.
+from utils.logging_config import setup_logging, shutdown_logging # Logging estruturado e assíncrono.
+from utils.function_execute import db, async_db # Pools de conexão (síncrono e assíncrono).
+from model.statement_cache import statements # Cache de SQL pré-montado.
+from model.model_resolver import TABLE_MODEL_MAPPING # Tabelas/modelos conhecidos.
+from model.table_registry import table_registry # Metadados das tabelas (INFORMATION_SCHEMA + modelos).
+from model.retention import start_retention, stop_retention # Limpeza periódica de dados antigos.
+from model.index_advisor import check_indexes # Índices das colunas filtráveis.
+from model.dedup import check_dedup_schema # Coluna/índice UNIQUE da deduplicação MQTT.
+from model.get_data_camila import MQTT_AUTOSTART, MQTT_BROKER, start_collector, stop_collector # Coleta MQTT.
+from model.live_hub import live_hub # Assinantes WebSocket/SSE.
+
+# Logging configurado logo após os imports, antes do app e de qualquer requisição.
+setup_logging()
+
+# Ciclo de vida: o registro de tabelas é lido do schema, o cache de SQL é montado, a retenção agendada, os índices dos filtros conferidos e a coleta MQTT iniciada no startup; os pools são criados sob demanda e fechados no desligamento.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await table_registry.refresh() # Sem banco no startup, segue com as PKs presumidas.
+    statements.precompile(TABLE_MODEL_MAPPING, table_registry.primary_keys())
+    start_retention()
+    await check_indexes()
+    check_dedup_schema()
+    if MQTT_AUTOSTART and MQTT_BROKER:
+        await start_collector() # Reconecta sozinho: um broker fora do ar não impede a API de subir.
+    yield
+    live_hub.close() # Encerra as conexões em tempo real (o servidor não espera streams infinitos).
+    await stop_collector() # Drena a fila de ingestão antes de fechar os pools.
+    stop_retention()
+    await async_db.close()
+    db.close()
+    shutdown_logging() # Esvazia a fila de logs antes de sair.
 
 # 1. Inicialização do FastAPI:
-app = FastAPI()                               
+app = FastAPI(lifespan=lifespan)
+
+# Latência HTTP: o rótulo usa o template da rota (`/api/get/{table_name}`) para não criar uma série por URL.
+if METRICS_ENABLED:
+    @app.middleware("http")
+    async def observe_request_latency(request: Request, call_next):
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            template = getattr(route, "path", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, request.method, template, str(status))
 
 # 2. Inclusão de Rotas Modulares
 # As rotas são incluídas aqui. O tráfego para `/api/*` será direcionado aos módulos importados.
@@ -16,4 +73,10 @@ app.include_router(route_get.router, prefix="/api")
 app.include_router(route_post.router, prefix="/api")           
 app.include_router(route_update.router, prefix="/api")         
 app.include_router(route_delete.router, prefix="/api")  
-       
+app.include_router(route_export.router, prefix="/api")
+app.include_router(route_rollups.router, prefix="/api")
+app.include_router(route_live.router, prefix="/api")
+app.include_router(route_retention.router, prefix="/api")
+app.include_router(route_indexes.router, prefix="/api")
+app.include_router(route_mqtt.router, prefix="/api")
+app.include_router(route_metrics.router)
@@ -0,0 +1,252 @@
+# benchmarks/fake_db.py
+
+# FLUXO E A LÓGICA:
+# 1. `FakeStore` guarda as tabelas em memória (linhas por ID + lista ordenada de IDs para o keyset).
+# 2. `_parse()` reconhece apenas os formatos de SQL que a aplicação gera (INSERT/SELECT paginado/UPDATE/DELETE por ID ou IN).
+# 3. `FakeDatabase` e `FakeAsyncDatabase` imitam a API pública de `model.db.Database` e `model.async_db.AsyncDatabase`,
+#    então podem substituir `utils.function_execute.db` / `async_db` sem tocar nas rotas nem na ingestão.
+# 4. `SinkStore` (soak) conta os INSERTs e os entrega a um callback sem guardar as linhas: a memória do teste longo
+#    mede o coletor, não o banco falso.
+# RAZÃO DE EXISTIR: Medir o custo do código Python (rotas, validação, fila de ingestão) sem depender de um MySQL.
+
+import bisect
+import re
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_NAME = r"`?(\w+)`?"
+_INSERT = re.compile(rf"^\s*INSERT\s+INTO\s+{_NAME}\s*\(([^)]*)\)\s*VALUES", re.I)
+_SELECT = re.compile(
+    rf"^\s*SELECT\s+(.+?)\s+FROM\s+{_NAME}"
+    rf"(?:\s+WHERE\s+{_NAME}\s*(>|<|IN)\s*(\([^)]*\)|%s))?"
+    rf"(?:\s+ORDER\s+BY\s+{_NAME}\s*(ASC|DESC)?)?(?:\s+LIMIT\s+%s)?(?:\s+FOR\s+UPDATE)?\s*$",
+    re.I | re.S,
+)
+_UPDATE = re.compile(rf"^\s*UPDATE\s+{_NAME}\s+SET\s+(.+?)\s+WHERE\s+{_NAME}\s*=\s*%s\s*$", re.I | re.S)
+_DELETE = re.compile(rf"^\s*DELETE\s+FROM\s+{_NAME}\s+WHERE\s+{_NAME}\s*(=|IN)\s*(\([^)]*\)|%s)\s*$", re.I)
+
+
+def _columns(text: str) -> List[str]:
+    return [column.strip().strip("`") for column in text.split(",")]
+
+
+@lru_cache(maxsize=256)
+def _parse(sql: str) -> Tuple[str, Any]:
+    """Converte o SQL em (tipo, detalhes). Cacheado por texto, como um driver com prepared statements."""
+    match = _INSERT.match(sql)
+    if match:
+        return "insert", (match.group(1), _columns(match.group(2)))
+    match = _SELECT.match(sql)
+    if match:
+        projection, table, where_col, op, _, order_col, direction = match.groups()
+        columns = None if projection.strip() == "*" else _columns(projection)
+        return "select", (table, columns, where_col, (op or "").upper(), (direction or "ASC").upper(), "LIMIT" in sql.upper())
+    match = _UPDATE.match(sql)
+    if match:
+        table, set_clause, pk = match.groups()
+        return "update", (table, [part.split("=")[0].strip().strip("`") for part in set_clause.split(",")], pk)
+    match = _DELETE.match(sql)
+    if match:
+        return "delete", (match.group(1), match.group(2), match.group(3).upper())
+    raise ValueError(f"SQL não suportado pelo FakeDatabase: {sql}")
+
+
+class FakeStore:
+    """Tabelas em memória. O ID é `{tabela}_id`, autoincremento."""
+
+    def __init__(self) -> None:
+        self.rows: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self.ids: Dict[str, List[int]] = {}
+        self.next_id: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.rows.clear()
+            self.ids.clear()
+            self.next_id.clear()
+
+    def count(self, table: str) -> int:
+        return len(self.ids.get(table, ()))
+
+    def _table(self, table: str):
+        return self.rows.setdefault(table, {}), self.ids.setdefault(table, [])
+
+    def run(self, sql: str, params: Optional[Tuple[Any, ...]]) -> Tuple[Any, int, int]:
+        """Executa um comando. Retorna (linhas, lastrowid, rowcount)."""
+        kind, details = _parse(sql)
+        params = tuple(params or ())
+        with self.lock:
+            if kind == "insert":
+                table, columns = details
+                rows, ids = self._table(table)
+                new_id = self.next_id.get(table, 0) + 1
+                self.next_id[table] = new_id
+                row = dict(zip(columns, params))
+                row[f"{table}_id"] = new_id
+                rows[new_id] = row
+                ids.append(new_id)
+                return None, new_id, 1
+
+            if kind == "select":
+                table, columns, where_col, op, direction, has_limit = details
+                rows, ids = self._table(table)
+                position = 0
+                if op == "IN":
+                    selected = [rows[i] for i in params if i in rows]
+                else:
+                    ordered = ids if direction == "ASC" else ids[::-1]
+                    if op in (">", "<"):
+                        after = params[position]
+                        position += 1
+                        if direction == "ASC":
+                            ordered = ids[bisect.bisect_right(ids, after):]
+                        else:
+                            ordered = ids[:bisect.bisect_left(ids, after)][::-1]
+                    if has_limit:
+                        ordered = ordered[:params[position]]
+                    selected = [rows[i] for i in ordered]
+                if columns is not None:
+                    selected = [{column: row.get(column) for column in columns} for row in selected]
+                else:
+                    selected = [dict(row) for row in selected]
+                return selected, 0, len(selected)
+
+            if kind == "update":
+                table, columns, pk = details
+                rows, _ = self._table(table)
+                row = rows.get(params[-1])
+                if row is None:
+                    return None, 0, 0
+                changed = any(row.get(column) != value for column, value in zip(columns, params[:-1]))
+                row.update(zip(columns, params[:-1]))
+                return None, 0, int(changed)
+
+            table, _, op = details
+            rows, ids = self._table(table)
+            affected = 0
+            for item_id in params:
+                if rows.pop(item_id, None) is not None:
+                    ids.pop(bisect.bisect_left(ids, item_id))
+                    affected += 1
+            return None, 0, affected
+
+
+class SinkStore(FakeStore):
+    """FakeStore que descarta as linhas inseridas: `on_insert(tabela, colunas, valores)` e um contador por tabela."""
+
+    def __init__(self, on_insert: Optional[Callable[[str, List[str], Tuple[Any, ...]], None]] = None) -> None:
+        super().__init__()
+        self.on_insert = on_insert
+        self.inserted: Dict[str, int] = {}
+
+    def run(self, sql: str, params: Optional[Tuple[Any, ...]]) -> Tuple[Any, int, int]:
+        kind, details = _parse(sql)
+        if kind != "insert":
+            return super().run(sql, params)
+        table, columns = details
+        with self.lock:
+            count = self.inserted.get(table, 0) + 1
+            self.inserted[table] = count
+        if self.on_insert is not None:
+            self.on_insert(table, columns, tuple(params or ()))
+        return None, count, 1
+
+
+class FakeCursor:
+    """Cursor mínimo (sync e async) para `transaction_async()`."""
+
+    def __init__(self, store: FakeStore) -> None:
+        self.store = store
+        self.rowcount = 0
+        self.lastrowid = 0
+        self._result: List[Any] = []
+
+    def _execute(self, sql: str, params=None) -> None:
+        rows, self.lastrowid, self.rowcount = self.store.run(sql, params)
+        # Cursores padrão (não-dict) devolvem tuplas.
+        self._result = [tuple(row.values()) for row in rows] if rows is not None else []
+
+    def _executemany(self, sql: str, params_seq) -> None:
+        total = 0
+        for params in params_seq:
+            self._execute(sql, params)
+            total += self.rowcount
+        self.rowcount = total
+
+    async def execute(self, sql: str, params=None) -> None:
+        self._execute(sql, params)
+
+    async def executemany(self, sql: str, params_seq) -> None:
+        self._executemany(sql, params_seq)
+
+    async def fetchall(self) -> List[Any]:
+        return self._result
+
+
+class FakeDatabase:
+    """Substituto em memória de `model.db.Database` (caminho síncrono do MQTT)."""
+
+    def __init__(self, store: FakeStore) -> None:
+        self.store = store
+
+    @contextmanager
+    def borrow(self):
+        yield self.store
+
+    def execute_comand(self, sql: str, params=None, connection=None, kind: Optional[str] = None):
+        rows, lastrowid, rowcount = self.store.run(sql, params)
+        if rows is not None:
+            return rows
+        return lastrowid if _parse(sql)[0] == "insert" else rowcount
+
+    def execute_prepared(self, statement, params, connection=None):
+        return self.execute_comand(statement.sql, params, kind=statement.kind)
+
+    def execute_many(self, sql: str, params_seq, connection=None) -> int:
+        cursor = FakeCursor(self.store)
+        cursor._executemany(sql, params_seq)
+        return cursor.rowcount
+
+    def execute_batches(self, batches, connection=None) -> int:
+        return sum(self.execute_many(sql, params_seq) for sql, params_seq in batches)
+
+    def pool_stats(self):
+        return None
+
+    def close(self) -> None:
+        pass
+
+
+class FakeAsyncDatabase:
+    """Substituto em memória de `model.async_db.AsyncDatabase` (rotas HTTP)."""
+
+    def __init__(self, store: FakeStore) -> None:
+        self.sync = FakeDatabase(store)
+        self.store = store
+
+    async def execute_comand(self, sql: str, params=None, connection=None, kind: Optional[str] = None):
+        return self.sync.execute_comand(sql, params, kind=kind)
+
+    async def execute_many(self, sql: str, params_seq, connection=None) -> int:
+        return self.sync.execute_many(sql, params_seq)
+
+    async def execute_batches(self, batches) -> int:
+        return self.sync.execute_batches(batches)
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield FakeCursor(self.store)
+
+    async def stream(self, sql: str, params=None, chunk_size: int = 1000):
+        rows = self.sync.execute_comand(sql, params) or []
+        for start in range(0, len(rows), chunk_size):
+            yield rows[start:start + chunk_size]
+
+    def pool_stats(self):
+        return None
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,311 @@
+# benchmarks/local_broker.py
+
+# FLUXO E A LÓGICA:
+# 1. `LocalBroker` é um broker MQTT 3.1.1 mínimo, em processo (thread + event loop próprios), sobre TCP local sem TLS:
+#    CONNECT, SUBSCRIBE/UNSUBSCRIBE (curingas `+`/`#`), PUBLISH QoS 0/1, PINGREQ e DISCONNECT. É o bastante para o
+#    paho (motor thread) e o aiomqtt (motor async) do coletor se conectarem como a um broker real.
+# 2. Cada sessão tem uma fila de saída LIMITADA (`max_queued`), como o `max_queued_messages` dos brokers: se o
+#    coletor não acompanha, as mensagens excedentes são descartadas e contadas (`dropped`).
+# 3. QoS 1 é entregue com packet id, mas sem reenvio (o PUBACK do assinante é ignorado). Sem retain, will ou sessão
+#    persistente.
+# 4. `LoadGenerator` publica direto no broker (sem um cliente TCP a mais) seguindo um perfil: taxa base, rajadas
+#    periódicas, número de tópicos e distribuição do tamanho do payload. Cada payload leva `seq` e `sent_at`, usados
+#    para medir o atraso ponta a ponta quando a linha chega ao banco.
+# RAZÃO DE EXISTIR: Exercitar o coletor de ponta a ponta sem o broker TLS real do `.env`.
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from model.topic_router import topic_matches, validate_filter
+
+logger = logging.getLogger(__name__)
+
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+
+def _encode_length(length: int) -> bytes:
+    encoded = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        encoded.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(encoded)
+
+
+def _packet(first_byte: int, body: bytes) -> bytes:
+    return bytes((first_byte,)) + _encode_length(len(body)) + body
+
+
+def _string(value: bytes) -> bytes:
+    return len(value).to_bytes(2, "big") + value
+
+
+def _read_string(body: bytes, offset: int) -> Tuple[str, int]:
+    length = int.from_bytes(body[offset:offset + 2], "big")
+    return body[offset + 2:offset + 2 + length].decode("utf-8"), offset + 2 + length
+
+
+async def _read_packet(reader: asyncio.StreamReader) -> Tuple[int, int, bytes]:
+    """(tipo, flags, corpo) do próximo pacote."""
+    first = (await reader.readexactly(1))[0]
+    length, multiplier = 0, 1
+    while True:
+        byte = (await reader.readexactly(1))[0]
+        length += (byte & 0x7F) * multiplier
+        if not byte & 0x80:
+            break
+        multiplier *= 128
+    return first >> 4, first & 0x0F, await reader.readexactly(length) if length else b""
+
+
+class _Session:
+    """Conexão de um cliente: assinaturas, fila de saída limitada e a tarefa que escreve no socket."""
+
+    def __init__(self, writer: asyncio.StreamWriter, max_queued: int) -> None:
+        self.writer = writer
+        self.client_id = ""
+        self.subscriptions: Dict[str, Tuple[List[str], int]] = {} # Filtro -> (níveis, QoS concedido).
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self._packet_id = 0
+
+    def qos_for(self, topic: str) -> Optional[int]:
+        """Maior QoS entre as assinaturas que casam com o tópico (None: nenhuma)."""
+        granted = None
+        for levels, qos in self.subscriptions.values():
+            if topic_matches(levels, topic) and (granted is None or qos > granted):
+                granted = qos
+        return granted
+
+    def next_packet_id(self) -> int:
+        self._packet_id = self._packet_id % 65535 + 1
+        return self._packet_id
+
+    async def write_loop(self) -> None:
+        while True:
+            chunk = [await self.queue.get()]
+            while not self.queue.empty() and len(chunk) < 256:
+                chunk.append(self.queue.get_nowait())
+            self.writer.write(b"".join(chunk))
+            await self.writer.drain() # Backpressure do TCP: a fila enche se o cliente não lê.
+
+
+class LocalBroker:
+    """Broker MQTT 3.1.1 em processo para testes de carga (127.0.0.1, porta livre por padrão)."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, max_queued: int = 100000) -> None:
+        self.host = host
+        self.port = port
+        self.max_queued = max_queued
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._sessions: List[_Session] = []
+        # Contadores expostos em `stats()`.
+        self.connections = 0
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    # --- Ciclo de vida ---
+
+    def start(self) -> int:
+        """Sobe o broker em uma thread própria e retorna a porta."""
+        ready = threading.Event()
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="local-broker", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self.port
+
+    def _run(self, ready: threading.Event) -> None:
+        asyncio.set_event_loop(self.loop)
+        self._server = self.loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        ready.set()
+        self.loop.run_forever()
+
+    def stop(self) -> None:
+        if self.loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout=10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=10)
+        self.loop.close()
+        self.loop = None
+
+    async def _shutdown(self) -> None:
+        self._server.close()
+        for session in list(self._sessions):
+            session.writer.close()
+        await self._server.wait_closed()
+
+    # --- Roteamento ---
+
+    def publish(self, topic: str, payload: bytes) -> None:
+        """Entrega às sessões assinantes. Chamado na thread do broker (ex.: pelo LoadGenerator)."""
+        self.published += 1
+        qos0_packet = None
+        for session in self._sessions:
+            qos = session.qos_for(topic)
+            if qos is None:
+                continue
+            if qos == 0:
+                # O mesmo pacote QoS 0 serve para todas as sessões.
+                qos0_packet = qos0_packet or _packet(PUBLISH << 4, _string(topic.encode("utf-8")) + payload)
+                packet = qos0_packet
+            else:
+                packet = _packet(PUBLISH << 4 | 0x02, _string(topic.encode("utf-8"))
+                                 + session.next_packet_id().to_bytes(2, "big") + payload)
+            try:
+                session.queue.put_nowait(packet)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    # --- Protocolo ---
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session = _Session(writer, self.max_queued)
+        writer_task = asyncio.create_task(session.write_loop())
+        try:
+            packet_type, _, body = await _read_packet(reader)
+            if packet_type != CONNECT:
+                return
+            protocol, offset = _read_string(body, 0)
+            level = body[offset]
+            session.client_id, _ = _read_string(body, offset + 4)
+            if protocol != "MQTT" or level != 4:
+                writer.write(_packet(CONNACK << 4, b"\x00\x01")) # Versão de protocolo não suportada.
+                await writer.drain()
+                return
+            writer.write(_packet(CONNACK << 4, b"\x00\x00"))
+            self._sessions.append(session)
+            self.connections += 1
+            logger.info(f"Broker local: cliente '{session.client_id}' conectado.")
+
+            while True:
+                packet_type, flags, body = await _read_packet(reader)
+                if packet_type == PUBLISH:
+                    topic, offset = _read_string(body, 0)
+                    qos = (flags >> 1) & 0x03
+                    if qos:
+                        packet_id = body[offset:offset + 2]
+                        offset += 2
+                        await session.queue.put(_packet(PUBACK << 4, packet_id))
+                    self.publish(topic, body[offset:])
+                elif packet_type == SUBSCRIBE:
+                    packet_id, offset, granted = body[:2], 2, bytearray()
+                    while offset < len(body):
+                        topic_filter, offset = _read_string(body, offset)
+                        qos = min(body[offset], 1) # QoS 2 é concedido como 1.
+                        offset += 1
+                        try:
+                            session.subscriptions[topic_filter] = (validate_filter(topic_filter), qos)
+                            granted.append(qos)
+                        except ValueError:
+                            granted.append(0x80)
+                    await session.queue.put(_packet(SUBACK << 4, packet_id + bytes(granted)))
+                elif packet_type == UNSUBSCRIBE:
+                    offset = 2
+                    while offset < len(body):
+                        topic_filter, offset = _read_string(body, offset)
+                        session.subscriptions.pop(topic_filter, None)
+                    await session.queue.put(_packet(UNSUBACK << 4, body[:2]))
+                elif packet_type == PINGREQ:
+                    await session.queue.put(_packet(PINGRESP << 4, b""))
+                elif packet_type == DISCONNECT:
+                    return
+                # PUBACK dos assinantes: sem reenvio, nada a fazer.
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if session in self._sessions:
+                self._sessions.remove(session)
+            writer_task.cancel()
+            writer.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "connections": self.connections,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "queued": sum(session.queue.qsize() for session in self._sessions),
+        }
+
+
+class LoadProfile(NamedTuple):
+    """Perfil de carga do LoadGenerator."""
+    rate: float = 1000.0 # Mensagens/s fora das rajadas.
+    topics: int = 16 # Tópicos distintos (`<prefixo>/<n>`).
+    payload_min: int = 64 # Bytes.
+    payload_max: int = 64
+    payload_dist: str = "fixed" # fixed | uniform | lognormal (mediana em payload_min, limitada a payload_max)
+    burst_every: float = 0.0 # Segundos entre o início de duas rajadas (0 = sem rajadas).
+    burst_seconds: float = 0.0
+    burst_multiplier: float = 1.0
+
+
+class LoadGenerator:
+    """Publicador sintético: segue o perfil de taxa e tamanho; roda no event loop do broker."""
+
+    def __init__(self, broker: LocalBroker, profile: LoadProfile, topic_prefix: str = "bench/sensor", seed: int = 42) -> None:
+        if profile.payload_dist not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"payload_dist inválido: '{profile.payload_dist}'. Use fixed, uniform ou lognormal.")
+        self.broker = broker
+        self.profile = profile
+        self.topics = [f"{topic_prefix}/{index}" for index in range(max(profile.topics, 1))]
+        self._random = random.Random(seed)
+        self.published = 0
+        self.bytes = 0
+        self._task: Optional[asyncio.Future] = None
+
+    def rate_at(self, elapsed: float) -> float:
+        profile = self.profile
+        if profile.burst_every > 0 and elapsed % profile.burst_every < profile.burst_seconds:
+            return profile.rate * profile.burst_multiplier
+        return profile.rate
+
+    def _payload_size(self) -> int:
+        profile = self.profile
+        if profile.payload_dist == "uniform":
+            return self._random.randint(profile.payload_min, max(profile.payload_min, profile.payload_max))
+        if profile.payload_dist == "lognormal":
+            return min(int(self._random.lognormvariate(0, 1) * profile.payload_min), profile.payload_max)
+        return profile.payload_min
+
+    def _payload(self, seq: int) -> bytes:
+        head = f'{{"seq":{seq},"sent_at":{time.time():.6f},"valor":{self._random.uniform(0, 100):.3f},"pad":"'
+        pad = max(self._payload_size() - len(head) - 2, 0)
+        return f'{head}{"x" * pad}"}}'.encode("utf-8")
+
+    async def _run(self, duration: float, tick: float) -> None:
+        started = time.monotonic()
+        due = 0.0
+        last = started
+        while True:
+            now = time.monotonic()
+            elapsed = now - started
+            if elapsed >= duration:
+                return
+            # Taxa integrada no tempo: atrasos do loop viram um lote maior no próximo tick, sem perder mensagens.
+            due += self.rate_at(elapsed) * (now - last)
+            last = now
+            while self.published < int(due):
+                payload = self._payload(self.published)
+                self.broker.publish(self.topics[self.published % len(self.topics)], payload)
+                self.published += 1
+                self.bytes += len(payload)
+            await asyncio.sleep(tick)
+
+    def start(self, duration: float, tick: float = 0.005) -> "asyncio.Future":
+        """Inicia a publicação (de qualquer thread). Retorna um future concluído ao fim de `duration`."""
+        self._task = asyncio.run_coroutine_threadsafe(self._run(duration, tick), self.broker.loop)
+        return self._task
@@ -0,0 +1,274 @@
+# benchmarks/run_benchmarks.py
+
+# FLUXO E A LÓGICA:
+# 1. Escolhe o backend de dados: `fake` (FakeDatabase em memória, padrão) ou `mysql` (pools reais configurados no .env,
+#    ex.: um MySQL/MariaDB local descartável).
+# 2. Cenários HTTP rodam a aplicação FastAPI em processo via `httpx.ASGITransport` (sem rede, sem uvicorn).
+# 3. Cenários MQTT chamam `on_message` -> fila de ingestão -> `save_batch_to_db` com payloads sintéticos.
+# 4. Cada cenário mede ops/s e latências p50/p95/p99; uma segunda passada com `tracemalloc` mede alocações por operação.
+# 5. O resultado é impresso (ou gravado com --output) em JSON, para comparar regressões entre commits.
+#
+# Uso (a partir da raiz do repositório):
+#   python -m benchmarks.run_benchmarks --iterations 2000 --output bench.json
+#   python -m benchmarks.run_benchmarks --backend mysql --only http_get_page,mqtt_save_batch
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, List
+
+import httpx
+
+from benchmarks.fake_db import FakeAsyncDatabase, FakeDatabase, FakeStore
+
+TABLE = "pedidos"
+TOPICS = [f"bancada/camila/sensor/{name}" for name in ("temperatura", "umidade", "pressao", "vibracao")]
+
+
+# --- Medição ---
+
+def _percentiles(samples_ns: List[int]) -> Dict[str, float]:
+    ordered = sorted(samples_ns)
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] / 1e6, 4)
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": round(ordered[-1] / 1e6, 4)}
+
+
+def _allocation_stats(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, ops: int) -> Dict[str, float]:
+    """Blocos/bytes alocados e ainda vivos ao fim da passada (alocações líquidas), divididos pelo número de operações."""
+    diff = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in diff if stat.count_diff > 0)
+    size = sum(stat.size_diff for stat in diff if stat.size_diff > 0)
+    return {"alloc_blocks_per_op": round(blocks / ops, 3), "alloc_bytes_per_op": round(size / ops, 1)}
+
+
+async def run_scenario(name: str, op: Callable[[int], Awaitable[Any]], iterations: int, warmup: int,
+                       alloc_iterations: int, units_per_op: int = 1) -> Dict[str, Any]:
+    """Aquecimento -> passada cronometrada -> passada com tracemalloc."""
+    for i in range(warmup):
+        await op(i)
+
+    latencies: List[int] = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter_ns()
+        await op(warmup + i)
+        latencies.append(time.perf_counter_ns() - t0)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for i in range(alloc_iterations):
+        await op(warmup + iterations + i)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    result = {
+        "scenario": name,
+        "iterations": iterations,
+        "ops_per_s": round(iterations / elapsed, 1),
+        **_percentiles(latencies),
+        **_allocation_stats(before, after, max(alloc_iterations, 1)),
+    }
+    if units_per_op > 1:
+        result["units_per_op"] = units_per_op
+        result["units_per_s"] = round(iterations * units_per_op / elapsed, 1)
+    return result
+
+
+# --- Payloads sintéticos ---
+
+def _sensor_payload(i: int) -> Dict[str, Any]:
+    return {"sensor_id": i % 32, "valor": round(random.uniform(0, 100), 3), "ts": time.time()}
+
+
+def _pedido(i: int) -> Dict[str, Any]:
+    return {"tipo_do_pedido": TOPICS[i % len(TOPICS)], "valor_do_pedido": json.dumps(_sensor_payload(i))}
+
+
+# --- Backends ---
+
+def install_backend(backend: str) -> FakeStore:
+    """Com `fake`, troca os objetos globais de acesso a dados por versões em memória."""
+    from utils import function_execute
+    store = FakeStore()
+    if backend == "fake":
+        function_execute.db = FakeDatabase(store)
+        function_execute.async_db = FakeAsyncDatabase(store)
+    return store
+
+
+def seed(rows: int) -> None:
+    """Popula a tabela para os cenários de leitura/atualização."""
+    from utils.function_execute import execute_many
+    from model.statement_cache import statements
+    statement = statements.insert(TABLE, ("tipo_do_pedido", "valor_do_pedido"))
+    batch = [tuple(_pedido(i).values()) for i in range(rows)]
+    for start in range(0, len(batch), 1000):
+        execute_many(statement.sql, batch[start:start + 1000])
+
+
+# --- Cenários ---
+
+async def http_scenarios(args, store: FakeStore) -> List[Dict[str, Any]]:
+    from app.main import app
+    from model.model_resolver import TABLE_MODEL_MAPPING
+    from model.statement_cache import statements
+    from utils.query_cache import query_cache, NullBackend
+
+    statements.precompile(TABLE_MODEL_MAPPING) # O ASGITransport não executa o lifespan.
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def get_page(i: int):
+            response = await client.get(f"/api/get/{TABLE}", params={"limit": 100})
+            response.raise_for_status()
+
+        async def insert(i: int):
+            response = await client.post(f"/api/insert/{TABLE}", json=_pedido(i))
+            response.raise_for_status()
+
+        async def bulk_insert(i: int):
+            body = [_pedido(i * 100 + j) for j in range(100)]
+            response = await client.post(f"/api/insert/{TABLE}/bulk", json=body)
+            response.raise_for_status()
+
+        async def update(i: int):
+            item_id = 1 + i % max(args.seed_rows, 1)
+            response = await client.put(f"/api/update/{TABLE}/{item_id}", json=_pedido(i))
+            if response.status_code not in (200, 404):
+                response.raise_for_status()
+
+        scenarios = {
+            "http_get_page": (get_page, 1),
+            "http_insert": (insert, 1),
+            "http_bulk_insert": (bulk_insert, 100),
+            "http_update": (update, 1),
+        }
+        for name, (op, units) in scenarios.items():
+            if not _selected(args, name):
+                continue
+            results.append(await run_scenario(name, op, args.iterations, args.warmup, args.alloc_iterations, units))
+
+        if _selected(args, "http_get_page_nocache"):
+            # Mesma leitura sem cache: mede o caminho completo até o DB.
+            backend = query_cache.backend
+            query_cache.set_backend(NullBackend())
+            try:
+                results.append(await run_scenario("http_get_page_nocache", get_page, args.iterations, args.warmup, args.alloc_iterations))
+            finally:
+                query_cache.set_backend(backend)
+    return results
+
+
+async def mqtt_scenarios(args, store: FakeStore) -> List[Dict[str, Any]]:
+    from model import get_data_camila
+    from model.get_data_camila import on_message, save_batch_to_db
+    from model.ingest_pipeline import IngestPipeline, IngestRecord
+    from model.model_resolver import TABLE_MODEL_MAPPING
+    from model.statement_cache import statements
+
+    statements.precompile(TABLE_MODEL_MAPPING)
+    results = []
+
+    if _selected(args, "mqtt_save_batch"):
+        batch_size = args.batch_size
+        payloads = [_sensor_payload(j) for j in range(batch_size)]
+        raws = [json.dumps(payload) for payload in payloads]
+        async def save_batch(i: int):
+            now = time.time()
+            # Como o on_message entrega: dados decodificados + payload original.
+            save_batch_to_db([IngestRecord(TOPICS[j % len(TOPICS)], payloads[j], now, raws[j]) for j in range(batch_size)])
+        results.append(await run_scenario("mqtt_save_batch", save_batch, max(args.iterations // 20, 10),
+                                          args.warmup, max(args.alloc_iterations // 20, 5), batch_size))
+
+    if _selected(args, "mqtt_on_message"):
+        # Fila real com workers: mede o custo no thread do paho (on_message) e a vazão até o DB.
+        pipeline = IngestPipeline(persist_batch=save_batch_to_db, max_queue=max(args.iterations * 4, 10000),
+                                  batch_size=args.batch_size, flush_interval=0.05, workers=args.workers)
+        get_data_camila.ingest_pipeline = pipeline
+        pipeline.start()
+        messages = [SimpleNamespace(topic=TOPICS[i % len(TOPICS)], payload=json.dumps(_sensor_payload(i)).encode("utf-8"))
+                    for i in range(1024)]
+
+        async def deliver(i: int):
+            on_message(None, None, messages[i % len(messages)])
+
+        total = args.warmup + args.iterations + args.alloc_iterations
+        started = time.perf_counter()
+        result = await run_scenario("mqtt_on_message", deliver, args.iterations, args.warmup, args.alloc_iterations)
+        pipeline.stop() # Flush final: a vazão inclui a persistência de tudo o que foi entregue.
+        drained = time.perf_counter() - started
+        result["end_to_end_msgs_per_s"] = round(total / drained, 1)
+        result["pipeline"] = {key: value for key, value in pipeline.stats().items() if key != "workers"}
+        get_data_camila.ingest_pipeline = None
+        results.append(result)
+
+    return results
+
+
+def _selected(args, name: str) -> bool:
+    return not args.only or name in args.only
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+async def main(args) -> Dict[str, Any]:
+    random.seed(args.seed)
+    store = install_backend(args.backend)
+    seed(args.seed_rows)
+    results = await http_scenarios(args, store) + await mqtt_scenarios(args, store)
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "backend": args.backend,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "iterations": args.iterations,
+            "seed_rows": args.seed_rows,
+        },
+        "results": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos HTTP CRUD e de ingestão MQTT.")
+    parser.add_argument("--backend", choices=("fake", "mysql"), default="fake",
+                        help="fake: FakeDatabase em memória; mysql: banco configurado no .env.")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--alloc-iterations", type=int, default=200)
+    parser.add_argument("--seed-rows", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("MQTT_INGEST_WORKERS", 4)))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", type=lambda value: set(value.split(",")), default=None,
+                        help="Lista de cenários separada por vírgula.")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: stdout).")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    report = asyncio.run(main(arguments))
+    text = json.dumps(report, indent=2)
+    if arguments.output:
+        with open(arguments.output, "w", encoding="utf-8") as output:
+            output.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
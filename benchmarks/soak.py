@@ -0,0 +1,365 @@
+# benchmarks/soak.py
+
+# FLUXO E A LÓGICA:
+# 1. Sobe o `LocalBroker` (broker MQTT em processo) e aponta o coletor para ele pelas variáveis de ambiente
+#    (MQTT_BROKER/MQTT_PORT/MQTT_TOPIC...), ANTES de importar a aplicação: o `.env` não é usado para o broker.
+# 2. Troca o banco por um `SinkStore` (conta e descarta os INSERTs) e inicia o coletor de verdade
+#    (`start_collector`: motor async ou thread), que assina o broker por TCP como em produção.
+# 3. O `LoadGenerator` publica pelo perfil pedido (taxa, rajadas, tópicos, tamanho do payload) durante `--duration`.
+#    Cada linha que chega ao banco falso tem o atraso medido (`agora - sent_at` do payload) em um histograma
+#    logarítmico de memória constante.
+# 4. A cada `--report-every` segundos imprime uma linha (publicadas/s, gravadas/s, filas, p50/p99 do intervalo, RSS).
+# 5. Ao fim, espera a fila drenar, para o coletor e gera o relatório: vazão sustentada, percentis de atraso, perdas
+#    (broker, fila de ingestão, não gravadas) e crescimento de memória (MB/min, regressão linear do RSS).
+#    `--fail-below-rate`, `--fail-above-p99-ms` e `--fail-on-loss` devolvem código 1 (regressão em CI).
+#
+# Uso (a partir da raiz do repositório):
+#   python -m benchmarks.soak --duration 60 --rate 2000 --output soak.json
+#   python -m benchmarks.soak --engine thread --duration 3600 --rate 500 --burst-every 60 --burst-seconds 5 \
+#       --burst-multiplier 10 --payload-dist lognormal --payload-size 128 --payload-size-max 8192
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from benchmarks.local_broker import LoadGenerator, LoadProfile, LocalBroker
+
+TABLE = "pedidos"
+PAYLOAD_COLUMN = "valor_do_pedido" # Rota padrão: o payload original vai inteiro para esta coluna.
+TOPIC_PREFIX = "bench/sensor"
+
+
+# --- Medição ---
+
+class LatencyHistogram:
+    """Histograma logarítmico (~2% de erro relativo a partir de 10 µs): memória constante em testes longos."""
+
+    _BASE = 1e-5
+    _STEPS = 50 # Baldes por fator e.
+
+    def __init__(self) -> None:
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        index = int(math.log(max(seconds, self._BASE) / self._BASE) * self._STEPS)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """Limite superior do balde que contém o quantil `q` (segundos)."""
+        if not self.total:
+            return 0.0
+        target = q * self.total
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._BASE * math.exp((index + 1) / self._STEPS), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "samples": self.total,
+            **{f"p{label}_ms": round(self.percentile(q) * 1000, 3)
+               for label, q in (("50", 0.50), ("90", 0.90), ("99", 0.99), ("999", 0.999))},
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class LagRecorder:
+    """Callback do SinkStore: mede o atraso publicação -> INSERT de cada linha da tabela do coletor."""
+
+    def __init__(self, table: str, payload_column: str) -> None:
+        self.table = table
+        self.payload_column = payload_column
+        self.persisted = 0
+        self.unparsed = 0
+        self.total = LatencyHistogram()
+        self.interval = LatencyHistogram()
+        self._positions: Dict[Tuple[str, ...], int] = {}
+        self._lock = threading.Lock() # O motor thread grava a partir de vários workers.
+
+    def record(self, table: str, columns: Sequence[str], values: Tuple[Any, ...]) -> None:
+        if table != self.table:
+            return
+        now = time.time()
+        key = tuple(columns)
+        position = self._positions.get(key)
+        if position is None:
+            position = self._positions.setdefault(key, key.index(self.payload_column))
+        # O payload começa com {"seq":N,"sent_at":X,...}: recorte de string em vez de um parse JSON por linha.
+        payload = values[position]
+        start = payload.find('"sent_at":') + 10
+        try:
+            lag = now - float(payload[start:payload.index(",", start)])
+        except ValueError:
+            lag = None
+        with self._lock:
+            self.persisted += 1
+            if lag is None:
+                self.unparsed += 1
+                return
+            self.total.add(lag)
+            self.interval.add(lag)
+
+    def take_interval(self) -> LatencyHistogram:
+        with self._lock:
+            interval, self.interval = self.interval, LatencyHistogram()
+        return interval
+
+
+def rss_mb() -> float:
+    """Memória residente atual do processo (Linux: /proc; senão, o pico do getrusage)."""
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def _slope_per_minute(points: List[Tuple[float, float]]) -> Optional[float]:
+    """Inclinação (unidades/min) da regressão linear de (segundos, valor)."""
+    if len(points) < 2:
+        return None
+    xs, ys = [x for x, _ in points], [y for _, y in points]
+    mean_x, mean_y = statistics.fmean(xs), statistics.fmean(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    if not variance:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance * 60
+
+
+# --- Montagem ---
+
+def configure_collector(args, port: int, spill_dir: str) -> None:
+    """Aponta o coletor para o broker local (tem que rodar antes do primeiro import da aplicação)."""
+    os.environ.update({
+        "MQTT_BROKER": "127.0.0.1",
+        "MQTT_PORT": str(port),
+        "MQTT_TOPIC": f"{TOPIC_PREFIX}/#",
+        "MQTT_USER": "",
+        "MQTT_PSWD": "",
+        "MQTT_ENGINE": args.engine,
+        "MQTT_PROTOCOL": "3.1.1",
+        "MQTT_QOS": str(args.qos),
+        "MQTT_CLEAN_SESSION": "true",
+        "MQTT_CLIENT_ID": "",
+        "MQTT_COORDINATION": "none",
+        "MQTT_ROUTES_FILE": "",
+        "MQTT_ROLLUP_ENABLED": "true" if args.rollups else "false",
+        "MQTT_INGEST_SPILL_PATH": spill_dir,
+        "MQTT_INGEST_WORKERS": str(args.workers),
+        "MQTT_INGEST_BATCH_SIZE": str(args.batch_size),
+        "MQTT_DEDUP": "none",
+        "LIVE_ENABLED": "false",
+    })
+
+
+def install_sink(recorder: LagRecorder):
+    """Troca os objetos globais de acesso a dados por um SinkStore."""
+    from benchmarks.fake_db import FakeAsyncDatabase, FakeDatabase, SinkStore
+    from utils import function_execute
+    store = SinkStore(on_insert=recorder.record)
+    function_execute.db = FakeDatabase(store)
+    function_execute.async_db = FakeAsyncDatabase(store)
+    return store
+
+
+async def _wait_subscribed(broker: LocalBroker, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not any(session.subscriptions for session in list(broker._sessions)):
+        if time.monotonic() > deadline:
+            raise RuntimeError("O coletor não assinou o broker local a tempo.")
+        await asyncio.sleep(0.05)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+# --- Execução ---
+
+async def run_soak(args) -> Dict[str, Any]:
+    broker = LocalBroker(max_queued=args.broker_queue)
+    port = broker.start()
+    spill_dir = tempfile.mkdtemp(prefix="soak_spill_")
+    configure_collector(args, port, spill_dir)
+    recorder = LagRecorder(TABLE, PAYLOAD_COLUMN)
+    install_sink(recorder)
+
+    from model import get_data_camila # Só depois do ambiente e do banco falso.
+    if not await get_data_camila.start_collector("SoakCollector"):
+        broker.stop()
+        raise RuntimeError("Falha ao iniciar o coletor (veja os logs).")
+    await _wait_subscribed(broker)
+
+    profile = LoadProfile(
+        rate=args.rate, topics=args.topics, payload_min=args.payload_size,
+        payload_max=max(args.payload_size_max or args.payload_size, args.payload_size), payload_dist=args.payload_dist,
+        burst_every=args.burst_every, burst_seconds=args.burst_seconds, burst_multiplier=args.burst_multiplier,
+    )
+    generator = LoadGenerator(broker, profile, TOPIC_PREFIX, seed=args.seed)
+    rss_start = rss_mb()
+    started = time.monotonic()
+    publishing = asyncio.wrap_future(generator.start(args.duration))
+
+    intervals: List[Dict[str, Any]] = []
+    last = (started, 0, 0)
+    while True:
+        finished, _ = await asyncio.wait({publishing}, timeout=args.report_every)
+        now = time.monotonic()
+        published, persisted = generator.published, recorder.persisted
+        elapsed = max(now - last[0], 1e-9)
+        ingest = get_data_camila.get_ingest_stats() or {}
+        interval = {
+            "t": round(now - started, 1),
+            "published_per_s": round((published - last[1]) / elapsed, 1),
+            "persisted_per_s": round((persisted - last[2]) / elapsed, 1),
+            "broker_queued": broker.stats()["queued"],
+            "ingest_queue": ingest.get("queue_depth"),
+            "lag": recorder.take_interval().summary(),
+            "rss_mb": round(rss_mb(), 1),
+        }
+        intervals.append(interval)
+        print(json.dumps(interval), file=sys.stderr, flush=True)
+        last = (now, published, persisted)
+        if finished:
+            publishing.result() # Propaga um erro do gerador.
+            break
+    publish_seconds = time.monotonic() - started
+    persisted_during_publish = recorder.persisted
+
+    # Drenagem: espera tudo o que o broker entregou chegar ao banco (ou nenhuma linha nova por `drain_timeout`).
+    expected = generator.published - broker.dropped
+    progress_at, progress = time.monotonic(), recorder.persisted
+    while recorder.persisted < expected and time.monotonic() - progress_at < args.drain_timeout:
+        await asyncio.sleep(0.1)
+        if recorder.persisted != progress:
+            progress_at, progress = time.monotonic(), recorder.persisted
+    drain_seconds = time.monotonic() - started - publish_seconds
+    ingest = get_data_camila.get_ingest_stats() or {}
+    await get_data_camila.stop_collector()
+    broker_stats = broker.stats()
+    broker.stop()
+
+    # Regime: descarta o primeiro intervalo (conexão e aquecimento) e os que não tiveram um período inteiro.
+    steady = [interval for interval in intervals[1:] if interval["t"] <= args.duration] or intervals
+    warm = [(interval["t"], interval["rss_mb"]) for interval in intervals if interval["t"] >= args.duration * args.warmup_fraction]
+    rss_end = rss_mb()
+    lost = max(generator.published - recorder.persisted, 0)
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "engine": args.engine,
+            "qos": args.qos,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "profile": profile._asdict(),
+            "duration_s": args.duration,
+        },
+        "throughput": {
+            "published": generator.published,
+            "published_mb": round(generator.bytes / 2**20, 2),
+            "persisted": recorder.persisted,
+            "sustained_msgs_per_s": round(persisted_during_publish / publish_seconds, 1),
+            "steady_msgs_per_s_median": round(statistics.median(i["persisted_per_s"] for i in steady), 1),
+            "steady_msgs_per_s_min": round(min(i["persisted_per_s"] for i in steady), 1),
+            "drain_s": round(drain_seconds, 2),
+        },
+        "lag": recorder.total.summary(),
+        "drops": {
+            "broker_dropped": broker_stats["dropped"],
+            "ingest_dropped": ingest.get("dropped", 0),
+            "invalid_json": ingest.get("invalid_json", 0),
+            "failed": ingest.get("failed", 0),
+            "not_persisted": lost,
+            "loss_ratio": round(lost / generator.published, 6) if generator.published else 0.0,
+            "unparsed_rows": recorder.unparsed,
+        },
+        "memory": {
+            "rss_start_mb": round(rss_start, 1),
+            "rss_end_mb": round(rss_end, 1),
+            "rss_max_mb": round(max([rss_end] + [i["rss_mb"] for i in intervals]), 1),
+            "growth_mb_per_min": None if _slope_per_minute(warm) is None else round(_slope_per_minute(warm), 3),
+        },
+        "intervals": intervals,
+    }
+
+
+def check_budgets(args, report: Dict[str, Any]) -> List[str]:
+    """Limites opcionais: cada violação vira uma mensagem (e o código de saída 1)."""
+    failures = []
+    rate = report["throughput"]["sustained_msgs_per_s"]
+    if args.fail_below_rate is not None and rate < args.fail_below_rate:
+        failures.append(f"vazão sustentada {rate} msgs/s < {args.fail_below_rate}")
+    p99 = report["lag"]["p99_ms"]
+    if args.fail_above_p99_ms is not None and p99 > args.fail_above_p99_ms:
+        failures.append(f"atraso p99 {p99} ms > {args.fail_above_p99_ms}")
+    if args.fail_on_loss and report["drops"]["not_persisted"]:
+        failures.append(f"{report['drops']['not_persisted']} mensagens não gravadas")
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Soak de ponta a ponta do coletor MQTT contra um broker e um banco locais.")
+    parser.add_argument("--engine", choices=("async", "thread"), default="async")
+    parser.add_argument("--duration", type=float, default=60.0, help="Segundos de publicação.")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Mensagens/s fora das rajadas.")
+    parser.add_argument("--topics", type=int, default=16, help="Tópicos distintos (fan-out).")
+    parser.add_argument("--payload-size", type=int, default=96, help="Bytes (mínimo/mediana conforme a distribuição).")
+    parser.add_argument("--payload-size-max", type=int, default=None)
+    parser.add_argument("--payload-dist", choices=("fixed", "uniform", "lognormal"), default="fixed")
+    parser.add_argument("--burst-every", type=float, default=0.0, help="Segundos entre rajadas (0 = sem rajadas).")
+    parser.add_argument("--burst-seconds", type=float, default=0.0)
+    parser.add_argument("--burst-multiplier", type=float, default=1.0)
+    parser.add_argument("--qos", type=int, choices=(0, 1), default=0)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("MQTT_INGEST_WORKERS", 4)))
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("MQTT_INGEST_BATCH_SIZE", 500)))
+    parser.add_argument("--broker-queue", type=int, default=100000, help="Fila de saída por sessão no broker.")
+    parser.add_argument("--rollups", action="store_true", help="Mantém os rollups ligados durante o soak.")
+    parser.add_argument("--report-every", type=float, default=5.0)
+    parser.add_argument("--warmup-fraction", type=float, default=0.2, help="Fração inicial ignorada no crescimento de memória.")
+    parser.add_argument("--drain-timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fail-below-rate", type=float, default=None)
+    parser.add_argument("--fail-above-p99-ms", type=float, default=None)
+    parser.add_argument("--fail-on-loss", action="store_true")
+    parser.add_argument("--output", help="Arquivo JSON do relatório (padrão: stdout).")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    arguments = parse_args()
+    result = asyncio.run(run_soak(arguments))
+    text = json.dumps(result, indent=2)
+    if arguments.output:
+        with open(arguments.output, "w", encoding="utf-8") as output:
+            output.write(text)
+    else:
+        print(text)
+    violations = check_budgets(arguments, result)
+    for violation in violations:
+        print(f"FALHOU: {violation}", file=sys.stderr)
+    sys.exit(1 if violations else 0)
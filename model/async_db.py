@@ -0,0 +1,181 @@
+# app/model/async_db.py
+
+# FLUXO E A LÓGICA:
+# 1. O construtor `__init__` lê as mesmas variáveis de ambiente de `db.py` (credenciais + tamanho do pool assíncrono).
+# 2. O pool `aiomysql` é criado na primeira utilização, dentro do event loop do FastAPI.
+# 3. `borrow()` empresta uma conexão do pool sem bloquear o event loop (espera limitada por `pool_timeout`).
+# 4. `execute_comand()` / `execute_many()` espelham a API do `Database` síncrono, mas com `await`.
+# 5. `transaction()` agrupa vários comandos em uma única transação (operações em lote).
+# 6. `stream()` lê resultados grandes com cursor server-side (sem buffer), entregando blocos de linhas.
+# 7. `close()` encerra o pool (chamado no lifespan da aplicação).
+# A razão de existir: As rotas são `async def`; usar o driver bloqueante nelas trava o event loop inteiro durante cada query.
+# O `Database` síncrono continua existindo para as threads do MQTT.
+
+import asyncio
+from contextlib import asynccontextmanager
+from os import getenv
+from typing import Any, AsyncIterator, List, Optional, Tuple, Union
+
+import aiomysql
+from dotenv import load_dotenv
+from model.statement_cache import statement_kind # Tipo do comando em cache (sem re-analisar o SQL).
+from utils.metrics import DB_QUERY_SECONDS # Duração das queries por tipo de comando.
+
+
+class AsyncDatabase:
+    """Acesso assíncrono ao MySQL com pool próprio (aiomysql)."""
+
+    def __init__(self) -> None:
+        load_dotenv()
+        self.host: str = getenv('DB_HOST')
+        self.username: str = getenv('DB_USER')
+        self.password: str = getenv('DB_PSWD')
+        self.database: str = getenv('DB_NAME')
+        # Por padrão o pool assíncrono usa o mesmo dimensionamento do pool síncrono.
+        self.pool_min: int = int(getenv('DB_ASYNC_POOL_MIN', getenv('DB_POOL_MIN', 1)))
+        self.pool_max: int = int(getenv('DB_ASYNC_POOL_MAX', getenv('DB_POOL_MAX', 10)))
+        self.pool_recycle: int = int(getenv('DB_POOL_MAX_IDLE', 300))
+        self.pool_timeout: float = float(getenv('DB_POOL_TIMEOUT', 5))
+        self._pool: Optional[aiomysql.Pool] = None
+        self._pool_lock: Optional[asyncio.Lock] = None
+
+    async def get_pool(self) -> aiomysql.Pool:
+        """Cria o pool na primeira chamada (precisa de um event loop em execução)."""
+        if self._pool is None:
+            if self._pool_lock is None:
+                self._pool_lock = asyncio.Lock()
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await aiomysql.create_pool(
+                        host=self.host,
+                        user=self.username,
+                        password=self.password,
+                        db=self.database,
+                        minsize=self.pool_min,
+                        maxsize=self.pool_max,
+                        pool_recycle=self.pool_recycle,
+                        autocommit=True, # Igual ao pool síncrono: SELECTs não ficam presos a snapshots antigos.
+                    )
+        return self._pool
+
+    @asynccontextmanager
+    async def borrow(self) -> AsyncIterator[aiomysql.Connection]:
+        """Empresta uma conexão do pool pelo tempo do bloco `async with` (rollback em caso de erro)."""
+        pool = await self.get_pool()
+        # asyncio.TimeoutError sobe para o chamador (function_execute traduz para 503).
+        connection = await asyncio.wait_for(pool.acquire(), timeout=self.pool_timeout)
+        try:
+            yield connection
+        except Exception:
+            try:
+                await connection.rollback()
+            except Exception:
+                connection.close() # Conexão em estado desconhecido: o pool descarta conexões fechadas.
+            raise
+        finally:
+            pool.release(connection)
+
+    async def execute_comand(
+        self,
+        sql: str,
+        params: Optional[Tuple[Any, ...]] = None,
+        connection: Optional[aiomysql.Connection] = None,
+        kind: Optional[str] = None,
+    ) -> Optional[Union[List[dict], Any]]:
+        """Executa um comando SQL e retorna linhas (SELECT), o ID inserido (INSERT) ou as linhas afetadas."""
+        if connection is None:
+            async with self.borrow() as borrowed:
+                return await self.execute_comand(sql, params, connection=borrowed, kind=kind)
+
+        kind = kind or statement_kind(sql)
+        async with connection.cursor(aiomysql.DictCursor) as cursor:
+            with DB_QUERY_SECONDS.time("async", kind):
+                await cursor.execute(sql, params)
+                if kind == "select":
+                    return await cursor.fetchall()
+            return cursor.lastrowid if kind == "insert" else cursor.rowcount
+
+    async def execute_many(
+        self,
+        sql: str,
+        params_seq: List[Tuple[Any, ...]],
+        connection: Optional[aiomysql.Connection] = None,
+    ) -> int:
+        """Executa `sql` para cada tupla de `params_seq` em uma única transação. Retorna as linhas afetadas."""
+        if connection is None:
+            async with self.borrow() as borrowed:
+                return await self.execute_many(sql, params_seq, connection=borrowed)
+
+        async with connection.cursor() as cursor:
+            with DB_QUERY_SECONDS.time("async", f"{statement_kind(sql)}_batch"):
+                await connection.begin()
+                await cursor.executemany(sql, params_seq)
+                await connection.commit()
+            return cursor.rowcount
+
+    async def execute_batches(self, batches: List[Tuple[str, List[Tuple[Any, ...]]]]) -> int:
+        """Vários `(sql, params_seq)` em uma ÚNICA transação: ou todos são gravados, ou nenhum. Retorna o total afetado."""
+        async with self.borrow() as connection:
+            async with connection.cursor() as cursor:
+                total = 0
+                with DB_QUERY_SECONDS.time("async", "insert_batch"):
+                    await connection.begin()
+                    for sql, params_seq in batches:
+                        await cursor.executemany(sql, params_seq)
+                        total += cursor.rowcount
+                    await connection.commit()
+                return total
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiomysql.Cursor]:
+        """Abre uma transação e entrega um cursor; COMMIT ao sair do bloco, ROLLBACK (via `borrow`) em caso de erro."""
+        async with self.borrow() as connection:
+            await connection.begin()
+            async with connection.cursor() as cursor:
+                yield cursor
+            await connection.commit()
+
+    async def stream(
+        self,
+        sql: str,
+        params: Optional[Tuple[Any, ...]] = None,
+        chunk_size: int = 1000,
+    ) -> AsyncIterator[List[dict]]:
+        """
+        Executa um SELECT com cursor server-side (SSDictCursor) e entrega as linhas em blocos de `chunk_size`.
+        O resultado nunca é materializado inteiro na memória: cada bloco é lido do socket sob demanda.
+        """
+        pool = await self.get_pool()
+        connection = await asyncio.wait_for(pool.acquire(), timeout=self.pool_timeout)
+        finished = False
+        try:
+            cursor = await connection.cursor(aiomysql.SSDictCursor)
+            await cursor.execute(sql, params)
+            while True:
+                rows = await cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+            await cursor.close()
+            finished = True
+        finally:
+            if not finished:
+                # Leitura interrompida (erro ou cliente desconectou): ainda há linhas pendentes no socket,
+                # então a conexão não pode voltar ao pool. Fechada, ela é descartada pelo pool.
+                connection.close()
+            pool.release(connection)
+
+    def pool_stats(self):
+        """Estado do pool aiomysql, ou None se ele ainda não foi criado."""
+        if self._pool is None:
+            return None
+        free = self._pool.freesize
+        return {"size": self._pool.size, "idle": free, "in_use": self._pool.size - free,
+                "min_size": self._pool.minsize, "max_size": self._pool.maxsize}
+
+    async def close(self) -> None:
+        """Fecha todas as conexões do pool (desligamento da aplicação)."""
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
@@ -1,15 +1,207 @@
 # FLUXO E A LÓGICA:
-# 1. O construtor `__init__` lê as variáveis de ambiente (Escopo Global/Módulo).
-# 2. `connect()` abre a conexão com o DB (Escopo de Requisição).
-# 3. `execute_comand()` executa o SQL, faz `COMMIT` ou retorna dados (Escopo de Requisição).
-# 4. `disconnect()` fecha a conexão (Escopo de Requisição).
+# 1. O construtor `__init__` lê as variáveis de ambiente (Escopo Global/Módulo), incluindo a configuração do pool.
+# 2. `ConnectionPool` mantém conexões MySQL abertas e reutilizáveis (mínimo/máximo, health check, despejo por ociosidade).
+# 3. `borrow()` empresta uma conexão do pool pelo tempo de um comando/transação e a devolve ao final (Escopo de Requisição).
+# 4. `execute_comand()` executa o SQL na conexão emprestada e retorna dados, ID inserido ou linhas afetadas.
+#    Com um `CompiledStatement` (statement_cache.py), `execute_prepared()` reutiliza um prepared statement por conexão.
+# 5. `execute_many()` executa um lote de parâmetros em uma única transação (INSERT multi-linha).
+# 6. `connect()`/`disconnect()` continuam disponíveis, mas agora emprestam/devolvem uma conexão do pool por thread.
 # A razão de existir: Encapsular o acesso ao driver MySQL. É a interface de baixo nível entre a aplicação Python e o banco de dados.
 
-from typing import Any, Optional, Tuple, Union, List # Tipagem: Define tipos complexos.
+import logging # Erros de conexão vão para o logger do módulo.
+import threading # Sincronização do pool entre as threads (requisições e MQTT).
+import time # Relógio monotônico para ociosidade e tempo de espera.
+import weakref # Prepared statements vivem enquanto a conexão do pool viver.
+from collections import deque # Fila das conexões livres (LIFO: reaproveita a mais "quente").
+from contextlib import contextmanager # Gerenciador de contexto para o empréstimo de conexões.
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple, Union, List # Tipagem: Define tipos complexos.
 import mysql.connector as mc # Biblioteca do conector do MySQL.
 from mysql.connector import Error, MySQLConnection # Classes específicas de erro e conexão.
 from dotenv import load_dotenv # Função para carregar variáveis de ambiente.
 from os import getenv # Função para ler variáveis de ambiente.
+from model.statement_cache import CompiledStatement, statement_kind # SQL pré-montado + tipo do comando em cache.
+from utils.metrics import DB_CONNECT_SECONDS, DB_QUERY_SECONDS # Tempo de conexão e de query por tipo de comando.
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Error):
+    """Levantada quando nenhuma conexão fica livre dentro do tempo máximo de espera do pool."""
+
+
+class ConnectionPool:
+    """
+    Pool de conexões MySQL thread-safe.
+    - Mantém entre `min_size` e `max_size` conexões abertas.
+    - Faz health check (ping) na retirada de conexões que ficaram ociosas por mais de `health_check_after` segundos.
+    - Fecha conexões ociosas há mais de `max_idle` segundos, preservando o mínimo.
+    - Limita a espera por uma conexão livre a `acquire_timeout` segundos.
+    """
+
+    def __init__(
+        self,
+        connect_kwargs: Dict[str, Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        max_idle: float = 300.0,
+        acquire_timeout: float = 5.0,
+        health_check_after: float = 30.0,
+    ) -> None:
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Configuração de pool inválida: min={min_size}, max={max_size}.")
+        self._connect_kwargs = connect_kwargs
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.acquire_timeout = acquire_timeout
+        self.health_check_after = health_check_after
+        # Conexões livres: (conexão, instante em que foi devolvida).
+        self._idle: Deque[Tuple[MySQLConnection, float]] = deque()
+        self._size = 0 # Total de conexões abertas (livres + emprestadas).
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+
+    # --- Criação / descarte de conexões ---
+
+    def _open(self) -> MySQLConnection:
+        """Abre uma nova conexão física (handshake TCP + autenticação)."""
+        with DB_CONNECT_SECONDS.time("sync"):
+            connection = mc.connect(**self._connect_kwargs)
+        # Autocommit: cada comando simples é sua própria transação e um SELECT numa conexão
+        # reutilizada não fica preso a um snapshot antigo. Transações explícitas usam start_transaction().
+        connection.autocommit = True
+        return connection
+
+    @staticmethod
+    def _close_quietly(connection: MySQLConnection) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, connection: MySQLConnection, idle_for: float) -> bool:
+        """Health check barato: só faz ping se a conexão ficou ociosa tempo suficiente para poder ter caído."""
+        if idle_for < self.health_check_after:
+            return True
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _evict_idle_locked(self, now: float) -> List[MySQLConnection]:
+        """Remove (sob o lock) conexões ociosas além de `max_idle`, mantendo `min_size`. Retorna as que devem ser fechadas."""
+        expired: List[MySQLConnection] = []
+        # As mais antigas ficam à esquerda da deque.
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.max_idle:
+            connection, _ = self._idle.popleft()
+            self._size -= 1
+            expired.append(connection)
+        return expired
+
+    # --- API pública ---
+
+    def warm_up(self) -> None:
+        """Abre as `min_size` conexões iniciais (opcional; o pool também cresce sob demanda)."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                connection = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            self.release(connection)
+
+    def acquire(self) -> MySQLConnection:
+        """Retira uma conexão do pool, esperando no máximo `acquire_timeout` segundos."""
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            candidate: Optional[Tuple[MySQLConnection, float]] = None
+            must_open = False
+            expired: List[MySQLConnection] = []
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise Error("Pool de conexões encerrado.")
+                    now = time.monotonic()
+                    evicted = self._evict_idle_locked(now)
+                    if evicted:
+                        expired.extend(evicted)
+                        self._cond.notify_all()
+                    if self._idle:
+                        candidate = self._idle.pop() # LIFO: a conexão usada mais recentemente.
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1 # Reserva a vaga antes de abrir fora do lock.
+                        must_open = True
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"Nenhuma conexão livre após {self.acquire_timeout}s (pool máximo = {self.max_size})."
+                        )
+                    self._cond.wait(remaining)
+
+            for connection in expired:
+                self._close_quietly(connection)
+
+            if must_open:
+                try:
+                    return self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            connection, released_at = candidate
+            if self._is_healthy(connection, time.monotonic() - released_at):
+                return connection
+            # Conexão morta: descarta e tenta de novo (abrirá uma nova se houver vaga).
+            self._discard(connection)
+
+    def release(self, connection: MySQLConnection, discard: bool = False) -> None:
+        """Devolve uma conexão ao pool. `discard=True` fecha a conexão (ex.: após erro de rede)."""
+        if discard:
+            self._discard(connection)
+            return
+        with self._cond:
+            if not self._closed:
+                self._idle.append((connection, time.monotonic()))
+                self._cond.notify()
+                return
+            self._size -= 1
+        self._close_quietly(connection)
+
+    def _discard(self, connection: MySQLConnection) -> None:
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        self._close_quietly(connection)
+
+    def close_all(self) -> None:
+        """Encerra o pool e fecha todas as conexões livres (as emprestadas são fechadas ao serem devolvidas)."""
+        with self._cond:
+            self._closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for connection in idle:
+            self._close_quietly(connection)
+
+    def stats(self) -> Dict[str, int]:
+        """Fotografia do estado do pool (para status/monitoramento)."""
+        with self._cond:
+            idle = len(self._idle)
+            return {"size": self._size, "idle": idle, "in_use": self._size - idle,
+                    "min_size": self.min_size, "max_size": self.max_size}
+
 
 class Database: # Classe que gerencia a conexão com o banco
     def __init__(self) -> None:
@@ -19,70 +211,232 @@ class Database: # Classe que gerencia a conexão com o banco
         self.username: str = getenv('DB_USER')
         self.password: str = getenv('DB_PSWD')
         self.database: str = getenv('DB_NAME') # O nome do DB é 'projeto_ads2'.
-        self.connection: Optional[MySQLConnection] = None # Objeto de conexão real. Inicia como None.
-        self.cursor: Union[List[dict], None] = None # Cursor principal. Inicia como None.
- 
+        # Configuração do pool de conexões (todas opcionais no .env).
+        self.pool_min: int = int(getenv('DB_POOL_MIN', 1))
+        self.pool_max: int = int(getenv('DB_POOL_MAX', 10))
+        self.pool_max_idle: float = float(getenv('DB_POOL_MAX_IDLE', 300))
+        self.pool_timeout: float = float(getenv('DB_POOL_TIMEOUT', 5))
+        self.pool_health_check: float = float(getenv('DB_POOL_HEALTH_CHECK', 30))
+        self._pool: Optional[ConnectionPool] = None # Criado na primeira utilização (import não conecta no DB).
+        self._pool_lock = threading.Lock()
+        # Conexão/cursor de `connect()`/`disconnect()` são por thread: requisições concorrentes não disputam os mesmos atributos.
+        self._local = threading.local()
+        # Prepared statements por conexão: {conexão: {sql: cursor preparado}}. Conexões descartadas pelo pool saem sozinhas.
+        self._prepared: "weakref.WeakKeyDictionary[MySQLConnection, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+        self._prepared_lock = threading.Lock()
+
+    @property
+    def pool(self) -> ConnectionPool:
+        """Pool de conexões compartilhado (inicialização preguiçosa e thread-safe)."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool(
+                        connect_kwargs={
+                            "host": self.host,
+                            "database": self.database,
+                            "user": self.username,
+                            "password": self.password,
+                        },
+                        min_size=self.pool_min,
+                        max_size=self.pool_max,
+                        max_idle=self.pool_max_idle,
+                        acquire_timeout=self.pool_timeout,
+                        health_check_after=self.pool_health_check,
+                    )
+        return self._pool
+
+    @property
+    def connection(self) -> Optional[MySQLConnection]:
+        return getattr(self._local, "connection", None)
+
+    @connection.setter
+    def connection(self, value: Optional[MySQLConnection]) -> None:
+        self._local.connection = value
+
+    @property
+    def cursor(self):
+        return getattr(self._local, "cursor", None)
+
+    @cursor.setter
+    def cursor(self, value) -> None:
+        self._local.cursor = value
+
 # ===============================================================================================================
-# Métodos de conexão, desconexão e execução de comandos no banco de dados.
+# Métodos de empréstimo, conexão, desconexão e execução de comandos no banco de dados.
 # ===============================================================================================================
+    @contextmanager
+    def borrow(self) -> Iterator[MySQLConnection]:
+        """
+        Empresta uma conexão do pool pelo tempo do bloco `with`.
+        Em caso de erro, desfaz a transação pendente; se nem o rollback funcionar, a conexão é descartada.
+        """
+        connection = self.pool.acquire()
+        discard = False
+        try:
+            yield connection
+        except Exception:
+            try:
+                connection.rollback()
+            except Exception:
+                discard = True
+            raise
+        finally:
+            self.pool.release(connection, discard=discard)
+
     # Conectar ao banco de dados
     def connect(self) -> None:
         """
-        Estabelece uma conexão com o banco de dados.
+        Empresta uma conexão do pool para a thread atual.
         CRÍTICO: Deve levantar a exceção (raise) em caso de falha de conexão.
         """
         try:
-            # Tenta estabelecer a conexão usando as credenciais
-            self.connection = mc.connect(
-                host = self.host,
-                database = self.database,
-                user = self.username,
-                password = self.password
-            )
-            if self.connection.is_connected():
-                # Cria um cursor que retorna resultados como dicionários (dictionary=True)
-                self.cursor = self.connection.cursor(dictionary=True)
-                print("Conexão ao banco de dados realizada com sucesso,")
+            self.connection = self.pool.acquire()
+            # Cria um cursor que retorna resultados como dicionários (dictionary=True)
+            self.cursor = self.connection.cursor(dictionary=True)
         except Error as e:
             # Em caso de falha de conexão, reseta a conexão para None (limpeza)
-            print(f"Erro de conexão do DB: {e}")
             self.connection = None
             self.cursor = None
             # IMPORTANTE: Re-levanta o erro para que function_execute.py o capture e o exponha.
             raise e
- 
+
     # Desconectar do banco de dados
     def disconnect(self) -> None:
-        """Encerra a conexão com o banco de dados e o cursor, se eles existirem."""
+        """Fecha o cursor e devolve a conexão da thread atual ao pool, se eles existirem."""
         if self.cursor:
-            self.cursor.close()
+            try:
+                self.cursor.close()
+            except Exception:
+                pass
         if self.connection:
-            self.connection.close()
-        print("Conexão com o banco de dados encerrada com sucesso;")
-    
+            self.pool.release(self.connection)
+        self.connection = None
+        self.cursor = None
+
+    def pool_stats(self) -> Optional[Dict[str, int]]:
+        """Estado do pool, ou None se ele ainda não foi criado (não força a criação)."""
+        return self._pool.stats() if self._pool is not None else None
+
+    def dedicated_connection(self) -> MySQLConnection:
+        """
+        Abre uma conexão FORA do pool, com as mesmas credenciais, para estado de sessão de longa duração
+        (ex.: `GET_LOCK` da coordenação MQTT). Quem abre é responsável por fechá-la.
+        """
+        return self.pool._open()
+
+    def close(self) -> None:
+        """Fecha todas as conexões do pool (desligamento da aplicação)."""
+        if self._pool is not None:
+            self._pool.close_all()
+
     # Executar comando no banco de dados
-    def execute_comand(self, sql: str, params: Optional[Tuple[Any, ...]] = None) -> Optional[Union[List[dict], Any]]:
-        """Executa um comando SQL de forma segura, gerencia o cursor e o COMMIT."""
-        # Se o connect() falhar e levantar exceção (como corrigido acima), esta parte não é atingida.
-        if self.connection is None:
-            print('ERRO: Conexão ao banco de dados não estabelecida.')
+    def execute_comand(
+        self,
+        sql: str,
+        params: Optional[Tuple[Any, ...]] = None,
+        connection: Optional[MySQLConnection] = None,
+        kind: Optional[str] = None,
+    ) -> Optional[Union[List[dict], Any]]:
+        """
+        Executa um comando SQL de forma segura na conexão informada (ou na conexão da thread atual).
+        Conexões do pool estão em autocommit; o COMMIT explícito só é necessário dentro de transações.
+        `kind` ("select", "insert", ...) evita re-analisar o SQL quando ele vem do cache de comandos.
+        """
+        connection = connection or self.connection
+        if connection is None:
+            logger.error('Conexão ao banco de dados não estabelecida.')
             return None
 
+        kind = kind or statement_kind(sql)
         # Cria um novo cursor (o objeto de execução)
-        cursor = self.connection.cursor(dictionary=True) 
+        cursor = connection.cursor(dictionary=True)
         try:
-            # Executa o comando SQL com os parâmetros (prevenindo SQL Injection)
-            cursor.execute(sql, params)
-            
-            # Se for um SELECT, busca todos os resultados
-            if sql.strip().lower().startswith("select"):
-                result = cursor.fetchall()
-                return result
-            else:
-                # Se for INSERT/UPDATE/DELETE, confirma a alteração
-                self.connection.commit()
-                # Retorna o ID do último registro inserido ou o número de linhas afetadas
-                return cursor.lastrowid if sql.strip().lower().startswith("insert") else cursor.rowcount
-        except Error as e:
-            # Levanta o erro para ser capturado por function_execute.py
-            raise e
\ No newline at end of file
+            with DB_QUERY_SECONDS.time("sync", kind):
+                # Executa o comando SQL com os parâmetros (prevenindo SQL Injection)
+                cursor.execute(sql, params)
+
+                # Se for um SELECT, busca todos os resultados
+                if kind == "select":
+                    return cursor.fetchall()
+            # Se for INSERT/UPDATE/DELETE, retorna o ID do último registro inserido ou o número de linhas afetadas
+            return cursor.lastrowid if kind == "insert" else cursor.rowcount
+        finally:
+            cursor.close()
+
+    def _prepared_cursor(self, connection: MySQLConnection, sql: str):
+        """Cursor preparado (COM_STMT_PREPARE uma vez por conexão/SQL; depois só COM_STMT_EXECUTE)."""
+        with self._prepared_lock:
+            per_connection = self._prepared.get(connection)
+            if per_connection is None:
+                per_connection = self._prepared[connection] = {}
+        cursor = per_connection.get(sql)
+        if cursor is None:
+            cursor = per_connection[sql] = connection.cursor(prepared=True)
+        return cursor
+
+    # Executar um comando do cache como prepared statement
+    def execute_prepared(
+        self,
+        statement: CompiledStatement,
+        params: Optional[Tuple[Any, ...]],
+        connection: MySQLConnection,
+    ) -> Any:
+        """
+        Executa um INSERT/UPDATE/DELETE pré-montado como prepared statement reutilizado na conexão do pool.
+        Retorna o ID inserido (INSERT) ou o número de linhas afetadas. SELECTs seguem por `execute_comand`.
+        """
+        if statement.kind == "select":
+            return self.execute_comand(statement.sql, params, connection=connection, kind=statement.kind)
+        cursor = self._prepared_cursor(connection, statement.sql)
+        try:
+            with DB_QUERY_SECONDS.time("sync", statement.kind):
+                cursor.execute(statement.sql, params)
+        except Error:
+            # O statement pode ter sido invalidado (ex.: DDL na tabela): descarta o cursor para ser preparado de novo.
+            self._prepared.get(connection, {}).pop(statement.sql, None)
+            raise
+        return cursor.lastrowid if statement.kind == "insert" else cursor.rowcount
+
+    # Executar o mesmo comando para vários conjuntos de parâmetros em uma única transação
+    def execute_many(
+        self,
+        sql: str,
+        params_seq: List[Tuple[Any, ...]],
+        connection: MySQLConnection,
+    ) -> int:
+        """
+        Executa `sql` para cada tupla de `params_seq` numa única transação (um COMMIT por lote).
+        Para INSERT ... VALUES o driver agrupa tudo em um INSERT multi-linha. Retorna as linhas afetadas.
+        """
+        cursor = connection.cursor()
+        try:
+            with DB_QUERY_SECONDS.time("sync", f"{statement_kind(sql)}_batch"):
+                connection.start_transaction()
+                cursor.executemany(sql, params_seq)
+                connection.commit()
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+    def execute_batches(
+        self,
+        batches: List[Tuple[str, List[Tuple[Any, ...]]]],
+        connection: MySQLConnection,
+    ) -> int:
+        """
+        Vários `(sql, params_seq)` numa ÚNICA transação: ou todos são gravados, ou nenhum (rollback via `borrow`).
+        Retorna o total de linhas afetadas.
+        """
+        cursor = connection.cursor()
+        try:
+            total = 0
+            with DB_QUERY_SECONDS.time("sync", "insert_batch"):
+                connection.start_transaction()
+                for sql, params_seq in batches:
+                    cursor.executemany(sql, params_seq)
+                    total += cursor.rowcount
+                connection.commit()
+            return total
+        finally:
+            cursor.close()
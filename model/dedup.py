@@ -0,0 +1,149 @@
+# app/model/dedup.py
+
+# FLUXO E A LÓGICA:
+# 1. Com QoS 1/2 o broker reentrega mensagens não confirmadas (reconexão, sessão persistente): a mesma leitura
+#    chegaria duas vezes e viraria duas linhas.
+# 2. `message_key()` identifica a mensagem: `MQTT_DEDUP=id` usa um ID do próprio payload (`MQTT_DEDUP_ID_FIELD`),
+#    `MQTT_DEDUP=hash` usa o conteúdo (tópico + payload). A chave é um hash de 128 bits em hex (CHAR(32)).
+# 3. Camada 1, em memória: `DedupFilter.seen()` guarda as chaves de uma janela de tempo (`MQTT_DEDUP_WINDOW`), com
+#    limite de entradas. Reentregas do broker são descartadas na recepção, antes da fila, do DB e do tempo real.
+# 4. Camada 2, no banco (opcional, `MQTT_DEDUP_COLUMN`): a chave é gravada em uma coluna com índice UNIQUE e o lote
+#    usa `INSERT ... ON DUPLICATE KEY UPDATE` sem efeito. Reenvios do spill (COMMIT feito, mas a confirmação se perdeu) e reentregas
+#    depois de um restart (a janela em memória recomeça vazia) não duplicam linhas.
+# 5. No modo `hash`, duas leituras idênticas do mesmo tópico são a MESMA mensagem: use-o quando o payload traz um
+#    instante ou sequência. Sem ID no payload (modo `id`), a mensagem passa sem deduplicação.
+# RAZÃO DE EXISTIR: Entrega confiável (QoS 1) sem inflar a tabela nem exigir limpeza posterior.
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from model.table_registry import OP_INSERT, table_registry
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MQTT_DEDUP = os.getenv("MQTT_DEDUP", "none").lower() # none | hash | id
+MQTT_DEDUP_ID_FIELD = os.getenv("MQTT_DEDUP_ID_FIELD", "msg_id")
+MQTT_DEDUP_WINDOW = float(os.getenv("MQTT_DEDUP_WINDOW", 300))
+MQTT_DEDUP_MAX_ENTRIES = int(os.getenv("MQTT_DEDUP_MAX_ENTRIES", 200000))
+# Coluna CHAR(32) com índice UNIQUE que recebe a chave (vazio = só a camada em memória).
+MQTT_DEDUP_COLUMN = os.getenv("MQTT_DEDUP_COLUMN", "")
+
+DEDUP_MODES = ("none", "hash", "id")
+if MQTT_DEDUP not in DEDUP_MODES:
+    raise ValueError(f"MQTT_DEDUP inválido: '{MQTT_DEDUP}'. Use {', '.join(DEDUP_MODES)}.")
+
+
+def message_key(topic: str, data: Any, raw: Optional[str]) -> Optional[str]:
+    """Chave de deduplicação da mensagem, ou None (deduplicação desligada / payload sem ID)."""
+    if MQTT_DEDUP == "id":
+        if not isinstance(data, dict) or data.get(MQTT_DEDUP_ID_FIELD) is None:
+            return None
+        content = f"{topic}\x00{data[MQTT_DEDUP_ID_FIELD]}"
+    elif MQTT_DEDUP == "hash":
+        content = f"{topic}\x00{raw}"
+    else:
+        return None
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class DedupFilter:
+    """Chaves vistas nos últimos `window` segundos (no máximo `max_entries`). Thread-safe."""
+
+    def __init__(self, window: float = 300.0, max_entries: int = 200000) -> None:
+        if window <= 0 or max_entries < 1:
+            raise ValueError("window e max_entries devem ser maiores que zero.")
+        self.window = window
+        self.max_entries = max_entries
+        self._expires: "OrderedDict[str, float]" = OrderedDict() # Ordem de inserção = ordem de expiração.
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.duplicates = 0
+        self.evicted = 0 # Removidas antes de expirar (limite de entradas): janela efetiva menor que `window`.
+
+    def seen(self, key: str, now: Optional[float] = None) -> bool:
+        """True se a chave já passou dentro da janela; senão a registra e retorna False."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.checked += 1
+            expires = self._expires
+            while expires:
+                oldest, expires_at = next(iter(expires.items()))
+                if expires_at > now:
+                    break
+                del expires[oldest]
+            if key in expires:
+                self.duplicates += 1
+                return True
+            expires[key] = now + self.window
+            if len(expires) > self.max_entries:
+                expires.popitem(last=False)
+                self.evicted += 1
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": MQTT_DEDUP,
+            "window": self.window,
+            "entries": len(self._expires),
+            "max_entries": self.max_entries,
+            "checked": self.checked,
+            "duplicates": self.duplicates,
+            "evicted": self.evicted,
+            "column": MQTT_DEDUP_COLUMN or None,
+        }
+
+
+# Instância global (Escopo de Módulo): None com MQTT_DEDUP=none.
+dedup_filter: Optional[DedupFilter] = (
+    DedupFilter(MQTT_DEDUP_WINDOW, MQTT_DEDUP_MAX_ENTRIES) if MQTT_DEDUP != "none" else None
+)
+
+
+def is_duplicate(topic: str, data: Any, raw: Optional[str]) -> bool:
+    """Camada em memória, chamada na recepção de cada mensagem."""
+    if dedup_filter is None:
+        return False
+    key = message_key(topic, data, raw)
+    return key is not None and dedup_filter.seen(key)
+
+
+def dedup_column_for(table: str) -> Optional[str]:
+    """Coluna da chave nesta tabela, se configurada e presente no schema (introspectado)."""
+    if not MQTT_DEDUP_COLUMN or MQTT_DEDUP == "none":
+        return None
+    info = table_registry.get(table)
+    if info is None or MQTT_DEDUP_COLUMN not in info.columns or not info.introspected:
+        return None
+    return MQTT_DEDUP_COLUMN
+
+
+def dedup_ddl(table: str) -> str:
+    """DDL online para a coluna da chave + índice UNIQUE (NULL = sem chave, não conflita)."""
+    return (f"ALTER TABLE `{table}` ADD COLUMN `{MQTT_DEDUP_COLUMN}` CHAR(32) NULL, "
+            f"ADD UNIQUE INDEX `{f'uq_{table}_{MQTT_DEDUP_COLUMN}'[:64]}` (`{MQTT_DEDUP_COLUMN}`), ALGORITHM=INPLACE, LOCK=NONE")
+
+
+def check_dedup_schema() -> List[str]:
+    """Startup: avisa quais tabelas graváveis não têm a coluna de deduplicação (com o DDL sugerido)."""
+    if not MQTT_DEDUP_COLUMN or MQTT_DEDUP == "none":
+        return []
+    missing = []
+    for info in table_registry:
+        if not info.allows(OP_INSERT) or not info.introspected:
+            continue
+        if MQTT_DEDUP_COLUMN not in info.columns:
+            missing.append(info.name)
+            logger.warning(f"Tabela '{info.name}' sem a coluna de deduplicação '{MQTT_DEDUP_COLUMN}': "
+                           f"apenas a janela em memória vale para ela. Sugestão: {dedup_ddl(info.name)}")
+        elif not any(columns == (MQTT_DEDUP_COLUMN,) for columns in info.indexes.values()):
+            logger.warning(f"Coluna '{info.name}.{MQTT_DEDUP_COLUMN}' sem índice próprio (precisa ser UNIQUE): reenvios podem duplicar linhas.")
+    return missing
@@ -1,23 +1,65 @@
 import os
+import time
+import asyncio
 import uuid
 import json
 import logging
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, Tuple, List
 
 # Bibliotecas MQTT
 import paho.mqtt.client as mqtt
+from mysql.connector import errors as mysql_errors
+from model.db import PoolTimeoutError
 from dotenv import load_dotenv
 
 # Importa a função DAO para acesso ao DB
-from utils.function_execute import execute 
-# Importa o modelo Pydantic unificado
-from model.models import PedidosBase 
+from utils.function_execute import db, execute, execute_statement, execute_many, execute_batches, execute_batches_async
+# Cache de SQL por (tabela, colunas): o caminho quente não monta strings
+from model.statement_cache import CompiledStatement, statements
+# Mapeamento tabela -> modelo (pré-compilação dos comandos no start)
+from model.model_resolver import TABLE_MODEL_MAPPING
+# Chave primária de cada tabela (registro montado no startup)
+from model.table_registry import table_registry
+# Cache de leitura das rotas GET: invalidado a cada gravação da ingestão
+from utils.query_cache import query_cache
+# Validação em lote com TypeAdapter(list[Model]) em cache por modelo (e a validação de uma linha)
+from utils.dependencies import validate_bulk_core, validate_data_core
+# JSON rápido (orjson quando instalado)
+from utils import fast_json
+# Roteamento tópico -> tabela/modelo/campos (trie de filtros MQTT)
+from model.topic_router import TopicRouter, load_routes
+# Escala horizontal: assinatura compartilhada (MQTT v5) ou um único coletor ativo (liderança)
+from model.mqtt_coordinator import (
+    COORDINATION_LEADER, COORDINATION_MODES, COORDINATION_SHARED,
+    FileLeaderLock, LeaderElector, LeaderLock, MySQLLeaderLock, shared_topic,
+)
+# Fila limitada + flush em lotes (tira o DB da thread de rede do paho)
+from model.ingest_pipeline import IngestPipeline, IngestRecord
+# Motor MQTT assíncrono (aiomqtt) no event loop do FastAPI, gravando pelo pool aiomysql
+from model.mqtt_engine import AsyncMQTTEngine, HAS_AIOMQTT
+# Log local segmentado (falhas/excedente da fila) + thread que o reenvia ao MySQL
+from model.spill_log import SpillLog, SpillReplayer
+# Deduplicação de reentregas (QoS 1/2): janela em memória na recepção + chave UNIQUE no lote
+from model.dedup import dedup_column_for, dedup_filter, is_duplicate, message_key
+# Fan-out em tempo real (WebSocket/SSE) direto da recepção, sem passar pelo DB
+from model.live_hub import live_hub
+# Agregados por tópico/balde de tempo (count/sum/min/max/last) gravados periodicamente em `mqtt_rollups`
+from model.rollups import ROLLUP_TABLE, RollupAggregator, RollupFlusher
+# Métricas por estágio (receive/decode/queue/validate/persist) e gauges da fila
+from utils.metrics import METRICS_ENABLED, MQTT_MESSAGES_TOTAL, MQTT_STAGE_SECONDS, register_gauge
+# Amostragem dos logs por mensagem (payloads e erros repetidos)
+from utils.logging_config import LogSampler, LOG_PAYLOAD_SAMPLE_EVERY, LOG_PAYLOAD_MAX_PER_SECOND
 
 # Carrega as variáveis de ambiente
 load_dotenv()
 
 # Configuração de Log
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__) # Logger do módulo (configurado em utils/logging_config.py).
+# Payloads: 1 a cada N mensagens (máx. M/s). Erros por mensagem: todos, mas no máximo M/s (um flood não inunda o stdout).
+payload_sampler = LogSampler(every=LOG_PAYLOAD_SAMPLE_EVERY, max_per_second=LOG_PAYLOAD_MAX_PER_SECOND)
+error_sampler = LogSampler(every=1, max_per_second=LOG_PAYLOAD_MAX_PER_SECOND)
+# Tamanho máximo do payload reproduzido nos logs
+LOG_PAYLOAD_MAX_CHARS = 512
 
 # Configurações do Broker MQTT
 MQTT_BROKER = os.getenv("MQTT_BROKER")
@@ -25,111 +67,687 @@ MQTT_PORT = int(os.getenv("MQTT_PORT", 8883))
 MQTT_TOPIC = os.getenv("MQTT_TOPIC", "bancada/camila/#") 
 MQTT_USER = os.getenv("MQTT_USER")
 MQTT_PSWD = os.getenv("MQTT_PSWD")
+# QoS da assinatura: 0 (padrão), 1 ou 2. Com QoS > 0 o broker reentrega o que não foi confirmado (ver MQTT_DEDUP).
+MQTT_QOS = int(os.getenv("MQTT_QOS", 0))
+# Sessão persistente (MQTT_CLEAN_SESSION=false): o broker guarda as mensagens QoS > 0 enquanto o coletor está fora.
+# Exige um ID fixo (MQTT_CLIENT_ID); sem ele, cada start usa um ID aleatório e a sessão anterior se perde.
+MQTT_CLEAN_SESSION = os.getenv("MQTT_CLEAN_SESSION", "true").lower() in ("1", "true", "yes")
+MQTT_CLIENT_ID = os.getenv("MQTT_CLIENT_ID")
+
+# Motor de coleta: async (aiomqtt no event loop da API, padrão) | thread (paho em thread própria + workers)
+MQTT_ENGINE = os.getenv("MQTT_ENGINE", "async").lower()
+# Inicia a coleta junto com a API (lifespan) quando MQTT_BROKER está configurado
+MQTT_AUTOSTART = os.getenv("MQTT_AUTOSTART", "true").lower() in ("1", "true", "yes")
+# Reconexão do motor async: backoff exponencial entre as tentativas (segundos)
+MQTT_RECONNECT_MIN = float(os.getenv("MQTT_RECONNECT_MIN", 1.0))
+MQTT_RECONNECT_MAX = float(os.getenv("MQTT_RECONNECT_MAX", 60.0))
+
+# Vários processos/réplicas: none (cada processo assina tudo) | shared ($share/grupo, MQTT v5) | leader (um ativo por vez)
+MQTT_COORDINATION = os.getenv("MQTT_COORDINATION", "none").lower()
+MQTT_SHARED_GROUP = os.getenv("MQTT_SHARED_GROUP", "camila-collectors")
+# Versão do protocolo: "5" ou "3.1.1" (padrão: 5 no modo shared, 3.1.1 nos demais)
+MQTT_PROTOCOL = os.getenv("MQTT_PROTOCOL", "5" if MQTT_COORDINATION == COORDINATION_SHARED else "3.1.1")
+# Modo leader: trava por arquivo (mesmo host) ou GET_LOCK do MySQL (várias máquinas)
+MQTT_LEADER_LOCK = os.getenv("MQTT_LEADER_LOCK", "file") # file | mysql
+MQTT_LEADER_LOCK_FILE = os.getenv("MQTT_LEADER_LOCK_FILE", "mqtt_leader.lock")
+MQTT_LEADER_LOCK_NAME = os.getenv("MQTT_LEADER_LOCK_NAME", "camila_mqtt_collector")
+MQTT_LEADER_INTERVAL = float(os.getenv("MQTT_LEADER_INTERVAL", 5.0))
+
+# Configurações da fila de ingestão em lotes
+MQTT_INGEST_MAX_QUEUE = int(os.getenv("MQTT_INGEST_MAX_QUEUE", 10000))
+MQTT_INGEST_BATCH_SIZE = int(os.getenv("MQTT_INGEST_BATCH_SIZE", 500))
+MQTT_INGEST_FLUSH_INTERVAL = float(os.getenv("MQTT_INGEST_FLUSH_INTERVAL", 1.0))
+MQTT_INGEST_BACKPRESSURE = os.getenv("MQTT_INGEST_BACKPRESSURE", "block") # block | drop_oldest | spill (só no motor thread)
+MQTT_INGEST_BLOCK_TIMEOUT = float(os.getenv("MQTT_INGEST_BLOCK_TIMEOUT", 1.0))
+# Spill: diretório dos segmentos onde vão os lotes que falharam no DB e o excedente da fila (reenviados depois)
+MQTT_INGEST_SPILL_PATH = os.getenv("MQTT_INGEST_SPILL_PATH", "mqtt_spill")
+MQTT_SPILL_ENABLED = os.getenv("MQTT_SPILL_ENABLED", "true").lower() in ("1", "true", "yes")
+MQTT_SPILL_SEGMENT_MB = float(os.getenv("MQTT_SPILL_SEGMENT_MB", 64))
+MQTT_SPILL_FSYNC = os.getenv("MQTT_SPILL_FSYNC", "false").lower() in ("1", "true", "yes")
+MQTT_SPILL_REPLAY_INTERVAL = float(os.getenv("MQTT_SPILL_REPLAY_INTERVAL", 2.0))
+MQTT_SPILL_REPLAY_MAX_BACKOFF = float(os.getenv("MQTT_SPILL_REPLAY_MAX_BACKOFF", 60.0))
+# Lote envenenado: falhas do mesmo lote do spill COM o DB respondendo a `SELECT 1` antes do dead-letter.
+# Com o DB fora, o replay tenta para sempre (a queda custa atraso, não dados).
+MQTT_SPILL_REPLAY_MAX_ATTEMPTS = int(os.getenv("MQTT_SPILL_REPLAY_MAX_ATTEMPTS", 20))
+
+# Rollups: campos numéricos do payload (caminhos, separados por vírgula) agregados por resolução (segundos)
+MQTT_ROLLUP_ENABLED = os.getenv("MQTT_ROLLUP_ENABLED", "true").lower() in ("1", "true", "yes")
+MQTT_ROLLUP_FIELDS = [field.strip() for field in os.getenv("MQTT_ROLLUP_FIELDS", "valor").split(",") if field.strip()]
+MQTT_ROLLUP_RESOLUTIONS = [int(value) for value in os.getenv("MQTT_ROLLUP_RESOLUTIONS", "60,3600").split(",") if value.strip()]
+MQTT_ROLLUP_FLUSH_INTERVAL = float(os.getenv("MQTT_ROLLUP_FLUSH_INTERVAL", 10.0))
+# Pool de workers que persistem os lotes (a thread do paho só recebe e enfileira)
+MQTT_INGEST_WORKERS = int(os.getenv("MQTT_INGEST_WORKERS", 4))
+# true: mensagens de um mesmo tópico são persistidas na ordem de chegada
+MQTT_INGEST_ORDERED = os.getenv("MQTT_INGEST_ORDERED", "true").lower() in ("1", "true", "yes")
+# Rotas tópico -> tabela (JSON). Vazio: tudo vai para `pedidos`, como antes do roteamento.
+MQTT_ROUTES_FILE = os.getenv("MQTT_ROUTES_FILE")
 
 # Variável global para armazenar a instância do cliente MQTT
 mqtt_client: Optional[mqtt.Client] = None
+# Variável global para a fila de ingestão (criada em start_mqtt_client)
+ingest_pipeline: Optional[IngestPipeline] = None
+# Variáveis globais do spill (criadas junto com a fila, se MQTT_SPILL_ENABLED)
+spill_log: Optional[SpillLog] = None
+spill_replayer: Optional[SpillReplayer] = None
+# Variáveis globais dos rollups (criadas junto com a fila, se MQTT_ROLLUP_ENABLED)
+rollup_aggregator: Optional[RollupAggregator] = None
+rollup_flusher: Optional[RollupFlusher] = None
+# Variável global para as rotas de tópico compiladas (carregadas em start_mqtt_client ou no primeiro uso)
+topic_router: Optional[TopicRouter] = None
+# Variável global para a disputa de liderança (apenas no modo leader)
+leader_elector: Optional[LeaderElector] = None
+# Variável global do motor async (MQTT_ENGINE=async) e do event loop em que ele roda
+mqtt_engine: Optional[AsyncMQTTEngine] = None
+engine_loop: Optional[asyncio.AbstractEventLoop] = None
 
 # --- FUNÇÕES DE CALLBACKS DO PAHO-MQTT ---
 
-def on_connect(client, userdata, flags, rc):
-    """Chamado quando o cliente recebe uma resposta CONNACK do broker."""
+def _subscription_topic() -> str:
+    """Filtro assinado: `$share/<grupo>/<MQTT_TOPIC>` no modo shared, senão o próprio `MQTT_TOPIC`."""
+    if MQTT_COORDINATION == COORDINATION_SHARED:
+        return shared_topic(MQTT_TOPIC, MQTT_SHARED_GROUP)
+    return MQTT_TOPIC
+
+def on_connect(client, userdata, flags, rc, properties=None):
+    """Chamado quando o cliente recebe uma resposta CONNACK do broker (`properties` só no MQTT v5)."""
     if rc == 0:
-        logging.info("--- CONEXÃO MQTT SUCESSO ---: Conectado ao Broker.")
-        result, mid = client.subscribe(MQTT_TOPIC, qos=0) 
+        logger.info("--- CONEXÃO MQTT SUCESSO ---: Conectado ao Broker.")
+        topic = _subscription_topic()
+        result, mid = client.subscribe(topic, qos=MQTT_QOS)
         if result == mqtt.MQTT_ERR_SUCCESS:
-            logging.info(f"--- SUBSTRIÇÃO SUCESSO ---: Subscrição em '{MQTT_TOPIC}' enviada.")
+            logger.info(f"--- SUBSTRIÇÃO SUCESSO ---: Subscrição em '{topic}' enviada.")
         else:
-            logging.error(f"--- ERRO SUBSTRIÇÃO ---: Falha ao enviar comando de subscrição. Código: {result}")
+            logger.error(f"--- ERRO SUBSTRIÇÃO ---: Falha ao enviar comando de subscrição. Código: {result}")
     else:
-        logging.error(f"--- ERRO CONEXÃO MQTT ---: Falha na conexão, código de retorno: {rc}.")
+        logger.error(f"--- ERRO CONEXÃO MQTT ---: Falha na conexão, código de retorno: {rc}.")
+
+def _log_payload_sample(topic: str, payload_str: str, size: int) -> None:
+    if payload_sampler.allow() and logger.isEnabledFor(logging.INFO):
+        logger.info("Mensagem MQTT (amostra)", extra={
+            "topic": topic, "payload": payload_str[:LOG_PAYLOAD_MAX_CHARS],
+            "bytes": size, "suppressed": payload_sampler.suppressed,
+        })
+
+def _on_payload(topic: str, payload_str: str, size: int) -> None:
+    """Mensagem decodificada: log amostrado e entrega aos assinantes em tempo real (antes da fila de gravação)."""
+    _log_payload_sample(topic, payload_str, size)
+    live_hub.publish(topic, payload_str)
 
 def on_message(client, userdata, msg):
     """Chamado quando uma mensagem é recebida do broker."""
-    logging.info("--- ESTÁGIO 1: INFO CHEGOU ---") 
+    started = time.perf_counter() if METRICS_ENABLED else 0.0
 
     try:
         payload_str = msg.payload.decode('utf-8')
-        data = json.loads(payload_str)
-        logging.info(f"Tópico: {msg.topic}, Payload Bruto: {payload_str}")
+        data = fast_json.loads(payload_str)
+        if METRICS_ENABLED:
+            MQTT_STAGE_SECONDS.observe(time.perf_counter() - started, "decode")
+            MQTT_MESSAGES_TOTAL.inc(1, "received")
+        if is_duplicate(msg.topic, data, payload_str):
+            MQTT_MESSAGES_TOTAL.inc(1, "duplicate") # Reentrega (QoS 1/2) já recebida dentro da janela.
+            return
+        _on_payload(msg.topic, payload_str, len(msg.payload))
 
-        # CHAMA A FUNÇÃO DE PERSISTÊNCIA CORRIGIDA
-        save_data_to_db(msg.topic, data)
+        # Apenas enfileira: a persistência acontece em lote na thread de flush.
+        if ingest_pipeline is not None:
+            # O payload original segue junto: ele já é o JSON que vai para a coluna de valor.
+            ingest_pipeline.submit(IngestRecord(msg.topic, data, time.time(), payload_str))
+        else:
+            save_data_to_db(msg.topic, data, raw=payload_str)
         
     except json.JSONDecodeError:
-        logging.error(f"ERRO DE PARSE: Mensagem não é um JSON válido. Payload: {payload_str}")
+        MQTT_MESSAGES_TOTAL.inc(1, "invalid_json")
+        if error_sampler.allow():
+            logger.error("ERRO DE PARSE: Mensagem não é um JSON válido.", extra={
+                "topic": msg.topic, "payload": payload_str[:LOG_PAYLOAD_MAX_CHARS], "suppressed": error_sampler.suppressed,
+            })
     except Exception as e:
-        logging.error(f"ERRO INESPERADO no on_message: {e}")
+        MQTT_MESSAGES_TOTAL.inc(1, "error")
+        if error_sampler.allow():
+            logger.error(f"ERRO INESPERADO no on_message: {e}", extra={"topic": msg.topic, "suppressed": error_sampler.suppressed})
+    finally:
+        if METRICS_ENABLED:
+            # Tempo total dentro do callback do paho (inclui espera por espaço na fila com backpressure=block).
+            MQTT_STAGE_SECONDS.observe(time.perf_counter() - started, "receive")
 
 # --- FUNÇÕES DE CONTROLE DO CLIENTE ---
 
-def start_mqtt_client(client_id: str = "FastAPICamilaCollector") -> Optional[mqtt.Client]:
+def _build_leader_lock() -> LeaderLock:
+    if MQTT_LEADER_LOCK == "mysql":
+        return MySQLLeaderLock(MQTT_LEADER_LOCK_NAME, db.dedicated_connection)
+    if MQTT_LEADER_LOCK == "file":
+        return FileLeaderLock(MQTT_LEADER_LOCK_FILE)
+    raise ValueError(f"MQTT_LEADER_LOCK inválido: '{MQTT_LEADER_LOCK}'. Use 'file' ou 'mysql'.")
+
+def _check_config() -> bool:
+    """Erros de configuração aparecem no start, não na primeira mensagem."""
+    statements.precompile(TABLE_MODEL_MAPPING, table_registry.primary_keys())
+    try:
+        get_topic_router()
+        if MQTT_COORDINATION not in COORDINATION_MODES:
+            raise ValueError(f"MQTT_COORDINATION inválido: '{MQTT_COORDINATION}'. Use {COORDINATION_MODES}.")
+        if MQTT_ENGINE not in ("async", "thread"):
+            raise ValueError(f"MQTT_ENGINE inválido: '{MQTT_ENGINE}'. Use 'async' ou 'thread'.")
+        if MQTT_QOS not in (0, 1, 2):
+            raise ValueError(f"MQTT_QOS inválido: {MQTT_QOS}. Use 0, 1 ou 2.")
+        if not MQTT_CLEAN_SESSION and not MQTT_CLIENT_ID:
+            raise ValueError("MQTT_CLEAN_SESSION=false exige MQTT_CLIENT_ID (ID fixo da sessão persistente).")
+        _subscription_topic()
+    except Exception as e:
+        logger.error(f"Configuração MQTT inválida: {e}")
+        return False
+    return True
+
+def _use_async_engine() -> bool:
+    if MQTT_ENGINE == "async" and not HAS_AIOMQTT:
+        logger.warning("MQTT_ENGINE=async, mas o pacote 'aiomqtt' não está instalado: usando o motor em thread (paho).")
+        return False
+    return MQTT_ENGINE == "async"
+
+def _client_identifier(client_id: str) -> str:
+    """ID fixo (MQTT_CLIENT_ID, sessão persistente) ou um ID único por start."""
+    return MQTT_CLIENT_ID or f"{client_id}-{uuid.uuid4().hex[:8]}"
+
+async def start_collector(client_id: str = "FastAPICamilaCollector") -> bool:
+    """
+    Ativa a coleta a partir do event loop (lifespan ou rota). Com o motor async, o cliente roda como tarefas deste
+    loop; com o motor em thread, delega para `start_mqtt_client`.
+    """
+    global leader_elector, engine_loop
+    if not _use_async_engine():
+        return await asyncio.to_thread(start_mqtt_client, client_id)
+    if not _check_config():
+        return False
+    engine_loop = asyncio.get_running_loop()
+    if MQTT_COORDINATION == COORDINATION_LEADER:
+        if leader_elector is None:
+            try:
+                lock = _build_leader_lock()
+            except ValueError as e:
+                logger.error(str(e))
+                return False
+            # A disputa roda em thread; ligar/desligar o motor é agendado no event loop.
+            leader_elector = LeaderElector(
+                lock,
+                on_elected=lambda: asyncio.run_coroutine_threadsafe(_connect_engine(client_id), engine_loop).result(),
+                on_demoted=lambda: asyncio.run_coroutine_threadsafe(_disconnect_engine(), engine_loop).result(),
+                interval=MQTT_LEADER_INTERVAL,
+            )
+        leader_elector.start()
+        return True
+    return await _connect_engine(client_id)
+
+async def stop_collector() -> bool:
+    """Desativa a coleta iniciada por `start_collector` (drena a fila e faz o último flush)."""
+    global leader_elector
+    if mqtt_engine is None and not (leader_elector is not None and engine_loop is not None):
+        return await asyncio.to_thread(stop_mqtt_client)
+    if leader_elector is not None:
+        # Em outra thread: o `on_demoted` do líder precisa do event loop livre para parar o motor.
+        await asyncio.to_thread(leader_elector.stop)
+        leader_elector = None
+        return True
+    return await _disconnect_engine()
+
+async def _connect_engine(client_id: str) -> bool:
+    """Cria o motor async (e o spill/rollups) e inicia a conexão; a reconexão é automática."""
+    global mqtt_engine
+    _ensure_ingest_support()
+    _start_ingest_support()
+    unique_id = _client_identifier(client_id)
+    try:
+        mqtt_engine = AsyncMQTTEngine(
+            persist_batch=save_batch_to_db_async,
+            hostname=MQTT_BROKER,
+            port=MQTT_PORT,
+            topic=_subscription_topic(),
+            username=MQTT_USER,
+            password=MQTT_PSWD,
+            identifier=unique_id,
+            protocol=MQTT_PROTOCOL,
+            qos=MQTT_QOS,
+            clean_session=MQTT_CLEAN_SESSION,
+            max_queue=MQTT_INGEST_MAX_QUEUE,
+            batch_size=MQTT_INGEST_BATCH_SIZE,
+            flush_interval=MQTT_INGEST_FLUSH_INTERVAL,
+            consumers=MQTT_INGEST_WORKERS,
+            ordered=MQTT_INGEST_ORDERED,
+            min_backoff=MQTT_RECONNECT_MIN,
+            max_backoff=MQTT_RECONNECT_MAX,
+            on_failed_batch=_spill_failed_batch,
+            on_payload=_on_payload,
+            is_duplicate=is_duplicate,
+        )
+    except (RuntimeError, ValueError) as e:
+        logger.error(f"Falha ao criar o motor MQTT async: {e}")
+        await asyncio.to_thread(_stop_ingest_support)
+        return False
+    await mqtt_engine.start()
+    logger.info(f"Motor MQTT async iniciado no event loop da API (ID ÚNICO: {unique_id}).")
+    return True
+
+async def _disconnect_engine() -> bool:
+    global mqtt_engine
+    if mqtt_engine is not None:
+        await mqtt_engine.stop()
+        logger.info(f"Motor MQTT async parado. Estatísticas: {mqtt_engine.stats()}")
+        mqtt_engine = None
+    await asyncio.to_thread(_stop_ingest_support)
+    return True
+
+async def _spill_failed_batch(records: List[IngestRecord], error: Exception) -> None:
+    """Lote rejeitado pelo motor async: vai para o spill (reenviado depois pelo replayer)."""
+    if spill_log is not None:
+        await asyncio.to_thread(spill_log.append, records)
+
+def start_mqtt_client(client_id: str = "FastAPICamilaCollector") -> bool:
+    """
+    Ativa a coleta no motor em thread (paho). Nos modos none/shared, conecta o cliente imediatamente; no modo leader,
+    inicia a disputa de liderança e o cliente só conecta no processo que obtiver a trava (os demais ficam em standby).
+    """
+    global leader_elector
+    if not _check_config():
+        return False
+
+    if MQTT_COORDINATION == COORDINATION_LEADER:
+        if leader_elector is None:
+            try:
+                lock = _build_leader_lock()
+            except ValueError as e:
+                logger.error(str(e))
+                return False
+            leader_elector = LeaderElector(
+                lock,
+                on_elected=lambda: _connect_client(client_id) is not None,
+                on_demoted=_disconnect_client,
+                interval=MQTT_LEADER_INTERVAL,
+            )
+        leader_elector.start()
+        return True
+    return _connect_client(client_id) is not None
+
+def _ensure_ingest_support() -> None:
+    """Cria (uma vez) os rollups, o spill e o replayer, comuns aos dois motores."""
+    global spill_log, spill_replayer, rollup_aggregator, rollup_flusher
+    if MQTT_ROLLUP_ENABLED and rollup_aggregator is None:
+        rollup_aggregator = RollupAggregator(MQTT_ROLLUP_FIELDS, MQTT_ROLLUP_RESOLUTIONS)
+        rollup_flusher = RollupFlusher(
+            rollup_aggregator,
+            execute=execute,
+            execute_many=execute_many,
+            interval=MQTT_ROLLUP_FLUSH_INTERVAL,
+            on_flushed=lambda: query_cache.invalidate(ROLLUP_TABLE),
+        )
+    if MQTT_SPILL_ENABLED and spill_log is None:
+        spill_log = SpillLog(MQTT_INGEST_SPILL_PATH, segment_max_bytes=int(MQTT_SPILL_SEGMENT_MB * 1024 * 1024),
+                             fsync=MQTT_SPILL_FSYNC)
+        # O replay usa o caminho síncrono (pool mysql-connector) em sua thread: é recuperação, não o caminho quente.
+        spill_replayer = SpillReplayer(
+            spill_log,
+            persist_batch=save_batch_to_db,
+            batch_size=MQTT_INGEST_BATCH_SIZE,
+            interval=MQTT_SPILL_REPLAY_INTERVAL,
+            max_backoff=MQTT_SPILL_REPLAY_MAX_BACKOFF,
+            max_attempts=MQTT_SPILL_REPLAY_MAX_ATTEMPTS,
+            is_retryable=_is_transient_db_error,
+            is_healthy=_db_reachable,
+            can_replay=_live_queue_has_room,
+        )
+
+def _start_ingest_support() -> None:
+    if spill_replayer is not None:
+        spill_replayer.start() # Reenvia também o que ficou no disco de execuções anteriores.
+    if rollup_flusher is not None:
+        rollup_flusher.start()
+
+def _stop_ingest_support() -> None:
+    """Para o replayer, fecha o segmento ativo do spill e faz o último flush dos rollups."""
+    if spill_replayer is not None:
+        spill_replayer.stop(timeout=30)
+    if spill_log is not None:
+        spill_log.seal()
+    if rollup_flusher is not None:
+        rollup_flusher.stop(timeout=30) # Último flush dos agregados em memória.
+
+def _connect_client(client_id: str) -> Optional[mqtt.Client]:
     """Inicializa e conecta o cliente MQTT com um ID único."""
-    global mqtt_client
+    global mqtt_client, ingest_pipeline
+    # A fila começa antes do cliente para que nenhuma mensagem chegue sem destino.
+    _ensure_ingest_support()
+    if ingest_pipeline is None:
+        ingest_pipeline = IngestPipeline(
+            persist_batch=save_batch_to_db,
+            max_queue=MQTT_INGEST_MAX_QUEUE,
+            batch_size=MQTT_INGEST_BATCH_SIZE,
+            flush_interval=MQTT_INGEST_FLUSH_INTERVAL,
+            backpressure=MQTT_INGEST_BACKPRESSURE,
+            block_timeout=MQTT_INGEST_BLOCK_TIMEOUT,
+            spill=spill_log,
+            workers=MQTT_INGEST_WORKERS,
+            ordered=MQTT_INGEST_ORDERED,
+        )
+    ingest_pipeline.start()
+    _start_ingest_support()
+
     # CORREÇÃO CRÍTICA: Gera um ID ÚNICO.
-    unique_id = f"{client_id}-{uuid.uuid4().hex[:8]}" 
-    logging.info(f"Iniciando Cliente MQTT com ID ÚNICO: {unique_id}")
+    unique_id = _client_identifier(client_id)
+    logger.info(f"Iniciando Cliente MQTT com ID ÚNICO: {unique_id}")
 
-    mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, client_id=unique_id)
+    protocol = mqtt.MQTTv5 if MQTT_PROTOCOL == "5" else mqtt.MQTTv311
+    # MQTT v5 usa `clean_start` no CONNECT; v3.1.1 usa `clean_session` no cliente.
+    clean_session = None if protocol == mqtt.MQTTv5 else MQTT_CLEAN_SESSION
+    mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, client_id=unique_id, protocol=protocol,
+                              clean_session=clean_session)
     mqtt_client.username_pw_set(MQTT_USER, MQTT_PSWD)
 
     mqtt_client.on_connect = on_connect
     mqtt_client.on_message = on_message
 
     try:
-        mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
+        if protocol == mqtt.MQTTv5:
+            mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60, clean_start=MQTT_CLEAN_SESSION)
+        else:
+            mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
         mqtt_client.loop_start() 
-        logging.info("Loop MQTT iniciado em thread separada.")
+        logger.info("Loop MQTT iniciado em thread separada.")
         return mqtt_client
     
     except Exception as e:
-        logging.error(f"Falha ao conectar ao Broker MQTT em {MQTT_BROKER}:{MQTT_PORT}. Erro: {e}")
+        logger.error(f"Falha ao conectar ao Broker MQTT em {MQTT_BROKER}:{MQTT_PORT}. Erro: {e}")
+        _stop_ingest()
         return None
 
-def stop_mqtt_client():
-    """Para o cliente MQTT e a thread de loop."""
+def stop_mqtt_client() -> bool:
+    """Desativa a coleta: encerra a disputa de liderança (liberando a trava) e/ou o cliente MQTT."""
+    global leader_elector
+    if leader_elector is not None:
+        leader_elector.stop() # Se for o líder, desconecta o cliente via `_disconnect_client`.
+        leader_elector = None
+        return True
+    return _disconnect_client()
+
+def _disconnect_client() -> bool:
+    """Para o cliente MQTT e a thread de loop, e faz o flush final da fila de ingestão."""
     global mqtt_client
+    stopped = True
     if mqtt_client:
-        mqtt_client.loop_stop()
-        mqtt_client.disconnect()
-        logging.info("Cliente MQTT desconectado e loop parado.")
+        try:
+            mqtt_client.loop_stop()
+            mqtt_client.disconnect()
+            logger.info("Cliente MQTT desconectado e loop parado.")
+        except Exception as e:
+            logger.error(f"Falha ao desconectar o cliente MQTT: {e}")
+            stopped = False
+        mqtt_client = None
+    _stop_ingest()
+    return stopped
 
+def _stop_ingest() -> None:
+    """Drena a fila (o que falhar vai para o spill), para o replayer e fecha o segmento ativo."""
+    if ingest_pipeline is not None:
+        # Sem novas mensagens chegando, drena o que restou na fila antes de encerrar.
+        ingest_pipeline.stop()
+        logger.info(f"Fila de ingestão drenada. Estatísticas: {ingest_pipeline.stats()}")
+    _stop_ingest_support()
 
-# --- LÓGICA DE PERSISTÊNCIA NA TABELA 'pedidos' ---
+# "MySQL server has gone away" / "Lost connection to MySQL server during query".
+_CONNECTION_LOST_ERRNOS = (2006, 2013)
 
-def save_data_to_db(topic: str, data: Dict[str, Any]):
+def _db_reachable() -> bool:
+    """Sonda do replayer: o MySQL responde a um `SELECT 1`?"""
+    try:
+        execute("SELECT 1")
+        return True
+    except Exception:
+        return False
+
+def _is_transient_db_error(error: Exception) -> bool:
     """
-    Mapeia os dados MQTT para as colunas tipo_do_pedido e valor_do_pedido
-    da tabela 'pedidos' e persiste usando o DAO.
+    Só falhas de conexão/disponibilidade se resolvem repetindo (lista fechada). Todo o resto, inclusive erros de
+    dado do MySQL levantados como `DatabaseError` genérico (ex.: 1366 no modo strict) e exceções do roteamento e da
+    validação, é permanente: vai para o dead-letter em vez de travar o replay.
     """
-    table_name = "pedidos" 
-    
-    # --- 1. Mapeamento e Validação para a Tabela 'pedidos' ---
-    data_to_map = {
-        # O tópico é a categoria do dado (ex: bancada/camila/sensor/temperatura)
-        "tipo_do_pedido": topic, 
-        # O payload JSON completo é salvo como string na coluna de valor.
-        "valor_do_pedido": json.dumps(data) 
-    }
-    
+    cause = error.__cause__ or error # O DAO embrulha o erro do MySQL em HTTPException (`raise ... from e`).
+    if isinstance(cause, (mysql_errors.InterfaceError, mysql_errors.OperationalError, PoolTimeoutError, asyncio.TimeoutError)):
+        return True
+    return getattr(cause, "errno", None) in _CONNECTION_LOST_ERRNOS
+
+def _live_queue_has_room() -> bool:
+    """O replay só compete com a ingestão ao vivo quando a fila está com menos da metade da capacidade."""
+    if mqtt_engine is not None:
+        return mqtt_engine.stats()["queue_depth"] < mqtt_engine.max_queue // 2
+    return ingest_pipeline is None or ingest_pipeline.stats()["queue_depth"] < ingest_pipeline.max_queue // 2
+
+def get_mqtt_status() -> bool:
+    """Retorna True se o cliente MQTT (motor async ou paho) existe e está conectado ao broker."""
+    if mqtt_engine is not None:
+        return mqtt_engine.connected
+    return mqtt_client is not None and mqtt_client.is_connected()
+
+def is_mqtt_enabled() -> bool:
+    """True se a coleta foi ativada neste processo (conectada, reconectando ou disputando a liderança em standby)."""
+    return get_mqtt_status() or (mqtt_engine is not None and mqtt_engine.is_running()) or leader_elector is not None
+
+def get_coordination_status() -> Dict[str, Any]:
+    """Modo de coordenação entre processos, filtro assinado e papel deste processo (leader/standby)."""
+    status: Dict[str, Any] = {"mode": MQTT_COORDINATION, "engine": "async" if mqtt_engine is not None else MQTT_ENGINE,
+                              "protocol": MQTT_PROTOCOL, "pid": os.getpid()}
+    if MQTT_COORDINATION == COORDINATION_SHARED:
+        status["subscription"] = shared_topic(MQTT_TOPIC, MQTT_SHARED_GROUP)
+    if leader_elector is not None:
+        status.update(leader_elector.stats())
+    return status
+
+def get_ingest_stats() -> Optional[Dict[str, Any]]:
+    """Profundidade das filas, contadores, utilização dos workers e estado do spill (None se nunca iniciada)."""
+    if mqtt_engine is not None:
+        stats = mqtt_engine.stats()
+    elif ingest_pipeline is not None:
+        stats = ingest_pipeline.stats()
+    else:
+        return None
+    stats["spill"] = spill_replayer.stats() if spill_replayer is not None else None
+    stats["rollups"] = rollup_flusher.stats() if rollup_flusher is not None else None
+    stats["dedup"] = dedup_filter.stats() if dedup_filter is not None else None
+    return stats
+
+
+def _ingest_queue_samples():
+    stats = get_ingest_stats()
+    if stats is None:
+        return
+    if "workers" not in stats: # Motor async: uma única fila compartilhada pelos consumidores.
+        yield {"worker": "async"}, stats["queue_depth"]
+        return
+    for worker in stats["workers"]:
+        yield {"worker": str(worker["worker"])}, worker["queue_depth"]
+
+
+def _ingest_utilization_samples():
+    stats = get_ingest_stats()
+    if stats is None:
+        return
+    if "workers" not in stats:
+        yield {"worker": "async"}, stats["utilization"]
+        return
+    for worker in stats["workers"]:
+        yield {"worker": str(worker["worker"])}, worker["utilization"]
+
+
+def _ingest_counter_samples():
+    stats = get_ingest_stats()
+    if stats is None:
+        return
+    for event in ("received", "persisted", "batches", "dropped", "spilled", "failed"):
+        yield {"event": event}, stats.get(event, 0)
+
+
+def _spill_samples():
+    if spill_replayer is None:
+        return
+    stats = spill_replayer.stats()
+    yield {"measure": "pending_bytes"}, stats["pending_bytes"]
+    yield {"measure": "segments"}, stats["segments"]
+    yield {"measure": "replay_lag_seconds"}, stats["replay_lag_seconds"]
+
+
+# Lidos só no scrape de /metrics: nenhum custo extra por mensagem.
+register_gauge("mqtt_ingest_queue_depth", "Mensagens aguardando persistência, por worker.", _ingest_queue_samples)
+register_gauge("mqtt_ingest_worker_utilization", "Fração do tempo em que cada worker esteve gravando lotes.", _ingest_utilization_samples)
+register_gauge("mqtt_ingest_pipeline_events_total", "Contadores da fila de ingestão.", _ingest_counter_samples, kind="counter")
+register_gauge("mqtt_ingest_spill", "Spill local: bytes pendentes, segmentos e atraso do replay.", _spill_samples)
+
+
+# --- ROTEAMENTO TÓPICO -> TABELA E PERSISTÊNCIA ---
+
+def get_topic_router() -> TopicRouter:
+    """Rotas de tópico compiladas (carregadas de MQTT_ROUTES_FILE na primeira chamada)."""
+    global topic_router
+    if topic_router is None:
+        topic_router = load_routes(MQTT_ROUTES_FILE, TABLE_MODEL_MAPPING)
+        logger.info(f"Rotas MQTT carregadas: {topic_router.describe()}")
+    return topic_router
+
+
+def _log_unrouted(topic: str) -> None:
+    MQTT_MESSAGES_TOTAL.inc(1, "unrouted")
+    if error_sampler.allow():
+        logger.warning("Mensagem MQTT sem rota: descartada.", extra={"topic": topic, "suppressed": error_sampler.suppressed})
+
+
+BatchGroups = Dict[Tuple[str, Tuple[str, ...]], List[Tuple[Any, ...]]]
+
+
+def _prepare_batch(records: List[IngestRecord]) -> Tuple[BatchGroups, List[IngestRecord]]:
+    """
+    Roteia e valida um lote: retorna as linhas agrupadas por (tabela, colunas) e os registros aceitos.
+    Mensagens inválidas ou sem rota são descartadas individualmente (com log amostrado).
+    """
+    router = get_topic_router()
+    if METRICS_ENABLED:
+        # Espera na fila: do recebimento até o início do lote (uma amostra por mensagem).
+        now = time.time()
+        for record in records:
+            MQTT_STAGE_SECONDS.observe(now - record.received_at, "queue")
+    started = time.perf_counter()
+
+    # 1. Roteamento: agrupa as linhas (ainda não validadas) por tabela de destino.
+    by_table: Dict[str, Tuple[List[IngestRecord], List[Dict[str, Any]]]] = {}
+    for record in records:
+        route = router.match(record.topic)
+        if route is None:
+            _log_unrouted(record.topic)
+            continue
+        routed, payloads = by_table.setdefault(route.table, ([], []))
+        routed.append(record)
+        payloads.append(route.build_row(record.topic, record.data, record.raw))
+
+    # 2. Validação em lote por tabela; as linhas são agrupadas pelo conjunto de colunas (campos None ficam de fora).
+    groups: BatchGroups = {}
+    accepted: List[IngestRecord] = []
+    for table_name, (routed, payloads) in by_table.items():
+        result = validate_bulk_core(table_name, payloads)
+        dedup_column = dedup_column_for(table_name)
+        for error in result.errors:
+            MQTT_MESSAGES_TOTAL.inc(1, "invalid")
+            if error_sampler.allow():
+                logger.error(f"ERRO DE VALIDAÇÃO PYDANTIC para MQTT -> '{table_name}': {error['errors']}",
+                             extra={"topic": routed[error["index"]].topic, "suppressed": error_sampler.suppressed})
+        for index, data_to_insert in result.valid:
+            if dedup_column is not None:
+                record = routed[index]
+                data_to_insert[dedup_column] = message_key(record.topic, record.data, record.raw)
+            columns = tuple(data_to_insert)
+            groups.setdefault((table_name, columns), []).append(tuple(data_to_insert.values()))
+            accepted.append(routed[index])
+    MQTT_STAGE_SECONDS.observe(time.perf_counter() - started, "validate")
+    return groups, accepted
+
+
+def _insert_statement(table_name: str, columns: Tuple[str, ...]) -> CompiledStatement:
+    """Com a coluna de deduplicação no lote, linhas já gravadas (índice UNIQUE) são ignoradas: reenvio idempotente."""
+    if dedup_column_for(table_name) in columns:
+        return statements.insert_ignore_duplicates(table_name, columns, table_registry.get(table_name).pk)
+    return statements.insert(table_name, columns)
+
+
+def _batch_persisted(table_name: str, rows: int) -> None:
+    MQTT_MESSAGES_TOTAL.inc(rows, "persisted")
+    query_cache.invalidate(table_name)
+    logger.debug("--- ESTÁGIO 3: DB PERSISTIDO (LOTE) ---", extra={"table": table_name, "rows": rows})
+
+
+def _after_commit(groups: BatchGroups, accepted: List[IngestRecord]) -> int:
+    """
+    Passos depois do COMMIT (cache, métricas, rollups). Uma falha aqui só é registrada: se subisse, a fila mandaria
+    ao spill um lote JÁ gravado e o reenvio duplicaria as linhas. Retorna as linhas efetivamente gravadas.
+    """
+    written = sum(len(rows) for rows in groups.values())
+    try:
+        for (table_name, _), rows in groups.items():
+            _batch_persisted(table_name, len(rows))
+        # Rollups só depois da gravação: um lote que falha (e é reenviado pelo spill) não é contado duas vezes.
+        if rollup_aggregator is not None:
+            rollup_aggregator.add_many(accepted)
+    except Exception as e:
+        logger.error(f"Lote de {written} linhas gravado, mas a etapa pós-gravação falhou: {e}")
+    return written
+
+
+def save_batch_to_db(records: List[IngestRecord]) -> int:
+    """
+    Persiste um lote de mensagens MQTT: cada mensagem vai para a tabela da sua rota de tópico.
+    Por tabela, o lote é validado de uma vez (TypeAdapter em cache) e gravado com um único INSERT
+    multi-linha (executemany) por conjunto de colunas. Retorna as linhas gravadas (sem as inválidas/sem rota).
+    """
+    groups, accepted = _prepare_batch(records)
+    # Um executemany por (tabela, colunas), todos na MESMA transação: se um grupo falha, nenhum foi gravado e o lote
+    # inteiro pode ir para o spill sem duplicar linhas no reenvio. Só a gravação levanta para a fila (log/spill).
+    if groups:
+        with MQTT_STAGE_SECONDS.time("persist"):
+            execute_batches([(_insert_statement(table_name, columns).sql, rows) for (table_name, columns), rows in groups.items()])
+    return _after_commit(groups, accepted)
+
+
+async def save_batch_to_db_async(records: List[IngestRecord]) -> int:
+    """Versão do `save_batch_to_db` para o motor async: mesmo roteamento/validação, gravação pelo pool aiomysql."""
+    groups, accepted = _prepare_batch(records)
+    if groups:
+        with MQTT_STAGE_SECONDS.time("persist"):
+            await execute_batches_async([(_insert_statement(table_name, columns).sql, rows) for (table_name, columns), rows in groups.items()])
+    return _after_commit(groups, accepted)
+
+
+def save_data_to_db(topic: str, data: Dict[str, Any], raw: Optional[str] = None):
+    """
+    Roteia uma mensagem MQTT para a tabela da sua rota de tópico e persiste usando o DAO (uma linha, síncrono).
+    """
+    route = get_topic_router().match(topic)
+    if route is None:
+        _log_unrouted(topic)
+        return
+    table_name = route.table
+
+    # --- 1. Mapeamento e Validação para a tabela da rota ---
     try:
-        # Validação: Usa PedidosBase para garantir que os dois campos requeridos estão presentes.
-        validated_data = PedidosBase.model_validate(data_to_map)
-        data_to_insert = validated_data.model_dump(exclude_none=True) 
+        data_to_insert = validate_data_core(table_name, route.build_row(topic, data, raw))
+        dedup_column = dedup_column_for(table_name)
+        if dedup_column is not None:
+            data_to_insert[dedup_column] = message_key(topic, data, raw)
         
     except Exception as e:
-        logging.error(f"ERRO DE VALIDAÇÃO PYDANTIC para MQTT -> PedidosBase: {e}")
+        logger.error(f"ERRO DE VALIDAÇÃO PYDANTIC para MQTT -> '{table_name}': {e}")
         return
 
-    # --- 2. Construção e Execução da Query na tabela 'pedidos' ---
-    columns = ", ".join(data_to_insert.keys())
-    placeholders = ", ".join(["%s"] * len(data_to_insert))
+    # --- 2. Comando do cache e Execução na tabela da rota ---
+    statement = _insert_statement(table_name, tuple(data_to_insert.keys()))
     values = tuple(data_to_insert.values())
     
     try:
-        # Insere na tabela 'pedidos'
-        sql = f"INSERT INTO `{table_name}` ({columns}) VALUES ({placeholders})"
-        new_id = execute(sql=sql, params=values)
-        logging.info(f"--- ESTÁGIO 3: DB PERSISTIDO ---. Tabela: '{table_name}'. ID: {new_id}")
+        # Insere na tabela (prepared statement reutilizado na conexão do pool)
+        new_id = execute_statement(statement, params=values)
+        query_cache.invalidate(table_name)
+        logger.debug("--- ESTÁGIO 3: DB PERSISTIDO ---", extra={"table": table_name, "id": new_id})
         
     except Exception as e:
-        logging.error(f"Falha CRÍTICA ao inserir dados MQTT no DB (Tabela: '{table_name}'): {e}")
\ No newline at end of file
+        logger.error(f"Falha CRÍTICA ao inserir dados MQTT no DB (Tabela: '{table_name}'): {e}")
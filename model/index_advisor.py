@@ -0,0 +1,144 @@
+# app/model/index_advisor.py
+
+# FLUXO E A LÓGICA:
+# 1. Cada GET filtrado registra quais colunas foram filtradas (`note_filters`), além das colunas declaradas em
+#    `INDEXED_FILTER_COLUMNS` (as que se espera filtrar, ex.: `pedidos:tipo_do_pedido`).
+# 2. `build_report()` lê `INFORMATION_SCHEMA.STATISTICS` e diz, para cada coluna filtrada, se existe um índice que
+#    COMEÇA por ela (só a primeira coluna de um índice serve para `WHERE coluna = x`). Como todo índice secundário do
+#    InnoDB já carrega a chave primária, `(coluna)` também atende o `ORDER BY pk` da paginação.
+# 3. Para as que faltam, o relatório traz o DDL sugerido; `apply_missing_indexes()` o executa como DDL online
+#    (`ALGORITHM=INPLACE, LOCK=NONE`): a ingestão continua gravando enquanto o índice é construído.
+# 4. No startup, `check_indexes()` registra um aviso por índice ausente (e cria, se `INDEX_AUTO_MIGRATE=true`).
+# RAZÃO DE EXISTIR: Um filtro sem índice é um full scan; com índice, é uma busca direta.
+
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from utils.function_execute import execute_async
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Colunas que devem ter índice mesmo antes de serem filtradas: "tabela:coluna,tabela:coluna".
+INDEXED_FILTER_COLUMNS = os.getenv("INDEXED_FILTER_COLUMNS", "pedidos:tipo_do_pedido")
+INDEX_AUTO_MIGRATE = os.getenv("INDEX_AUTO_MIGRATE", "false").lower() in ("1", "true", "yes")
+# `POST /indexes/migrate` executa DDL (ALTER TABLE) a partir de HTTP: desligado por padrão.
+INDEX_MIGRATE_ENABLED = os.getenv("INDEX_MIGRATE_ENABLED", "false").lower() in ("1", "true", "yes")
+# Colunas TEXT/BLOB só podem ser indexadas por um prefixo (em caracteres/bytes).
+TEXT_INDEX_PREFIX = int(os.getenv("TEXT_INDEX_PREFIX", 191))
+
+_TEXT_TYPES = {"tinytext", "text", "mediumtext", "longtext", "tinyblob", "blob", "mediumblob", "longblob"}
+
+_usage: Dict[Tuple[str, str], int] = {}
+_usage_lock = threading.Lock()
+
+
+def _declared_columns() -> Set[Tuple[str, str]]:
+    declared = set()
+    for entry in INDEXED_FILTER_COLUMNS.split(","):
+        table, _, column = entry.strip().partition(":")
+        if table and column:
+            declared.add((table, column))
+    return declared
+
+
+def note_filters(table: str, columns: Iterable[str]) -> None:
+    """Conta o uso de cada coluna filtrada (entra no relatório mesmo se não estiver declarada)."""
+    with _usage_lock:
+        for column in set(columns):
+            _usage[(table, column)] = _usage.get((table, column), 0) + 1
+
+
+def _index_name(table: str, column: str) -> str:
+    return f"idx_{table}_{column}"[:64] # Limite de identificadores do MySQL.
+
+
+def _index_ddl(table: str, column: str, data_type: Optional[str]) -> str:
+    key = f"`{column}`({TEXT_INDEX_PREFIX})" if data_type in _TEXT_TYPES else f"`{column}`"
+    return f"ALTER TABLE `{table}` ADD INDEX `{_index_name(table, column)}` ({key}), ALGORITHM=INPLACE, LOCK=NONE"
+
+
+async def _schema(tables: List[str]) -> Tuple[Dict[str, Dict[str, List[str]]], Dict[Tuple[str, str], str]]:
+    """(tabela -> coluna inicial -> índices que começam por ela, (tabela, coluna) -> tipo) do schema atual."""
+    placeholders = ", ".join(["%s"] * len(tables))
+    index_rows = await execute_async(
+        sql="SELECT TABLE_NAME AS table_name, INDEX_NAME AS index_name, COLUMN_NAME AS column_name "
+            "FROM INFORMATION_SCHEMA.STATISTICS "
+            f"WHERE TABLE_SCHEMA = DATABASE() AND SEQ_IN_INDEX = 1 AND TABLE_NAME IN ({placeholders})",
+        params=tuple(tables),
+    ) or []
+    column_rows = await execute_async(
+        sql="SELECT TABLE_NAME AS table_name, COLUMN_NAME AS column_name, DATA_TYPE AS data_type "
+            f"FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders})",
+        params=tuple(tables),
+    ) or []
+    leading: Dict[str, Dict[str, List[str]]] = {}
+    for row in index_rows:
+        leading.setdefault(row["table_name"], {}).setdefault(row["column_name"], []).append(row["index_name"])
+    types = {(row["table_name"], row["column_name"]): row["data_type"].lower() for row in column_rows}
+    return leading, types
+
+
+async def build_report() -> List[Dict[str, Any]]:
+    """Uma entrada por coluna filtrada/declarada: uso, índices existentes e o DDL sugerido se faltar índice."""
+    with _usage_lock:
+        usage = dict(_usage)
+    candidates = sorted(_declared_columns() | set(usage))
+    if not candidates:
+        return []
+    leading, types = await _schema(sorted({table for table, _ in candidates}))
+
+    report = []
+    for table, column in candidates:
+        indexes = leading.get(table, {}).get(column, [])
+        exists = (table, column) in types
+        entry = {
+            "table": table,
+            "column": column,
+            "filtered": usage.get((table, column), 0),
+            "declared": (table, column) in _declared_columns(),
+            "indexes": indexes,
+            "indexed": bool(indexes),
+            "suggested_ddl": None,
+        }
+        if not exists:
+            entry["error"] = "coluna não existe no banco"
+        elif not indexes:
+            entry["suggested_ddl"] = _index_ddl(table, column, types[(table, column)])
+        report.append(entry)
+    return report
+
+
+async def apply_missing_indexes(table: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Cria (DDL online) os índices ausentes do relatório, opcionalmente só de uma tabela."""
+    applied = []
+    for entry in await build_report():
+        if not entry["suggested_ddl"] or (table and entry["table"] != table):
+            continue
+        result = {"table": entry["table"], "column": entry["column"], "ddl": entry["suggested_ddl"], "error": None}
+        try:
+            await execute_async(sql=entry["suggested_ddl"])
+            logger.info(f"Índice criado: {entry['suggested_ddl']}")
+        except Exception as e:
+            result["error"] = str(getattr(e, "detail", e))
+            logger.error(f"Falha ao criar índice em {entry['table']}.{entry['column']}: {result['error']}")
+        applied.append(result)
+    return applied
+
+
+async def check_indexes() -> None:
+    """Verificação de startup: avisa (ou cria, com INDEX_AUTO_MIGRATE) índices ausentes. Nunca impede o startup."""
+    try:
+        missing = [entry for entry in await build_report() if entry["suggested_ddl"]]
+        if missing and INDEX_AUTO_MIGRATE:
+            await apply_missing_indexes()
+            return
+        for entry in missing:
+            logger.warning(f"Coluna filtrável sem índice: {entry['table']}.{entry['column']}. Sugestão: {entry['suggested_ddl']}")
+    except Exception as e:
+        logger.warning(f"Verificação de índices não executada: {getattr(e, 'detail', e)}")
@@ -0,0 +1,283 @@
+# app/model/ingest_pipeline.py
+
+# FLUXO E A LÓGICA:
+# 1. `submit()` é chamado pelo callback MQTT e apenas coloca o registro numa fila em memória LIMITADA (não toca no DB).
+# 2. Um pool de `workers` threads consome as filas; cada worker tem a sua própria fila (shard).
+#    - `ordered=True`: o shard é escolhido pelo hash do tópico, então as mensagens de um mesmo tópico
+#      são persistidas na ordem de chegada.
+#    - `ordered=False`: o registro vai para o shard menos ocupado (máximo paralelismo).
+# 3. Cada worker drena seu shard quando ele atinge `batch_size` ou quando `flush_interval` segundos se passam,
+#    e entrega o lote à função `persist_batch` (ex.: INSERT multi-linha em uma única transação).
+#    `persist_batch` retorna as linhas gravadas; cache, métricas e rollups ficam dentro dela e nunca fazem um lote
+#    já confirmado voltar ao spill.
+# 4. Com o shard cheio, a política de backpressure decide: bloquear (`block`), descartar o mais antigo (`drop_oldest`)
+#    ou despejar no log local (`spill`). Com um `SpillLog` configurado, `block` também despeja (em vez de descartar)
+#    quando a espera esgota, e todo lote que falha no DB vai para o log, de onde o `SpillReplayer` o reenvia.
+# 5. `stop()` faz o flush final do que ainda estiver nas filas.
+# RAZÃO DE EXISTIR: Tirar a latência do MySQL da thread de rede do paho, evitando perda de keepalive sob alta taxa de mensagens.
+
+import logging
+import threading
+import time
+import zlib
+from collections import deque
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from model.spill_log import SpillLog
+
+logger = logging.getLogger(__name__)
+
+BACKPRESSURE_BLOCK = "block"
+BACKPRESSURE_DROP_OLDEST = "drop_oldest"
+BACKPRESSURE_SPILL = "spill"
+BACKPRESSURE_POLICIES = (BACKPRESSURE_BLOCK, BACKPRESSURE_DROP_OLDEST, BACKPRESSURE_SPILL)
+
+
+class IngestRecord(NamedTuple):
+    """Mensagem MQTT já decodificada, aguardando persistência."""
+    topic: str
+    data: Any
+    received_at: float
+    raw: Optional[str] = None # Payload original (JSON válido): gravado como veio, sem re-serializar `data`.
+
+
+class _Shard:
+    """Fila de um worker: deque limitada + condição própria (workers não disputam o mesmo lock)."""
+
+    def __init__(self, index: int, capacity: int) -> None:
+        self.index = index
+        self.capacity = capacity
+        self.queue: Deque[IngestRecord] = deque()
+        self.cond = threading.Condition(threading.Lock())
+        self.busy_seconds = 0.0 # Tempo gasto persistindo lotes (para a utilização do worker).
+        self.busy_since: Optional[float] = None
+
+
+class IngestPipeline:
+    """Filas limitadas + pool de workers que persistem a ingestão MQTT em lotes."""
+
+    def __init__(
+        self,
+        persist_batch: Callable[[List[IngestRecord]], Optional[int]],
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        backpressure: str = BACKPRESSURE_BLOCK,
+        block_timeout: float = 1.0,
+        spill: Optional["SpillLog"] = None,
+        workers: int = 1,
+        ordered: bool = True,
+    ) -> None:
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Política de backpressure inválida: '{backpressure}'. Use uma de {BACKPRESSURE_POLICIES}.")
+        if max_queue < 1 or batch_size < 1 or workers < 1:
+            raise ValueError("max_queue, batch_size e workers devem ser maiores que zero.")
+        if backpressure == BACKPRESSURE_SPILL and spill is None:
+            raise ValueError("A política de backpressure 'spill' exige um SpillLog.")
+        self.persist_batch = persist_batch
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.backpressure = backpressure
+        self.block_timeout = block_timeout
+        self.spill = spill
+        self.workers = workers
+        self.ordered = ordered
+
+        # A capacidade total é dividida entre os shards.
+        capacity = max(1, max_queue // workers)
+        self._shards = [_Shard(index, capacity) for index in range(workers)]
+        self._threads: List[threading.Thread] = []
+        self._running = False
+        self._started_at = time.monotonic()
+        self._state_lock = threading.Lock() # Protege _running/_threads e os contadores.
+
+        # Contadores expostos em `stats()`.
+        self.received = 0
+        self.persisted = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.failed = 0
+        self.batches = 0
+
+    # --- Ciclo de vida ---
+
+    def start(self) -> None:
+        """Inicia os workers (idempotente)."""
+        with self._state_lock:
+            if self._running:
+                return
+            self._running = True
+            self._started_at = time.monotonic()
+            for shard in self._shards:
+                shard.busy_seconds = 0.0
+            self._threads = [
+                threading.Thread(target=self._run, args=(shard,), name=f"mqtt-ingest-worker-{shard.index}", daemon=True)
+                for shard in self._shards
+            ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Para os workers após drenar TODAS as filas (flush final)."""
+        with self._state_lock:
+            if not self._running:
+                return
+            self._running = False
+            threads, self._threads = self._threads, []
+        for shard in self._shards:
+            with shard.cond:
+                shard.cond.notify_all()
+        for thread in threads:
+            thread.join(timeout)
+
+    def is_running(self) -> bool:
+        return self._running
+
+    # --- Entrada (thread do paho) ---
+
+    def _shard_for(self, record: IngestRecord) -> _Shard:
+        if self.workers == 1:
+            return self._shards[0]
+        if self.ordered:
+            # crc32 é estável entre execuções (hash() de str é aleatorizado por processo).
+            return self._shards[zlib.crc32(record.topic.encode("utf-8")) % self.workers]
+        return min(self._shards, key=lambda shard: len(shard.queue))
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._state_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def submit(self, record: IngestRecord) -> bool:
+        """Enfileira um registro. Retorna False se ele foi descartado pela política de backpressure."""
+        self._count("received")
+        shard = self._shard_for(record)
+        with shard.cond:
+            if len(shard.queue) >= shard.capacity:
+                if self.backpressure == BACKPRESSURE_BLOCK:
+                    # Espera limitada: bloquear o paho indefinidamente derrubaria a conexão com o broker.
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(shard.queue) >= shard.capacity and self._running:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        shard.cond.wait(remaining)
+                    if len(shard.queue) >= shard.capacity:
+                        if self.spill is None:
+                            self._count("dropped")
+                            return False
+                        shard = None # Espera esgotada: vai para o disco em vez de ser perdido.
+                elif self.backpressure == BACKPRESSURE_DROP_OLDEST:
+                    shard.queue.popleft()
+                    self._count("dropped")
+                else: # BACKPRESSURE_SPILL: o excedente vai para o disco, fora do lock.
+                    shard = None
+            if shard is not None:
+                shard.queue.append(record)
+                if len(shard.queue) >= self.batch_size:
+                    shard.cond.notify_all()
+                return True
+        self._spill([record])
+        return True
+
+    # --- Saída (workers) ---
+
+    def _take_batch_locked(self, shard: _Shard) -> List[IngestRecord]:
+        size = min(self.batch_size, len(shard.queue))
+        batch = [shard.queue.popleft() for _ in range(size)]
+        shard.cond.notify_all() # Libera produtores bloqueados pela fila cheia.
+        return batch
+
+    def _run(self, shard: _Shard) -> None:
+        while True:
+            with shard.cond:
+                deadline = time.monotonic() + self.flush_interval
+                # Espera o lote encher ou o intervalo de flush vencer.
+                while self._running and len(shard.queue) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    shard.cond.wait(remaining)
+                if not shard.queue:
+                    if not self._running:
+                        return
+                    continue
+                batch = self._take_batch_locked(shard)
+            self._flush_batch(shard, batch)
+
+    def flush(self) -> None:
+        """Drena todas as filas de forma síncrona na thread chamadora."""
+        for shard in self._shards:
+            while True:
+                with shard.cond:
+                    if not shard.queue:
+                        break
+                    batch = self._take_batch_locked(shard)
+                self._flush_batch(shard, batch)
+
+    def _flush_batch(self, shard: _Shard, batch: List[IngestRecord]) -> None:
+        shard.busy_since = time.monotonic()
+        # Só a gravação fica no `try` do spill: depois do COMMIT, reenviar o lote duplicaria as linhas.
+        try:
+            written = self.persist_batch(batch)
+        except Exception as e:
+            self._count("failed", len(batch))
+            logger.error(f"Falha ao persistir lote MQTT com {len(batch)} mensagens: {e}")
+            if self.spill is not None:
+                # O lote que falhou vai para o disco em vez de ser perdido; o replayer o reenvia depois.
+                self._spill(batch)
+        else:
+            # `persist_batch` retorna as linhas gravadas (sem as descartadas na validação); None = o lote todo.
+            self._count("persisted", len(batch) if written is None else written)
+            self._count("batches")
+        finally:
+            shard.busy_seconds += time.monotonic() - shard.busy_since
+            shard.busy_since = None
+
+    def _spill(self, records: List[IngestRecord]) -> None:
+        """Acrescenta registros ao log de spill para reprocessamento posterior."""
+        try:
+            self.spill.append(records)
+            self._count("spilled", len(records))
+        except OSError as e:
+            self._count("dropped", len(records))
+            logger.error(f"Falha ao gravar {len(records)} mensagens no spill '{self.spill.directory}': {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Fotografia dos contadores, da profundidade das filas e da utilização dos workers."""
+        now = time.monotonic()
+        elapsed = max(now - self._started_at, 1e-9)
+        workers = []
+        for shard in self._shards:
+            busy = shard.busy_seconds
+            busy_since = shard.busy_since
+            if busy_since is not None:
+                busy += now - busy_since
+            workers.append({
+                "worker": shard.index,
+                "queue_depth": len(shard.queue),
+                "busy": busy_since is not None,
+                "utilization": round(min(busy / elapsed, 1.0), 4),
+            })
+        with self._state_lock:
+            counters = {
+                "received": self.received,
+                "persisted": self.persisted,
+                "batches": self.batches,
+                "dropped": self.dropped,
+                "spilled": self.spilled,
+                "failed": self.failed,
+            }
+        return {
+            "running": self._running,
+            "queue_depth": sum(worker["queue_depth"] for worker in workers),
+            "max_queue": self.max_queue,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "backpressure": self.backpressure,
+            "ordered": self.ordered,
+            "workers": workers,
+            "utilization": round(sum(worker["utilization"] for worker in workers) / len(workers), 4),
+            **counters,
+        }
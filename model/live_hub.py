@@ -0,0 +1,244 @@
+# app/model/live_hub.py
+
+# FLUXO E A LÓGICA:
+# 1. `LiveHub.publish()` é chamado na recepção MQTT (callback do paho ou leitura do motor async), ANTES da fila de
+#    gravação: cada mensagem vira um quadro JSON uma única vez, qualquer que seja o número de assinantes.
+# 2. Cada assinante (WebSocket ou SSE) tem filtros de tópico MQTT (`+`/`#`) e um buffer LIMITADO. Os assinantes de
+#    um tópico são resolvidos uma vez e memorizados (a memória é refeita quando alguém entra ou sai).
+# 3. Coalescência (padrão): o buffer guarda só o quadro mais recente de cada tópico; um tópico de alta frequência
+#    substitui o quadro pendente em vez de acumular. O envio junta os pendentes em um lote e espera `min_interval`
+#    entre lotes: o cliente recebe no máximo um valor por tópico por intervalo.
+# 4. Consumidor lento: com o buffer cheio (tópicos distintos pendentes, ou quadros sem coalescência), o assinante é
+#    desconectado em vez de fazer a memória crescer. O cliente reconecta e recomeça do valor atual.
+# 5. `publish()` nunca bloqueia nem toca no MySQL: a entrega é feita pela tarefa de envio de cada conexão.
+# RAZÃO DE EXISTIR: Dashboards em tempo real sem poll no GET: milhares de espectadores não somam carga ao banco.
+
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+from model.topic_router import topic_matches, validate_filter
+from utils import fast_json
+from utils.metrics import register_gauge
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LIVE_ENABLED = os.getenv("LIVE_ENABLED", "true").lower() in ("1", "true", "yes")
+LIVE_MAX_SUBSCRIBERS = int(os.getenv("LIVE_MAX_SUBSCRIBERS", 1000))
+LIVE_BUFFER_SIZE = int(os.getenv("LIVE_BUFFER_SIZE", 256)) # Quadros (ou tópicos, com coalescência) pendentes por assinante.
+LIVE_MIN_INTERVAL = float(os.getenv("LIVE_MIN_INTERVAL", 0.25)) # Segundos entre lotes enviados a um assinante.
+LIVE_HEARTBEAT = float(os.getenv("LIVE_HEARTBEAT", 15.0))
+LIVE_MAX_FILTERS = 16
+
+_TOPIC_CACHE_SIZE = 4096
+
+
+class LiveHubFull(Exception):
+    """Limite de assinantes atingido (`LIVE_MAX_SUBSCRIBERS`)."""
+
+
+class LiveSubscriber:
+    """Uma conexão de tempo real: filtros, buffer limitado e o sinal de "há quadros pendentes"."""
+
+    def __init__(self, hub: "LiveHub", filters: Sequence[str], coalesce: bool, buffer_size: int) -> None:
+        self.filters = tuple(filters)
+        self._levels = [validate_filter(topic_filter) for topic_filter in self.filters]
+        self.coalesce = coalesce
+        self.buffer_size = buffer_size
+        self._hub = hub
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        self._pending: Dict[Any, str] = {} # Tópico (coalescência) ou sequência -> quadro JSON.
+        self._sequence = itertools.count()
+        self._signalled = False
+        self.dropped = False # Desconectado por ser lento.
+        self.closed = False
+        self.sent = 0
+
+    def matches(self, topic: str) -> bool:
+        return any(topic_matches(levels, topic) for levels in self._levels)
+
+    def _offer(self, topic: str, frame: str) -> Tuple[bool, bool]:
+        """(aceito, coalescido). Chamado com o lock do hub."""
+        key = topic if self.coalesce else next(self._sequence)
+        if key in self._pending:
+            self._pending[key] = frame
+            return True, True
+        if len(self._pending) >= self.buffer_size:
+            return False, False
+        self._pending[key] = frame
+        return True, False
+
+    def _wake(self) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError: # Loop já encerrado.
+            pass
+
+    async def batches(self, heartbeat: float = LIVE_HEARTBEAT, min_interval: float = LIVE_MIN_INTERVAL) -> AsyncIterator[List[str]]:
+        """Lotes de quadros pendentes; lista vazia a cada `heartbeat` sem dados. Termina ao ser descartado ou fechado."""
+        while not (self.dropped or self.closed):
+            try:
+                await asyncio.wait_for(self._event.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                yield []
+                continue
+            self._event.clear()
+            frames = self._hub._drain(self)
+            if self.dropped or self.closed:
+                return
+            if frames:
+                self.sent += len(frames)
+                yield frames
+                if min_interval > 0:
+                    await asyncio.sleep(min_interval) # Coalescência: o que chegar nesse meio tempo vira um quadro por tópico.
+
+
+class LiveHub:
+    """Fan-out das mensagens MQTT para assinantes WebSocket/SSE. `publish()` é thread-safe."""
+
+    def __init__(self, max_subscribers: int = 1000, buffer_size: int = 256) -> None:
+        if max_subscribers < 1 or buffer_size < 1:
+            raise ValueError("max_subscribers e buffer_size devem ser maiores que zero.")
+        self.max_subscribers = max_subscribers
+        self.buffer_size = buffer_size
+        self._subscribers: List[LiveSubscriber] = []
+        self._by_topic: Dict[str, Tuple[LiveSubscriber, ...]] = {} # Tópico -> assinantes que casam (memorizado).
+        self._lock = threading.Lock()
+        # Contadores expostos em `stats()`.
+        self.published = 0
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped_slow = 0
+        self.rejected = 0
+
+    @property
+    def active(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, filters: Sequence[str], coalesce: bool = True) -> LiveSubscriber:
+        """Registra um assinante no loop atual. ValueError para filtros inválidos; LiveHubFull no limite."""
+        filters = [topic_filter.strip() for topic_filter in filters if topic_filter.strip()]
+        if not filters or len(filters) > LIVE_MAX_FILTERS:
+            raise ValueError(f"Informe de 1 a {LIVE_MAX_FILTERS} filtros de tópico.")
+        subscriber = LiveSubscriber(self, filters, coalesce, self.buffer_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                self.rejected += 1
+                raise LiveHubFull(f"Limite de {self.max_subscribers} assinantes em tempo real atingido.")
+            self._subscribers.append(subscriber)
+            self._by_topic = {}
+        return subscriber
+
+    def unsubscribe(self, subscriber: LiveSubscriber) -> None:
+        with self._lock:
+            subscriber.closed = True
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+                self._by_topic = {}
+
+    def close(self) -> None:
+        """Encerra todas as conexões (desligamento da aplicação)."""
+        with self._lock:
+            subscribers, self._subscribers, self._by_topic = self._subscribers, [], {}
+            for subscriber in subscribers:
+                subscriber.closed = True
+        for subscriber in subscribers:
+            subscriber._wake()
+
+    def _matching(self, topic: str) -> Tuple[LiveSubscriber, ...]:
+        subscribers = self._by_topic.get(topic)
+        if subscribers is None:
+            with self._lock:
+                subscribers = tuple(subscriber for subscriber in self._subscribers if subscriber.matches(topic))
+                if len(self._by_topic) >= _TOPIC_CACHE_SIZE:
+                    self._by_topic = {}
+                self._by_topic[topic] = subscribers
+        return subscribers
+
+    def publish(self, topic: str, payload: str, received_at: Optional[float] = None) -> None:
+        """Entrega o payload (JSON já validado pelo parse) aos assinantes do tópico. Sem assinantes, não faz nada."""
+        if not self._subscribers:
+            return
+        subscribers = self._matching(topic)
+        if not subscribers:
+            return
+        # Serializado uma vez por mensagem. Quebras de linha em JSON válido são só espaços: removê-las mantém o
+        # documento e deixa o quadro em uma linha (exigência do `data:` do SSE).
+        if "\n" in payload or "\r" in payload:
+            payload = payload.replace("\r", " ").replace("\n", " ")
+        frame = (f'{{"topic":{fast_json.dumps(topic)},"received_at":{received_at or time.time():.3f},'
+                 f'"data":{payload}}}')
+
+        wake, slow = [], []
+        with self._lock:
+            self.published += 1
+            for subscriber in subscribers:
+                if subscriber.closed or subscriber.dropped:
+                    continue
+                accepted, coalesced = subscriber._offer(topic, frame)
+                if not accepted:
+                    slow.append(subscriber)
+                    continue
+                self.delivered += 1
+                self.coalesced += coalesced
+                if not subscriber._signalled:
+                    subscriber._signalled = True
+                    wake.append(subscriber)
+            for subscriber in slow:
+                subscriber.dropped = True
+                subscriber._pending.clear()
+                self._subscribers.remove(subscriber)
+                self.dropped_slow += 1
+            if slow:
+                self._by_topic = {}
+        for subscriber in wake + slow:
+            subscriber._wake()
+        if slow:
+            logger.warning(f"{len(slow)} assinante(s) em tempo real desconectado(s) por lentidão (buffer de {self.buffer_size}).")
+
+    def _drain(self, subscriber: LiveSubscriber) -> List[str]:
+        with self._lock:
+            frames = list(subscriber._pending.values())
+            subscriber._pending = {}
+            subscriber._signalled = False
+        return frames
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": LIVE_ENABLED,
+            "subscribers": len(self._subscribers),
+            "max_subscribers": self.max_subscribers,
+            "buffer_size": self.buffer_size,
+            "published": self.published,
+            "delivered": self.delivered,
+            "coalesced": self.coalesced,
+            "dropped_slow": self.dropped_slow,
+            "rejected": self.rejected,
+        }
+
+
+# Instância global (Escopo de Módulo): alimentada pela ingestão MQTT e lida pelas rotas de tempo real.
+live_hub = LiveHub(max_subscribers=LIVE_MAX_SUBSCRIBERS, buffer_size=LIVE_BUFFER_SIZE)
+
+
+def _live_subscriber_samples():
+    yield {}, len(live_hub._subscribers)
+
+
+def _live_event_samples():
+    stats = live_hub.stats()
+    for event in ("published", "delivered", "coalesced", "dropped_slow", "rejected"):
+        yield {"event": event}, stats[event]
+
+
+register_gauge("live_subscribers", "Assinantes WebSocket/SSE conectados.", _live_subscriber_samples)
+register_gauge("live_events_total", "Contadores do fan-out em tempo real.", _live_event_samples, kind="counter")
@@ -0,0 +1,222 @@
+# app/model/mqtt_coordinator.py
+
+# FLUXO E A LÓGICA:
+# 1. Com vários workers do uvicorn (ou várias réplicas), cada processo chamaria `start_mqtt_client` e todos
+#    receberiam todas as mensagens, gravando linhas duplicadas.
+# 2. Modo `shared`: cada processo assina `$share/<grupo>/<tópico>` (MQTT v5) e o broker distribui as mensagens
+#    entre os membros do grupo. Não precisa de coordenação local: é o modo para escalar a ingestão.
+# 3. Modo `leader`: apenas UM coletor fica ativo; os demais ficam em espera (standby). A liderança é uma trava:
+#    - `FileLeaderLock`: trava exclusiva de arquivo (workers de um mesmo host);
+#    - `MySQLLeaderLock`: `GET_LOCK()` do MySQL em uma conexão dedicada (várias máquinas; liberada se o processo cair).
+# 4. `LeaderElector` roda em uma thread: tenta obter a trava a cada `interval` segundos, chama `on_elected` ao
+#    conseguir, confere periodicamente se ainda a detém e chama `on_demoted` se a perder.
+# RAZÃO DE EXISTIR: Escalar a coleta entre núcleos/máquinas sem gravar a mesma mensagem duas vezes.
+
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl # POSIX.
+except ImportError:
+    fcntl = None
+    import msvcrt # Windows.
+
+logger = logging.getLogger(__name__)
+
+COORDINATION_NONE = "none"
+COORDINATION_SHARED = "shared"
+COORDINATION_LEADER = "leader"
+COORDINATION_MODES = (COORDINATION_NONE, COORDINATION_SHARED, COORDINATION_LEADER)
+
+
+def shared_topic(topic: str, group: Optional[str]) -> str:
+    """Filtro de assinatura compartilhada (`$share/grupo/filtro`); sem grupo, o próprio filtro."""
+    if not group:
+        return topic
+    if "/" in group or "+" in group or "#" in group:
+        raise ValueError(f"Nome de grupo de assinatura compartilhada inválido: '{group}'.")
+    return f"$share/{group}/{topic}"
+
+
+class LeaderLock(ABC):
+    """Trava de liderança. `try_acquire()` nunca bloqueia; `still_held()` detecta perda (ex.: conexão caída)."""
+
+    name = ""
+
+    @abstractmethod
+    def try_acquire(self) -> bool:
+        ...
+
+    def still_held(self) -> bool:
+        return True
+
+    @abstractmethod
+    def release(self) -> None:
+        ...
+
+
+class FileLeaderLock(LeaderLock):
+    """Trava exclusiva de arquivo: o sistema operacional a libera se o processo morrer."""
+
+    name = "file"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = None
+
+    def try_acquire(self) -> bool:
+        if self._file is not None:
+            return True
+        lock_file = open(self.path, "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid())) # Diagnóstico: qual processo é o líder.
+        lock_file.flush()
+        self._file = lock_file
+        return True
+
+    def release(self) -> None:
+        if self._file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        except OSError:
+            pass
+        finally:
+            self._file.close()
+            self._file = None
+
+
+class MySQLLeaderLock(LeaderLock):
+    """`GET_LOCK()` nomeado do MySQL. A trava pertence à sessão: se a conexão cair, o MySQL a libera."""
+
+    name = "mysql"
+
+    def __init__(self, lock_name: str, connection_factory: Callable[[], Any]) -> None:
+        self.lock_name = lock_name
+        self.connection_factory = connection_factory
+        self._connection = None
+
+    def _scalar(self, sql: str) -> Any:
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute(sql, (self.lock_name,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            cursor.close()
+
+    def try_acquire(self) -> bool:
+        if self._connection is not None:
+            return True
+        try:
+            self._connection = self.connection_factory()
+            if self._scalar("SELECT GET_LOCK(%s, 0)") == 1:
+                return True
+        except Exception as e:
+            logger.warning(f"Falha ao tentar obter a trava de liderança '{self.lock_name}': {e}")
+        self._close()
+        return False
+
+    def still_held(self) -> bool:
+        if self._connection is None:
+            return False
+        try:
+            return self._scalar("SELECT IS_USED_LOCK(%s) = CONNECTION_ID()") == 1
+        except Exception:
+            self._close()
+            return False
+
+    def release(self) -> None:
+        if self._connection is None:
+            return
+        try:
+            self._scalar("SELECT RELEASE_LOCK(%s)")
+        except Exception:
+            pass
+        self._close()
+
+    def _close(self) -> None:
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+
+class LeaderElector:
+    """Thread que disputa a liderança e liga/desliga o coletor conforme a trava é obtida ou perdida."""
+
+    def __init__(self, lock: LeaderLock, on_elected: Callable[[], bool], on_demoted: Callable[[], None],
+                 interval: float = 5.0) -> None:
+        self.lock = lock
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.interval = interval
+        self.is_leader = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="mqtt-leader-elector", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Para a disputa; se for o líder, desliga o coletor e libera a trava para outro processo."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+        self._step_down()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if not self.is_leader:
+                    if self.lock.try_acquire():
+                        logger.info(f"Liderança MQTT obtida (trava '{self.lock.name}'): iniciando o coletor.")
+                        self.is_leader = True
+                        if not self.on_elected():
+                            # Falha ao conectar: devolve a trava para que outro processo possa tentar.
+                            self._step_down()
+                elif not self.lock.still_held():
+                    logger.warning("Liderança MQTT perdida: parando o coletor.")
+                    self._step_down()
+            except Exception as e:
+                logger.error(f"Erro na coordenação de liderança MQTT: {e}")
+            self._stop.wait(self.interval)
+
+    def _step_down(self) -> None:
+        if self.is_leader:
+            self.is_leader = False
+            try:
+                self.on_demoted()
+            finally:
+                self.lock.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lock": self.lock.name,
+            "role": "leader" if self.is_leader else "standby",
+            "running": self._thread is not None and self._thread.is_alive(),
+        }
@@ -0,0 +1,265 @@
+# app/model/mqtt_engine.py
+
+# FLUXO E A LÓGICA:
+# 1. `AsyncMQTTEngine` roda DENTRO do event loop do FastAPI (sem a thread de rede do paho): uma tarefa de conexão
+#    assina o tópico e lê as mensagens com `aiomqtt`, e `consumers` tarefas gravam os lotes.
+# 2. A tarefa de conexão reconecta sozinha: a cada queda espera um backoff exponencial com jitter
+#    (`min_backoff` dobrando até `max_backoff`), zerado quando uma conexão é estabelecida.
+# 3. Cada mensagem é decodificada e colocada em uma `asyncio.Queue` LIMITADA. Com a fila cheia, a leitura do
+#    socket simplesmente espera (`await put`): o backpressure chega ao broker pelo TCP, sem descartar nada.
+#    (Por isso `MQTT_INGEST_BACKPRESSURE` não vale neste motor: a política é sempre esperar.)
+#    Com `ordered=True`, cada consumidor tem a sua fila e o tópico escolhe a fila por `crc32(tópico) % consumers`
+#    (como no `IngestPipeline`): os lotes de um mesmo tópico são gravados em ordem, por um único consumidor.
+#    Sem ordem, todos os consumidores drenam uma fila compartilhada.
+# 4. Os consumidores juntam até `batch_size` mensagens (ou o que chegar em `flush_interval` segundos) e chamam
+#    `persist_batch` (corrotina, ex.: executemany no pool aiomysql compartilhado com as rotas HTTP).
+#    Um lote que falha vai para `on_failed_batch` (ex.: spill em disco).
+#    Com QoS 1/2, `is_duplicate` descarta reentregas já recebidas antes de enfileirar.
+# 5. `stop()` cancela a leitura, drena a fila e espera o último lote de cada consumidor.
+# RAZÃO DE EXISTIR: Um processo atende HTTP e MQTT no mesmo loop, sem troca de threads nem disputa pelo GIL.
+
+import asyncio
+import logging
+import random
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+try:
+    import aiomqtt
+except ImportError: # Dependência opcional (MQTT_ENGINE=async).
+    aiomqtt = None
+
+from model.ingest_pipeline import IngestRecord
+from utils import fast_json
+from utils.metrics import METRICS_ENABLED, MQTT_MESSAGES_TOTAL, MQTT_STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+HAS_AIOMQTT = aiomqtt is not None
+
+
+class AsyncMQTTEngine:
+    """Cliente MQTT assíncrono com reconexão automática e consumidores em lote no mesmo event loop."""
+
+    def __init__(
+        self,
+        persist_batch: Callable[[List[IngestRecord]], Awaitable[Optional[int]]],
+        hostname: str,
+        port: int,
+        topic: str,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        identifier: Optional[str] = None,
+        protocol: str = "3.1.1",
+        qos: int = 0,
+        clean_session: bool = True,
+        keepalive: int = 60,
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        consumers: int = 4,
+        ordered: bool = True,
+        min_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        on_failed_batch: Optional[Callable[[List[IngestRecord], Exception], Awaitable[None]]] = None,
+        on_payload: Optional[Callable[[str, str, int], None]] = None,
+        is_duplicate: Optional[Callable[[str, Any, str], bool]] = None,
+    ) -> None:
+        if aiomqtt is None:
+            raise RuntimeError("MQTT_ENGINE=async exige o pacote 'aiomqtt' (pip install aiomqtt).")
+        if max_queue < 1 or batch_size < 1 or consumers < 1:
+            raise ValueError("max_queue, batch_size e consumers devem ser maiores que zero.")
+        self.persist_batch = persist_batch
+        self.hostname = hostname
+        self.port = port
+        self.topic = topic
+        self.username = username
+        self.password = password
+        self.identifier = identifier
+        self.protocol = aiomqtt.ProtocolVersion.V5 if protocol == "5" else aiomqtt.ProtocolVersion.V311
+        self.qos = qos
+        self.clean_session = clean_session
+        self.keepalive = keepalive
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.consumers = consumers
+        self.ordered = ordered
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.on_failed_batch = on_failed_batch
+        self.on_payload = on_payload # Ex.: log amostrado do payload.
+        self.is_duplicate = is_duplicate
+
+        self.connected = False
+        self.last_error: Optional[str] = None
+        self._queues: List[asyncio.Queue] = [] # Uma por consumidor (ordered) ou uma compartilhada.
+        self._reader: Optional[asyncio.Task] = None
+        self._workers: List[asyncio.Task] = []
+        self._busy_seconds = 0.0
+        self._started_at = time.monotonic()
+        # Contadores expostos em `stats()`.
+        self.received = 0
+        self.persisted = 0
+        self.failed = 0
+        self.batches = 0
+        self.reconnects = 0
+        self.invalid = 0
+        self.duplicates = 0
+
+    # --- Ciclo de vida ---
+
+    def is_running(self) -> bool:
+        return self._reader is not None and not self._reader.done()
+
+    async def start(self) -> None:
+        """Cria as tarefas de leitura e de consumo no loop atual (idempotente)."""
+        if self.is_running():
+            return
+        shards = self.consumers if self.ordered else 1
+        self._queues = [asyncio.Queue(maxsize=max(1, self.max_queue // shards)) for _ in range(shards)]
+        self._started_at = time.monotonic()
+        self._busy_seconds = 0.0
+        self._workers = [asyncio.create_task(self._consume(index), name=f"mqtt-consumer-{index}")
+                         for index in range(self.consumers)]
+        self._reader = asyncio.create_task(self._run(), name="mqtt-reader")
+
+    async def stop(self) -> None:
+        """Para a leitura, drena a fila e espera o último lote de cada consumidor."""
+        if self._reader is not None:
+            self._reader.cancel()
+            await asyncio.gather(self._reader, return_exceptions=True)
+            self._reader = None
+        self.connected = False
+        for queue in self._queues:
+            await queue.join() # Tudo o que foi lido chega ao DB (ou ao on_failed_batch).
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    # --- Conexão com reconexão ---
+
+    async def _run(self) -> None:
+        backoff = self.min_backoff
+        while True:
+            try:
+                # MQTT v5 usa `clean_start`; v3.1.1 usa `clean_session`.
+                session = ({"clean_start": self.clean_session} if self.protocol == aiomqtt.ProtocolVersion.V5
+                           else {"clean_session": self.clean_session})
+                async with aiomqtt.Client(
+                    self.hostname, self.port, username=self.username, password=self.password,
+                    identifier=self.identifier, protocol=self.protocol, keepalive=self.keepalive, **session,
+                ) as client:
+                    await client.subscribe(self.topic, qos=self.qos)
+                    self.connected = True
+                    self.last_error = None
+                    backoff = self.min_backoff
+                    logger.info(f"--- CONEXÃO MQTT SUCESSO ---: Conectado a {self.hostname}:{self.port}, assinando '{self.topic}'.")
+                    async for message in client.messages:
+                        await self._receive(str(message.topic), message.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e: # aiomqtt.MqttError (queda/recusa) ou falha de DNS/TLS.
+                self.last_error = f"{type(e).__name__}: {e}"
+            self.connected = False
+            self.reconnects += 1
+            # Jitter: vários coletores derrubados juntos não reconectam todos no mesmo instante.
+            delay = backoff * random.uniform(0.5, 1.0)
+            logger.warning(f"Conexão MQTT perdida ({self.last_error}). Nova tentativa em {delay:.1f}s.")
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def _receive(self, topic: str, payload: Any) -> None:
+        started = time.perf_counter() if METRICS_ENABLED else 0.0
+        try:
+            payload_str = payload.decode("utf-8") if isinstance(payload, (bytes, bytearray)) else str(payload)
+            data = fast_json.loads(payload_str)
+        except ValueError: # JSONDecodeError e UnicodeDecodeError.
+            self.invalid += 1
+            MQTT_MESSAGES_TOTAL.inc(1, "invalid_json")
+            return
+        if METRICS_ENABLED:
+            MQTT_STAGE_SECONDS.observe(time.perf_counter() - started, "decode")
+            MQTT_MESSAGES_TOTAL.inc(1, "received")
+        if self.is_duplicate is not None and self.is_duplicate(topic, data, payload_str):
+            self.duplicates += 1
+            MQTT_MESSAGES_TOTAL.inc(1, "duplicate")
+            return
+        if self.on_payload is not None:
+            self.on_payload(topic, payload_str, len(payload))
+        self.received += 1
+        await self._queue_for(topic).put(IngestRecord(topic, data, time.time(), payload_str))
+        if METRICS_ENABLED:
+            MQTT_STAGE_SECONDS.observe(time.perf_counter() - started, "receive")
+
+    def _queue_for(self, topic: str) -> asyncio.Queue:
+        if len(self._queues) == 1:
+            return self._queues[0]
+        # crc32 é estável entre execuções (hash() de str é aleatorizado por processo).
+        return self._queues[zlib.crc32(topic.encode("utf-8")) % len(self._queues)]
+
+    # --- Consumidores ---
+
+    async def _next_batch(self, queue: asyncio.Queue) -> List[IngestRecord]:
+        """Espera a primeira mensagem e junta as seguintes até `batch_size` ou `flush_interval`."""
+        batch = [await queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _consume(self, index: int) -> None:
+        queue = self._queues[index % len(self._queues)]
+        while True:
+            batch = await self._next_batch(queue)
+            started = time.perf_counter()
+            try:
+                written = await self.persist_batch(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                logger.error(f"Falha ao persistir lote de {len(batch)} mensagens MQTT (consumidor {index}): {e}")
+                if self.on_failed_batch is not None:
+                    try:
+                        await self.on_failed_batch(batch, e)
+                    except Exception as spill_error:
+                        logger.error(f"Falha ao tratar o lote rejeitado: {spill_error}")
+            else:
+                # Linhas gravadas (sem as descartadas na validação); None = o lote todo.
+                self.persisted += len(batch) if written is None else written
+                self.batches += 1
+            finally:
+                self._busy_seconds += time.perf_counter() - started
+                for _ in batch:
+                    queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self._started_at, 1e-9)
+        return {
+            "engine": "async",
+            "connected": self.connected,
+            "queue_depth": sum(queue.qsize() for queue in self._queues),
+            "max_queue": self.max_queue,
+            "consumers": self.consumers,
+            "ordered": self.ordered,
+            # Fração do tempo em que os consumidores estiveram gravando (média entre eles).
+            "utilization": round(min(self._busy_seconds / (elapsed * self.consumers), 1.0), 4),
+            "received": self.received,
+            "persisted": self.persisted,
+            "failed": self.failed,
+            "invalid_json": self.invalid,
+            "duplicates": self.duplicates,
+            "batches": self.batches,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+        }
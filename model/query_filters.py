@@ -0,0 +1,122 @@
+# app/model/query_filters.py
+
+# FLUXO E A LÓGICA:
+# 1. O GET genérico aceita filtros na query string no formato `coluna[__operador]=valor`:
+#    - `tipo_do_pedido=x` (igualdade), `valor__gte=10`, `valor__lt=20` (intervalo: gt/gte/lt/lte),
+#    - `pedidos_id__in=1,2,3` (lista), `tipo_do_pedido__prefix=bancada/camila/` (prefixo, só colunas texto).
+# 2. A coluna precisa existir no modelo Pydantic da tabela (ou ser a chave primária) e o valor é convertido para o
+#    tipo anotado no modelo (`TypeAdapter`): `valor__gte=abc` em um campo numérico vira 400, não um SQL inválido.
+# 3. `compile_filters()` gera o trecho `WHERE` parametrizado (`%s`) e os parâmetros; nomes de coluna nunca vêm do
+#    usuário sem passar pela lista do modelo. O prefixo vira `LIKE 'prefixo%'` (curingas escapados), que o MySQL
+#    resolve como busca por intervalo no índice.
+# RAZÃO DE EXISTIR: Buscar as mensagens de um tópico ou janela sem trazer a tabela inteira.
+
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Type, Union, get_args, get_origin
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+OPERATORS = {"eq": "=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<=", "in": "IN", "prefix": "LIKE"}
+MAX_IN_VALUES = 100
+
+
+class FilterError(ValueError):
+    """Filtro inválido (coluna, operador ou valor). As rotas convertem em HTTP 400."""
+
+
+class QueryFilter(NamedTuple):
+    column: str
+    operator: str # Chave de OPERATORS.
+    value: Any # Valor convertido (lista para `in`).
+
+
+def escape_like_prefix(prefix: str) -> str:
+    """Padrão LIKE para "começa com `prefix`", escapando `%`, `_` e a barra invertida."""
+    return prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _is_text(annotation: Any) -> bool:
+    if annotation is str:
+        return True
+    if get_origin(annotation) is Union:
+        return any(_is_text(arg) for arg in get_args(annotation) if arg is not type(None))
+    return False
+
+
+@lru_cache(maxsize=None)
+def _column_types(model: Type[BaseModel], pk_column: str) -> Dict[str, Tuple[TypeAdapter, bool]]:
+    """Coluna -> (conversor do tipo anotado, é texto?). Cacheado por modelo."""
+    columns = {name: (TypeAdapter(field.annotation), _is_text(field.annotation)) for name, field in model.model_fields.items()}
+    columns.setdefault(pk_column, (TypeAdapter(int), False))
+    return columns
+
+
+def filterable_columns(model: Type[BaseModel], pk_column: str) -> List[str]:
+    return sorted(_column_types(model, pk_column))
+
+
+def parse_filters(
+    model: Optional[Type[BaseModel]],
+    pk_column: str,
+    query: Iterable[Tuple[str, str]],
+    reserved: Iterable[str] = (),
+) -> List[QueryFilter]:
+    """Converte os pares da query string em filtros tipados. Levanta `FilterError`."""
+    reserved = set(reserved)
+    pairs = [(key, raw) for key, raw in query if key not in reserved]
+    if not pairs:
+        return []
+    if model is None:
+        raise FilterError("Esta tabela não possui modelo: filtros indisponíveis.")
+
+    columns = _column_types(model, pk_column)
+    filters: List[QueryFilter] = []
+    for key, raw in pairs:
+        column, _, operator = key.partition("__")
+        operator = operator or "eq"
+        if column not in columns:
+            raise FilterError(f"Filtro '{key}': coluna desconhecida. Válidas: {sorted(columns)}.")
+        if operator not in OPERATORS:
+            raise FilterError(f"Filtro '{key}': operador desconhecido. Válidos: {sorted(OPERATORS)}.")
+        adapter, is_text = columns[column]
+        try:
+            if operator == "in":
+                items = [item.strip() for item in raw.split(",") if item.strip()]
+                if not items or len(items) > MAX_IN_VALUES:
+                    raise FilterError(f"Filtro '{key}': informe de 1 a {MAX_IN_VALUES} valores separados por vírgula.")
+                value: Any = [adapter.validate_python(item) for item in items]
+            elif operator == "prefix":
+                if not is_text:
+                    raise FilterError(f"Filtro '{key}': prefixo só se aplica a colunas de texto.")
+                if not raw:
+                    raise FilterError(f"Filtro '{key}': prefixo vazio.")
+                value = raw
+            else:
+                value = adapter.validate_python(raw)
+        except ValidationError as e:
+            raise FilterError(f"Filtro '{key}': valor '{raw}' inválido ({e.errors()[0]['msg']}).") from e
+        filters.append(QueryFilter(column, operator, value))
+    return filters
+
+
+def compile_filters(filters: List[QueryFilter]) -> Tuple[List[str], List[Any]]:
+    """Condições SQL (para juntar com AND) e parâmetros na mesma ordem."""
+    conditions: List[str] = []
+    params: List[Any] = []
+    for column, operator, value in filters:
+        if operator == "in":
+            conditions.append(f"`{column}` IN ({', '.join(['%s'] * len(value))})")
+            params.extend(value)
+        elif operator == "prefix":
+            conditions.append(f"`{column}` LIKE %s")
+            params.append(escape_like_prefix(value))
+        else:
+            conditions.append(f"`{column}` {OPERATORS[operator]} %s")
+            params.append(value)
+    return conditions, params
+
+
+def cache_key(filters: List[QueryFilter]) -> Tuple[Any, ...]:
+    """Representação hashável e independente da ordem dos filtros (chave do cache de consultas)."""
+    return tuple(sorted((column, operator, tuple(value) if isinstance(value, list) else value)
+                        for column, operator, value in filters))
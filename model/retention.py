@@ -0,0 +1,313 @@
+# app/model/retention.py
+
+# FLUXO E A LÓGICA:
+# 1. Cada `RetentionPolicy` diz: tabela, coluna de tempo (DATETIME/TIMESTAMP ou epoch em segundos), idade máxima e,
+#    opcionalmente, um prefixo de tópico (retenção diferente por tópico na mesma tabela).
+# 2. Modo `partition`: a tabela é particionada por RANGE na coluna de tempo (uma partição por dia). A retenção
+#    descarta partições inteiras (`DROP PARTITION`, instantâneo, sem varrer linhas) e cria as partições dos próximos
+#    dias separando a partição `pmax`. Se a tabela não estiver particionada, cai para o modo `delete`.
+# 3. Modo `delete`: `DELETE ... WHERE tempo < corte ORDER BY pk LIMIT n` em blocos pequenos, cada um em sua própria
+#    transação curta (autocommit), com uma pausa entre blocos: a ingestão concorrente nunca espera por um lock longo.
+#    Cada execução tem um orçamento de tempo; o que sobrar fica para a próxima.
+# 4. `RetentionScheduler` roda as políticas periodicamente em uma thread e guarda o último relatório
+#    (linhas removidas, partições descartadas/criadas, segundos gastos e erros por política).
+# RAZÃO DE EXISTIR: `pedidos` recebe uma linha por mensagem MQTT para sempre; sem retenção, tudo fica mais lento com o tempo.
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from model.model_resolver import TABLE_MODEL_MAPPING
+from model.query_filters import escape_like_prefix
+from model.rollups import ROLLUP_TABLE
+from utils.function_execute import execute
+from utils.query_cache import query_cache
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MODE_DELETE = "delete"
+MODE_PARTITION = "partition"
+TIME_DATETIME = "datetime"
+TIME_EPOCH = "epoch"
+
+_IDENTIFIER = re.compile(r"^\w+$")
+
+Execute = Callable[..., Any] # Assinatura de `utils.function_execute.execute(sql=..., params=...)`.
+
+
+def _identifier(value: str, what: str) -> str:
+    if not value or not _IDENTIFIER.match(value):
+        raise ValueError(f"{what} inválido na política de retenção: '{value}'.")
+    return value
+
+
+class RetentionPolicy:
+    """Política de retenção de uma tabela (ou de um prefixo de tópico dentro dela)."""
+
+    def __init__(
+        self,
+        table: str,
+        time_column: str,
+        max_age_days: float,
+        mode: str = MODE_DELETE,
+        time_type: str = TIME_DATETIME,
+        pk_column: Optional[str] = None,
+        topic_column: Optional[str] = None,
+        topic_prefix: Optional[str] = None,
+        chunk_size: int = 5000,
+        future_partitions: int = 3,
+    ) -> None:
+        if mode not in (MODE_DELETE, MODE_PARTITION):
+            raise ValueError(f"Modo de retenção inválido: '{mode}'. Use '{MODE_DELETE}' ou '{MODE_PARTITION}'.")
+        if time_type not in (TIME_DATETIME, TIME_EPOCH):
+            raise ValueError(f"time_type inválido: '{time_type}'. Use '{TIME_DATETIME}' ou '{TIME_EPOCH}'.")
+        if max_age_days <= 0 or chunk_size < 1:
+            raise ValueError("max_age_days e chunk_size devem ser positivos.")
+        if topic_prefix and not topic_column:
+            raise ValueError("topic_prefix exige topic_column.")
+        if topic_prefix and mode == MODE_PARTITION:
+            raise ValueError("Retenção por tópico só é possível no modo 'delete' (uma partição tem todos os tópicos).")
+        self.table = _identifier(table, "Tabela")
+        self.time_column = _identifier(time_column, "Coluna de tempo")
+        self.pk_column = _identifier(pk_column or f"{table}_id", "Chave primária")
+        self.topic_column = _identifier(topic_column, "Coluna de tópico") if topic_column else None
+        self.topic_prefix = topic_prefix
+        self.max_age_days = max_age_days
+        self.mode = mode
+        self.time_type = time_type
+        self.chunk_size = chunk_size
+        self.future_partitions = future_partitions
+
+    @property
+    def name(self) -> str:
+        return f"{self.table}:{self.topic_prefix}" if self.topic_prefix else self.table
+
+    def cutoff(self, now: Optional[float] = None) -> Any:
+        """Instante de corte na unidade da coluna (datetime UTC ou epoch)."""
+        now = time.time() if now is None else now
+        cutoff = now - self.max_age_days * 86400
+        if self.time_type == TIME_EPOCH:
+            return cutoff
+        return datetime.fromtimestamp(cutoff, tz=timezone.utc).replace(tzinfo=None)
+
+    @classmethod
+    def from_dict(cls, entry: Dict[str, Any]) -> "RetentionPolicy":
+        return cls(**entry)
+
+
+def load_policies(path: Optional[str]) -> List[RetentionPolicy]:
+    """Lê as políticas de um arquivo JSON (lista de objetos com os campos de `RetentionPolicy`)."""
+    if not path:
+        return []
+    with open(path, "r", encoding="utf-8") as policies_file:
+        return [RetentionPolicy.from_dict(entry) for entry in json.load(policies_file)]
+
+
+class RetentionManager:
+    """Executa as políticas de retenção usando as funções síncronas do DAO."""
+
+    def __init__(self, execute: Execute, on_pruned: Optional[Callable[[str], None]] = None,
+                 max_seconds: float = 60.0, pause: float = 0.05) -> None:
+        self.execute = execute
+        self.on_pruned = on_pruned # Ex.: invalidar o cache de leitura da tabela.
+        self.max_seconds = max_seconds # Orçamento de tempo por política e por execução.
+        self.pause = pause # Pausa entre blocos de DELETE (dá vez à ingestão).
+
+    def apply(self, policy: RetentionPolicy, now: Optional[float] = None) -> Dict[str, Any]:
+        started = time.monotonic()
+        report: Dict[str, Any] = {"policy": policy.name, "mode": policy.mode, "rows_pruned": 0,
+                                  "partitions_dropped": [], "partitions_created": [], "complete": True, "error": None}
+        try:
+            mode = policy.mode
+            if mode == MODE_PARTITION and not self._partitions(policy):
+                logger.warning(f"Tabela '{policy.table}' não está particionada: retenção por DELETE em blocos.")
+                mode = MODE_DELETE
+            report["mode"] = mode
+            if mode == MODE_PARTITION:
+                self._apply_partitions(policy, report, now)
+            else:
+                self._apply_deletes(policy, report, now, started)
+        except Exception as e:
+            report["error"] = f"{type(e).__name__}: {e}"
+            logger.error(f"Falha na retenção de '{policy.name}': {e}")
+        report["seconds"] = round(time.monotonic() - started, 3)
+        if (report["rows_pruned"] or report["partitions_dropped"]) and self.on_pruned is not None:
+            self.on_pruned(policy.table)
+        return report
+
+    # --- Modo delete ---
+
+    def _apply_deletes(self, policy: RetentionPolicy, report: Dict[str, Any], now: Optional[float], started: float) -> None:
+        where = f"`{policy.time_column}` < %s"
+        params: List[Any] = [policy.cutoff(now)]
+        if policy.topic_prefix:
+            where += f" AND `{policy.topic_column}` LIKE %s"
+            params.append(escape_like_prefix(policy.topic_prefix))
+        # ORDER BY pk: cada bloco percorre o índice da PK em ordem e trava só as linhas que apaga.
+        sql = f"DELETE FROM `{policy.table}` WHERE {where} ORDER BY `{policy.pk_column}` LIMIT %s"
+        params.append(policy.chunk_size)
+        while True:
+            deleted = self.execute(sql=sql, params=tuple(params)) or 0
+            report["rows_pruned"] += deleted
+            if deleted < policy.chunk_size:
+                return
+            if time.monotonic() - started >= self.max_seconds:
+                report["complete"] = False # Continua na próxima execução.
+                return
+            time.sleep(self.pause)
+
+    # --- Modo partition ---
+
+    def _partitions(self, policy: RetentionPolicy) -> List[Dict[str, Any]]:
+        rows = self.execute(
+            sql="SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS bound FROM INFORMATION_SCHEMA.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL "
+                "ORDER BY PARTITION_ORDINAL_POSITION",
+            params=(policy.table,),
+        ) or []
+        return rows
+
+    def _bound_for_day(self, policy: RetentionPolicy, day: date) -> int:
+        """Limite superior (exclusivo) da partição que contém `day`, na unidade da expressão de particionamento."""
+        next_day = day + timedelta(days=1)
+        if policy.time_type == TIME_EPOCH:
+            return int(datetime(next_day.year, next_day.month, next_day.day, tzinfo=timezone.utc).timestamp())
+        # RANGE (TO_DAYS(coluna)): TO_DAYS conta dias desde o ano 0; date.toordinal() conta desde o ano 1.
+        return next_day.toordinal() + 365
+
+    def _apply_partitions(self, policy: RetentionPolicy, report: Dict[str, Any], now: Optional[float]) -> None:
+        partitions = self._partitions(policy)
+        today = datetime.fromtimestamp(time.time() if now is None else now, tz=timezone.utc).date()
+        cutoff_day = today - timedelta(days=policy.max_age_days)
+        cutoff_bound = self._bound_for_day(policy, cutoff_day - timedelta(days=1))
+
+        # 1. Descarta partições cujo limite superior já está antes do corte (todas as linhas são antigas).
+        expired = [p["name"] for p in partitions if p["bound"] not in (None, "MAXVALUE") and int(p["bound"]) <= cutoff_bound]
+        if expired and len(expired) < len(partitions):
+            self.execute(sql=f"ALTER TABLE `{policy.table}` DROP PARTITION {', '.join(f'`{name}`' for name in expired)}")
+            report["partitions_dropped"] = expired
+
+        # 2. Cria as partições dos próximos dias a partir de `pmax` (se ainda não existirem).
+        has_max = any(p["bound"] == "MAXVALUE" for p in partitions)
+        existing = {int(p["bound"]) for p in partitions if p["bound"] not in (None, "MAXVALUE")}
+        new_parts = []
+        for offset in range(policy.future_partitions + 1):
+            day = today + timedelta(days=offset)
+            bound = self._bound_for_day(policy, day)
+            if bound not in existing and (not existing or bound > max(existing)):
+                new_parts.append((f"p{day:%Y%m%d}", bound))
+        if new_parts and has_max:
+            max_name = next(p["name"] for p in partitions if p["bound"] == "MAXVALUE")
+            definitions = ", ".join(f"PARTITION `{name}` VALUES LESS THAN ({bound})" for name, bound in new_parts)
+            self.execute(sql=f"ALTER TABLE `{policy.table}` REORGANIZE PARTITION `{max_name}` INTO "
+                             f"({definitions}, PARTITION `{max_name}` VALUES LESS THAN MAXVALUE)")
+            report["partitions_created"] = [name for name, _ in new_parts]
+
+
+class RetentionScheduler:
+    """Thread que aplica as políticas a cada `interval` segundos e guarda o último relatório."""
+
+    def __init__(self, manager: RetentionManager, policies: List[RetentionPolicy], interval: float = 3600.0) -> None:
+        self.manager = manager
+        self.policies = policies
+        self.interval = interval
+        self.last_report: Optional[Dict[str, Any]] = None
+        self.totals = {"runs": 0, "rows_pruned": 0, "partitions_dropped": 0}
+        self._run_lock = threading.Lock() # Execução agendada e manual nunca se sobrepõem.
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if not self.policies or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="retention-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def run_once(self) -> Dict[str, Any]:
+        with self._run_lock:
+            started_at = time.time()
+            results = [self.manager.apply(policy) for policy in self.policies]
+            report = {
+                "started_at": started_at,
+                "seconds": round(time.time() - started_at, 3),
+                "rows_pruned": sum(result["rows_pruned"] for result in results),
+                "policies": results,
+            }
+            self.totals["runs"] += 1
+            self.totals["rows_pruned"] += report["rows_pruned"]
+            self.totals["partitions_dropped"] += sum(len(result["partitions_dropped"]) for result in results)
+            self.last_report = report
+            logger.info("Retenção executada", extra={"rows_pruned": report["rows_pruned"], "seconds": report["seconds"]})
+            return report
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "interval": self.interval,
+            "policies": [policy.name for policy in self.policies],
+            "totals": dict(self.totals),
+            "last_report": self.last_report,
+        }
+
+
+# --- Instância da aplicação (configurada por variáveis de ambiente) ---
+
+# Desativada por padrão: a retenção APAGA dados.
+RETENTION_ENABLED = os.getenv("RETENTION_ENABLED", "false").lower() in ("1", "true", "yes")
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", 3600))
+RETENTION_POLICIES_FILE = os.getenv("RETENTION_POLICIES_FILE", "retention_policies.json")
+RETENTION_MAX_SECONDS = float(os.getenv("RETENTION_MAX_SECONDS", 60))
+RETENTION_CHUNK_PAUSE = float(os.getenv("RETENTION_CHUNK_PAUSE", 0.05))
+
+retention_scheduler: Optional[RetentionScheduler] = None
+
+
+def _known_tables() -> set:
+    return set(TABLE_MODEL_MAPPING) | {ROLLUP_TABLE}
+
+
+def get_retention_scheduler() -> RetentionScheduler:
+    """Cria (uma vez) o agendador com as políticas do arquivo; tabelas desconhecidas são rejeitadas."""
+    global retention_scheduler
+    if retention_scheduler is None:
+        policies = load_policies(RETENTION_POLICIES_FILE) if os.path.exists(RETENTION_POLICIES_FILE) else []
+        unknown = [policy.table for policy in policies if policy.table not in _known_tables()]
+        if unknown:
+            raise ValueError(f"Políticas de retenção para tabelas desconhecidas: {unknown}.")
+        manager = RetentionManager(execute, on_pruned=query_cache.invalidate,
+                                   max_seconds=RETENTION_MAX_SECONDS, pause=RETENTION_CHUNK_PAUSE)
+        retention_scheduler = RetentionScheduler(manager, policies, interval=RETENTION_INTERVAL)
+    return retention_scheduler
+
+
+def start_retention() -> None:
+    if not RETENTION_ENABLED:
+        return
+    scheduler = get_retention_scheduler()
+    scheduler.start()
+    logger.info(f"Retenção agendada a cada {RETENTION_INTERVAL:.0f}s para: {[p.name for p in scheduler.policies]}")
+
+
+def stop_retention() -> None:
+    if retention_scheduler is not None:
+        retention_scheduler.stop(timeout=RETENTION_MAX_SECONDS + 5)
@@ -0,0 +1,192 @@
+# app/model/rollups.py
+
+# FLUXO E A LÓGICA:
+# 1. `RollupAggregator.add()` é chamado pela ingestão MQTT depois que um lote foi gravado: para cada mensagem,
+#    cada campo numérico configurado (ex.: `valor`) e cada resolução (ex.: 60s e 3600s), atualiza em memória o
+#    agregado do balde (tópico, campo, resolução, início do balde): count, sum, min, max e o último valor.
+# 2. `RollupFlusher` (thread) troca o dicionário de agregados por um vazio a cada `interval` segundos e grava tudo com
+#    um único `INSERT ... ON DUPLICATE KEY UPDATE` em lote: baldes já existentes são COMBINADOS (somas e contagens
+#    acumulam, min/max comparam, o último valor fica com a leitura mais recente).
+# 3. Se a gravação falhar, os agregados voltam para a memória e são combinados com os novos no próximo flush.
+# 4. A tabela `mqtt_rollups` é criada na primeira gravação (`CREATE TABLE IF NOT EXISTS`).
+# RAZÃO DE EXISTIR: Gráficos de médias por minuto/hora leem milhares de baldes em vez de milhões de linhas brutas.
+
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from model.topic_router import FieldSource, compile_field_source
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_TABLE = "mqtt_rollups"
+
+ROLLUP_TABLE_DDL = f"""
+CREATE TABLE IF NOT EXISTS `{ROLLUP_TABLE}` (
+    `topic` VARCHAR(255) NOT NULL,
+    `field` VARCHAR(64) NOT NULL,
+    `resolution` INT NOT NULL,
+    `bucket_start` BIGINT NOT NULL,
+    `count` BIGINT NOT NULL,
+    `sum` DOUBLE NOT NULL,
+    `min` DOUBLE NOT NULL,
+    `max` DOUBLE NOT NULL,
+    `last` DOUBLE NOT NULL,
+    `last_at` DOUBLE NOT NULL,
+    PRIMARY KEY (`topic`, `field`, `resolution`, `bucket_start`)
+)
+"""
+
+# `last` vem antes de `last_at`: o MySQL avalia as atribuições da esquerda para a direita com os valores já atualizados.
+ROLLUP_UPSERT_SQL = (
+    f"INSERT INTO `{ROLLUP_TABLE}` (`topic`, `field`, `resolution`, `bucket_start`, `count`, `sum`, `min`, `max`, `last`, `last_at`) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE "
+    "`count` = `count` + VALUES(`count`), "
+    "`sum` = `sum` + VALUES(`sum`), "
+    "`min` = LEAST(`min`, VALUES(`min`)), "
+    "`max` = GREATEST(`max`, VALUES(`max`)), "
+    "`last` = IF(VALUES(`last_at`) >= `last_at`, VALUES(`last`), `last`), "
+    "`last_at` = GREATEST(`last_at`, VALUES(`last_at`))"
+)
+
+BucketKey = Tuple[str, str, int, int] # (tópico, campo, resolução em segundos, início do balde em epoch)
+
+
+class RollupAggregator:
+    """Agregados incrementais em memória por (tópico, campo, resolução, balde). Thread-safe."""
+
+    def __init__(self, fields: Sequence[str], resolutions: Sequence[int]) -> None:
+        if not fields or not resolutions or any(resolution <= 0 for resolution in resolutions):
+            raise ValueError("Rollups exigem ao menos um campo e resoluções positivas (segundos).")
+        self.fields: Tuple[Tuple[str, FieldSource], ...] = tuple((field, compile_field_source(field)) for field in fields)
+        self.resolutions = tuple(sorted(set(int(resolution) for resolution in resolutions)))
+        # Valor: [count, sum, min, max, last, last_at]
+        self._buckets: Dict[BucketKey, List[float]] = {}
+        self._lock = threading.Lock()
+        self.samples = 0
+
+    def add(self, topic: str, data: Any, received_at: float) -> None:
+        """Acumula os campos numéricos de uma mensagem em todos os baldes de resolução."""
+        levels = topic.split("/")
+        values = []
+        for field, extract in self.fields:
+            value = extract(levels, topic, data, None)
+            # bool é subclasse de int, mas não é uma medida.
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                values.append((field, float(value)))
+        if not values:
+            return
+        with self._lock:
+            for field, value in values:
+                for resolution in self.resolutions:
+                    bucket_start = int(received_at // resolution) * resolution
+                    self._merge_locked((topic, field, resolution, bucket_start), [1, value, value, value, value, received_at])
+            self.samples += len(values)
+
+    def add_many(self, records: Iterable[Any]) -> None:
+        for record in records:
+            self.add(record.topic, record.data, record.received_at)
+
+    def _merge_locked(self, key: BucketKey, other: List[float]) -> None:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._buckets[key] = list(other)
+            return
+        bucket[0] += other[0]
+        bucket[1] += other[1]
+        if other[2] < bucket[2]:
+            bucket[2] = other[2]
+        if other[3] > bucket[3]:
+            bucket[3] = other[3]
+        if other[5] >= bucket[5]:
+            bucket[4], bucket[5] = other[4], other[5]
+
+    def drain(self) -> Dict[BucketKey, List[float]]:
+        """Retira todos os agregados pendentes (troca por um dicionário vazio)."""
+        with self._lock:
+            buckets, self._buckets = self._buckets, {}
+        return buckets
+
+    def restore(self, buckets: Dict[BucketKey, List[float]]) -> None:
+        """Devolve agregados que não puderam ser gravados (combinando com os acumulados nesse meio tempo)."""
+        with self._lock:
+            for key, bucket in buckets.items():
+                self._merge_locked(key, bucket)
+
+    def pending(self) -> int:
+        return len(self._buckets)
+
+
+class RollupFlusher:
+    """Thread que grava periodicamente os agregados em `mqtt_rollups` (upsert em lote)."""
+
+    def __init__(
+        self,
+        aggregator: RollupAggregator,
+        execute: Callable[[str], Any],
+        execute_many: Callable[[str, List[Tuple[Any, ...]]], Any],
+        interval: float = 10.0,
+        on_flushed: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.aggregator = aggregator
+        self.execute = execute
+        self.execute_many = execute_many
+        self.interval = interval
+        self.on_flushed = on_flushed # Ex.: invalidar o cache de leitura da tabela de rollups.
+        self.flushed_buckets = 0
+        self.last_error: Optional[str] = None
+        self._table_ready = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="mqtt-rollup-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Para a thread e faz um último flush."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self) -> int:
+        """Grava os agregados pendentes. Retorna o número de baldes gravados (0 se nada pendente ou em erro)."""
+        buckets = self.aggregator.drain()
+        if not buckets:
+            return 0
+        rows = [key + tuple(bucket[:4]) + (bucket[4], bucket[5]) for key, bucket in buckets.items()]
+        try:
+            if not self._table_ready:
+                self.execute(ROLLUP_TABLE_DDL)
+                self._table_ready = True
+            self.execute_many(ROLLUP_UPSERT_SQL, rows)
+        except Exception as e:
+            self.aggregator.restore(buckets)
+            self.last_error = f"{type(e).__name__}: {e}"
+            logger.error(f"Falha ao gravar {len(rows)} baldes de rollup (nova tentativa no próximo flush): {e}")
+            return 0
+        self.flushed_buckets += len(rows)
+        self.last_error = None
+        if self.on_flushed is not None:
+            self.on_flushed()
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "fields": [field for field, _ in self.aggregator.fields],
+            "resolutions": list(self.aggregator.resolutions),
+            "pending_buckets": self.aggregator.pending(),
+            "samples": self.aggregator.samples,
+            "flushed_buckets": self.flushed_buckets,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,320 @@
+# app/model/spill_log.py
+
+# FLUXO E A LÓGICA:
+# 1. `SpillLog` é um log local só-de-acréscimo (write-ahead) dividido em segmentos `spill-<seq>.ndjson` em um diretório.
+#    A fila de ingestão grava nele os lotes que falharam no MySQL e o excedente quando a fila está cheia.
+#    Cada linha é uma mensagem: tópico, payload original (ou dados decodificados) e instante de recebimento.
+# 2. O segmento ativo é rotacionado ao passar de `segment_max_bytes`; segmentos fechados não mudam mais.
+#    A numeração nunca se repete (continua depois do maior entre o último segmento e o checkpoint): um checkpoint
+#    antigo nunca pula bytes de um segmento novo com o mesmo número.
+# 3. `SpillReplayer` (thread) lê o segmento mais antigo a partir do checkpoint, reenvia as mensagens em lotes para a
+#    mesma função de persistência da fila e avança o checkpoint a cada lote gravado. Segmento esgotado é apagado.
+#    - Erro transitório (DB fora/ocupado): espera com backoff exponencial e tenta o mesmo lote de novo, SEM limite
+#      enquanto o DB estiver fora (`last_error` e o atraso aparecem em `stats()`).
+#    - Lote envenenado: se `is_healthy` (ex.: `SELECT 1`) responde e o mesmo lote ainda falha `max_attempts` vezes,
+#      o problema é o lote, não o DB: ele vai para `dead-letter.ndjson` e os segmentos seguintes não ficam travados.
+#    - Erro permanente (dado rejeitado pelo DB): o lote vai direto para o dead-letter e o replay segue.
+# 4. `stats()` expõe segmentos, bytes pendentes e o atraso do replay (idade da mensagem mais antiga não gravada).
+# RAZÃO DE EXISTIR: Com QoS 0 o broker não reenvia; uma queda curta do MySQL deve custar latência, não dados.
+
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from model.ingest_pipeline import IngestRecord
+from utils import fast_json
+
+logger = logging.getLogger(__name__)
+
+_SEGMENT = re.compile(r"^spill-(\d{10})\.ndjson$")
+CHECKPOINT_FILE = "replay.checkpoint"
+DEAD_LETTER_FILE = "dead-letter.ndjson"
+
+
+def _encode(record: IngestRecord) -> bytes:
+    entry: Dict[str, Any] = {"topic": record.topic, "received_at": record.received_at}
+    if record.raw is not None:
+        entry["raw"] = record.raw # O payload original já é JSON: sem re-serializar `data`.
+    else:
+        entry["data"] = record.data
+    return (fast_json.dumps(entry) + "\n").encode("utf-8")
+
+
+def _decode(line: bytes) -> IngestRecord:
+    entry = fast_json.loads(line)
+    raw = entry.get("raw")
+    data = fast_json.loads(raw) if raw is not None else entry.get("data")
+    return IngestRecord(entry["topic"], data, entry["received_at"], raw)
+
+
+class SpillLog:
+    """Log segmentado em disco. `append()` é thread-safe; a leitura é feita por um único `SpillReplayer`."""
+
+    def __init__(self, directory: str, segment_max_bytes: int = 64 * 1024 * 1024, fsync: bool = False) -> None:
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync = fsync # True: cada append sobrevive a queda de energia (mais lento).
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._active = None # Arquivo aberto do segmento ativo.
+        self._active_seq = 0
+        self._active_size = 0
+        segments = self.segments()
+        # Depois de tudo reenviado e apagado, o checkpoint é o único registro da última sequência usada.
+        self._next_seq = max(segments[-1] if segments else 0, self.read_checkpoint()[0]) + 1
+        self.appended = 0
+        self.replayed = 0
+        self.dead_lettered = 0
+
+    # --- Segmentos ---
+
+    def _path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"spill-{seq:010d}.ndjson")
+
+    def segments(self) -> List[int]:
+        """Sequências dos segmentos existentes, do mais antigo ao mais novo."""
+        found = []
+        for name in os.listdir(self.directory):
+            match = _SEGMENT.match(name)
+            if match:
+                found.append(int(match.group(1)))
+        return sorted(found)
+
+    def _open_new_segment_locked(self) -> None:
+        self._close_active_locked()
+        self._active_seq = self._next_seq
+        self._next_seq += 1
+        self._active = open(self._path(self._active_seq), "ab")
+        self._active_size = 0
+
+    def _close_active_locked(self) -> None:
+        if self._active is not None:
+            self._active.close()
+            self._active = None
+
+    # --- Escrita ---
+
+    def append(self, records: List[IngestRecord]) -> None:
+        """Acrescenta registros ao segmento ativo (rotaciona se passar do tamanho máximo). Levanta OSError."""
+        if not records:
+            return
+        payload = b"".join(_encode(record) for record in records)
+        with self._lock:
+            if self._active is None or self._active_size >= self.segment_max_bytes:
+                self._open_new_segment_locked()
+            self._active.write(payload)
+            self._active.flush()
+            if self.fsync:
+                os.fsync(self._active.fileno())
+            self._active_size += len(payload)
+            self.appended += len(records)
+
+    def seal(self) -> None:
+        """Fecha o segmento ativo: o próximo append abre outro, e o replayer pode consumir este."""
+        with self._lock:
+            self._close_active_locked()
+
+    def close(self) -> None:
+        self.seal()
+
+    # --- Leitura (replayer) ---
+
+    def oldest_sealed(self) -> Optional[int]:
+        """Segmento mais antigo que não está recebendo escritas (sela o ativo se ele for o único com dados)."""
+        with self._lock:
+            segments = self.segments()
+            sealed = [seq for seq in segments if self._active is None or seq != self._active_seq]
+            if not sealed and self._active is not None and self._active_size > 0:
+                self._close_active_locked()
+                sealed = [self._active_seq]
+        return sealed[0] if sealed else None
+
+    def read_checkpoint(self) -> Tuple[int, int]:
+        try:
+            with open(os.path.join(self.directory, CHECKPOINT_FILE), "r", encoding="utf-8") as checkpoint:
+                seq, offset = checkpoint.read().split()
+                return int(seq), int(offset)
+        except (OSError, ValueError):
+            return 0, 0
+
+    def write_checkpoint(self, seq: int, offset: int) -> None:
+        # Escrita atômica (arquivo temporário + replace): um crash não deixa checkpoint corrompido.
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as checkpoint:
+            checkpoint.write(f"{seq} {offset}")
+        os.replace(path + ".tmp", path)
+
+    def read_batch(self, seq: int, offset: int, max_records: int) -> Tuple[List[IngestRecord], int]:
+        """Lê até `max_records` mensagens do segmento a partir de `offset`. Retorna (registros, novo offset)."""
+        records: List[IngestRecord] = []
+        with open(self._path(seq), "rb") as segment:
+            segment.seek(offset)
+            while len(records) < max_records:
+                line = segment.readline()
+                if not line or not line.endswith(b"\n"):
+                    break # Fim do segmento (ou linha parcial de um crash durante a escrita).
+                offset += len(line)
+                try:
+                    records.append(_decode(line))
+                except (ValueError, KeyError) as e:
+                    logger.error(f"Linha inválida no segmento de spill {seq} (ignorada): {e}")
+        return records, offset
+
+    def remove_segment(self, seq: int) -> None:
+        try:
+            os.remove(self._path(seq))
+        except OSError as e:
+            logger.error(f"Falha ao remover o segmento de spill {seq}: {e}")
+
+    def dead_letter(self, records: List[IngestRecord]) -> None:
+        with open(os.path.join(self.directory, DEAD_LETTER_FILE), "ab") as dead:
+            dead.write(b"".join(_encode(record) for record in records))
+        self.dead_lettered += len(records)
+
+    def pending_bytes(self) -> int:
+        seq, offset = self.read_checkpoint()
+        total = 0
+        for segment in self.segments():
+            try:
+                size = os.path.getsize(self._path(segment))
+            except OSError:
+                continue
+            total += size - offset if segment == seq else size
+        return max(total, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "segments": len(self.segments()),
+            "pending_bytes": self.pending_bytes(),
+            "appended": self.appended,
+            "replayed": self.replayed,
+            "dead_lettered": self.dead_lettered,
+        }
+
+
+class SpillReplayer:
+    """Thread que drena o `SpillLog` para o MySQL quando ele volta a aceitar escritas."""
+
+    def __init__(
+        self,
+        spill: SpillLog,
+        persist_batch: Callable[[List[IngestRecord]], None],
+        batch_size: int = 500,
+        interval: float = 2.0,
+        max_backoff: float = 60.0,
+        max_attempts: int = 20,
+        is_retryable: Callable[[Exception], bool] = lambda e: True,
+        is_healthy: Optional[Callable[[], bool]] = None,
+        can_replay: Callable[[], bool] = lambda: True,
+    ) -> None:
+        self.spill = spill
+        self.persist_batch = persist_batch
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.is_retryable = is_retryable
+        self.is_healthy = is_healthy # Sem sonda: erros transitórios nunca mandam o lote ao dead-letter.
+        self.can_replay = can_replay # Ex.: só reenvia quando a fila ao vivo não está acumulando.
+        self.oldest_pending: Optional[float] = None # `received_at` da próxima mensagem a reenviar.
+        self.last_error: Optional[str] = None
+        self._attempts: Tuple[Tuple[int, int], int] = ((-1, -1), 0) # (checkpoint, falhas com o DB respondendo)
+        self.failures = 0 # Falhas transitórias seguidas (zera a cada lote gravado).
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="mqtt-spill-replayer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        backoff = self.interval
+        while not self._stop.is_set():
+            try:
+                if self.can_replay() and self.replay_once():
+                    backoff = self.interval
+                    continue # Havia dados: segue drenando sem esperar.
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.warning(f"Replay do spill adiado ({backoff:.1f}s): {self.last_error}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            self._stop.wait(self.interval)
+
+    def replay_once(self) -> bool:
+        """Reenvia um lote. Retorna True se havia algo a reenviar; levanta a exceção de erros transitórios."""
+        seq = self.spill.oldest_sealed()
+        if seq is None:
+            self.oldest_pending = None
+            return False
+        checkpoint_seq, offset = self.spill.read_checkpoint()
+        if checkpoint_seq != seq:
+            offset = 0
+        records, next_offset = self.spill.read_batch(seq, offset, self.batch_size)
+        if not records:
+            if next_offset == offset:
+                # Segmento esgotado: apaga e zera o checkpoint para o próximo.
+                self.spill.remove_segment(seq)
+                self.spill.write_checkpoint(seq + 1, 0)
+                return True
+            self.spill.write_checkpoint(seq, next_offset) # Só havia linhas inválidas.
+            return True
+
+        self.oldest_pending = records[0].received_at
+        try:
+            self.persist_batch(records)
+        except Exception as e:
+            if self.is_retryable(e):
+                self.failures += 1
+                if not self._poisoned(seq, offset):
+                    raise # DB fora: tenta de novo, sem limite, com backoff.
+                logger.error(f"Lote do spill ({len(records)} mensagens) falhou {self.max_attempts} vezes com o DB "
+                             f"respondendo: enviado ao dead-letter: {e}")
+            else:
+                logger.error(f"Lote do spill rejeitado pelo DB ({len(records)} mensagens) enviado ao dead-letter: {e}")
+            self.spill.dead_letter(records)
+        else:
+            self.spill.replayed += len(records)
+        self.spill.write_checkpoint(seq, next_offset)
+        self.last_error = None
+        self.failures = 0
+        return True
+
+    def _poisoned(self, seq: int, offset: int) -> bool:
+        """Conta a falha do lote só se o DB responde à sonda; True quando atinge `max_attempts`."""
+        if self.is_healthy is None:
+            return False
+        try:
+            healthy = self.is_healthy()
+        except Exception:
+            healthy = False
+        if not healthy:
+            return False
+        checkpoint, attempts = self._attempts
+        attempts = attempts + 1 if checkpoint == (seq, offset) else 1
+        self._attempts = ((seq, offset), attempts)
+        return attempts >= self.max_attempts
+
+    def stats(self) -> Dict[str, Any]:
+        lag = round(time.time() - self.oldest_pending, 3) if self.oldest_pending is not None else 0.0
+        return {
+            **self.spill.stats(),
+            "replaying": self._thread is not None and self._thread.is_alive(),
+            "replay_lag_seconds": lag,
+            "last_error": self.last_error,
+            "consecutive_failures": self.failures,
+        }
@@ -0,0 +1,99 @@
+# app/model/statement_cache.py
+
+# FLUXO E A LÓGICA:
+# 1. `StatementCache` guarda o SQL já montado por (tipo, tabela, conjunto de colunas): a primeira chamada monta a string,
+#    as seguintes são apenas uma consulta a dicionário.
+# 2. `precompile()` monta no startup os INSERT/UPDATE/DELETE de cada tabela de `TABLE_MODEL_MAPPING` (todas as colunas
+#    do modelo), com a chave primária do registro de tabelas.
+# 3. Cada `CompiledStatement` já carrega o tipo do comando (`kind`), então `Database.execute_comand` não re-analisa o SQL.
+# 4. `statement_kind()` resolve o tipo de SQLs livres uma única vez por texto (lru_cache).
+# RAZÃO DE EXISTIR: Tirar montagem de strings e parsing do caminho quente (inserções HTTP e MQTT).
+
+from functools import lru_cache
+from typing import Dict, Iterator, Mapping, NamedTuple, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+
+class CompiledStatement(NamedTuple):
+    """SQL pronto para execução + metadados usados pelo DAO."""
+    sql: str
+    kind: str # "select" | "insert" | "update" | "delete" | ...
+    table: str
+    columns: Tuple[str, ...]
+
+
+@lru_cache(maxsize=1024)
+def statement_kind(sql: str) -> str:
+    """Tipo do comando (primeira palavra, minúscula). Cacheado por texto de SQL."""
+    return sql.lstrip().split(None, 1)[0].lower() if sql.strip() else ""
+
+
+class StatementCache:
+    """Cache de comandos SQL por (tipo, tabela, colunas). Leituras não precisam de lock (dict do CPython)."""
+
+    def __init__(self) -> None:
+        self._statements: Dict[Tuple[str, str, Tuple[str, ...]], CompiledStatement] = {}
+
+    def _store(self, key: Tuple[str, str, Tuple[str, ...]], sql: str) -> CompiledStatement:
+        # setdefault: se duas threads montarem o mesmo comando ao mesmo tempo, ambas usam a mesma instância.
+        return self._statements.setdefault(key, CompiledStatement(sql, key[0], key[1], key[2]))
+
+    def insert(self, table: str, columns: Tuple[str, ...]) -> CompiledStatement:
+        """INSERT INTO `table` (colunas) VALUES (%s, ...). Serve para `execute` e `executemany`."""
+        key = ("insert", table, columns)
+        statement = self._statements.get(key)
+        if statement is None:
+            column_list = ", ".join(f"`{column}`" for column in columns)
+            placeholders = ", ".join(["%s"] * len(columns))
+            statement = self._store(key, f"INSERT INTO `{table}` ({column_list}) VALUES ({placeholders})")
+        return statement
+
+    def insert_ignore_duplicates(self, table: str, columns: Tuple[str, ...], pk_column: str) -> CompiledStatement:
+        """INSERT ... ON DUPLICATE KEY UPDATE `pk` = `pk`: linha que viola um índice UNIQUE é ignorada (sem erro nem escrita).
+        Ao contrário de INSERT IGNORE, erros de dados (tipo, NOT NULL) continuam sendo erros."""
+        key = ("insert_ignore_duplicates", table, columns + (pk_column,))
+        statement = self._statements.get(key)
+        if statement is None:
+            sql = f"{self.insert(table, columns).sql} ON DUPLICATE KEY UPDATE `{pk_column}` = `{pk_column}`"
+            # O DAO trata como um INSERT comum (`kind`).
+            statement = self._statements.setdefault(key, CompiledStatement(sql, "insert", table, columns))
+        return statement
+
+    def update(self, table: str, columns: Tuple[str, ...], pk_column: str) -> CompiledStatement:
+        """UPDATE `table` SET coluna = %s, ... WHERE `pk` = %s (o ID é o último parâmetro)."""
+        key = ("update", table, columns + (pk_column,))
+        statement = self._statements.get(key)
+        if statement is None:
+            sql_set = ", ".join(f"`{column}` = %s" for column in columns)
+            statement = self._store(key, f"UPDATE `{table}` SET {sql_set} WHERE `{pk_column}` = %s")
+        return statement
+
+    def delete(self, table: str, pk_column: str) -> CompiledStatement:
+        """DELETE FROM `table` WHERE `pk` = %s."""
+        key = ("delete", table, (pk_column,))
+        statement = self._statements.get(key)
+        if statement is None:
+            statement = self._store(key, f"DELETE FROM `{table}` WHERE `{pk_column}` = %s")
+        return statement
+
+    def precompile(self, mapping: Mapping[str, Type[BaseModel]], primary_keys: Optional[Mapping[str, str]] = None) -> int:
+        """Monta os comandos de todas as tabelas mapeadas (colunas completas do modelo). Retorna quantos existem no cache."""
+        primary_keys = primary_keys or {}
+        for table, model in mapping.items():
+            columns = tuple(model.model_fields)
+            pk_column = primary_keys.get(table, f"{table}_id")
+            self.insert(table, columns)
+            self.update(table, columns, pk_column)
+            self.delete(table, pk_column)
+        return len(self._statements)
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+    def __iter__(self) -> Iterator[CompiledStatement]:
+        return iter(list(self._statements.values()))
+
+
+# Instância global (Escopo de Módulo), compartilhada por rotas HTTP e pela ingestão MQTT.
+statements = StatementCache()
@@ -0,0 +1,220 @@
+# app/model/table_registry.py
+
+# FLUXO E A LÓGICA:
+# 1. `TableRegistry` concentra o que antes estava espalhado pelas rotas: quais tabelas são expostas e para quais
+#    operações (antes `TABLES_WHITELIST` em route_get/route_delete), o modelo Pydantic (antes `get_model_for_table`
+#    a cada requisição) e a chave primária (antes adivinhada como `{tabela}_id` a cada requisição).
+# 2. No import, o registro é montado só com os modelos (`TABLE_MODEL_MAPPING`) e a PK presumida: a API funciona
+#    mesmo com o banco fora do ar.
+# 3. No startup, `refresh()` lê `INFORMATION_SCHEMA` (colunas, tipos, PK e índices) e troca o registro inteiro de
+#    uma vez por estruturas imutáveis (`TableInfo`, `MappingProxyType`, `frozenset`).
+# 4. A coluna de mudança (`change_column`, ex.: `atualizado_em ... ON UPDATE CURRENT_TIMESTAMP`) é detectada no
+#    schema ou declarada em `TABLE_CHANGE_COLUMNS`; ela habilita a sincronização incremental (`since_version`).
+# 5. As rotas e a ingestão MQTT fazem apenas `registry.require(tabela, operação)`: uma consulta a dicionário.
+# RAZÃO DE EXISTIR: Uma única fonte de metadados das tabelas, resolvida uma vez, em vez de strings e buscas por requisição.
+
+import logging
+import os
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, Mapping, NamedTuple, Optional, Tuple, Type
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from model.model_resolver import TABLE_MODEL_MAPPING
+from utils.function_execute import execute_async
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+OP_READ = "read"
+OP_EXPORT = "export"
+OP_INSERT = "insert"
+OP_UPDATE = "update"
+OP_DELETE = "delete"
+
+# Tabelas expostas para leitura, exportação e exclusão (antes `TABLES_WHITELIST` em route_get e route_delete).
+READ_DELETE_TABLES = ("categoria_pedidos", "pedidos")
+
+# Colunas de mudança declaradas ("tabela:coluna,..."), para tabelas sem `ON UPDATE CURRENT_TIMESTAMP` no schema.
+TABLE_CHANGE_COLUMNS = dict(
+    entry.strip().split(":", 1) for entry in os.getenv("TABLE_CHANGE_COLUMNS", "").split(",") if ":" in entry
+)
+
+
+class ColumnInfo(NamedTuple):
+    name: str
+    data_type: Optional[str] # Tipo do MySQL (None antes da introspecção).
+    nullable: bool
+    in_model: bool # Coluna aceita pelo modelo Pydantic (escrita/projeção/filtro).
+
+
+class TableInfo(NamedTuple):
+    """Metadados imutáveis de uma tabela."""
+    name: str
+    pk: str
+    model: Optional[Type[BaseModel]]
+    columns: Mapping[str, ColumnInfo]
+    model_fields: FrozenSet[str]
+    indexes: Mapping[str, Tuple[str, ...]] # Nome do índice -> colunas, na ordem.
+    leading_columns: FrozenSet[str] # Colunas que iniciam algum índice (servem para WHERE coluna = x).
+    operations: FrozenSet[str]
+    introspected: bool # False: metadados só dos modelos (PK presumida).
+    change_column: Optional[str] = None # DATETIME/TIMESTAMP atualizado a cada escrita da linha (delta sync).
+
+    def allows(self, operation: str) -> bool:
+        return operation in self.operations
+
+
+def _operations(table: str, model: Optional[Type[BaseModel]]) -> FrozenSet[str]:
+    operations = set()
+    if table in READ_DELETE_TABLES:
+        operations.update((OP_READ, OP_EXPORT, OP_DELETE))
+    if model is not None:
+        operations.update((OP_INSERT, OP_UPDATE))
+    return frozenset(operations)
+
+
+def _build(
+    table: str,
+    model: Optional[Type[BaseModel]],
+    schema_columns: Optional[Iterable[Dict[str, Any]]] = None,
+    pk: Optional[str] = None,
+    indexes: Optional[Mapping[str, Tuple[str, ...]]] = None,
+) -> TableInfo:
+    model_fields = frozenset(model.model_fields) if model is not None else frozenset()
+    schema_columns = list(schema_columns) if schema_columns is not None else None
+    if schema_columns is None:
+        columns = {name: ColumnInfo(name, None, True, True) for name in model_fields}
+    else:
+        columns = {
+            row["column_name"]: ColumnInfo(row["column_name"], row["data_type"].lower(),
+                                           row["is_nullable"] == "YES", row["column_name"] in model_fields)
+            for row in schema_columns
+        }
+    indexes = dict(indexes or {})
+    change_column = TABLE_CHANGE_COLUMNS.get(table)
+    if change_column is None and schema_columns is not None:
+        change_column = next((row["column_name"] for row in schema_columns
+                              if "on update" in (row.get("extra") or "").lower()), None)
+    return TableInfo(
+        name=table,
+        pk=pk or f"{table}_id",
+        model=model,
+        columns=MappingProxyType(columns),
+        model_fields=model_fields,
+        indexes=MappingProxyType(indexes),
+        leading_columns=frozenset(columns_[0] for columns_ in indexes.values() if columns_),
+        operations=_operations(table, model),
+        introspected=schema_columns is not None,
+        change_column=change_column,
+    )
+
+
+class TableRegistry:
+    """Registro de tabelas. O dicionário é substituído inteiro no refresh: leituras não precisam de lock."""
+
+    def __init__(self, models: Mapping[str, Type[BaseModel]]) -> None:
+        self.models = dict(models)
+        self._tables: Mapping[str, TableInfo] = MappingProxyType({
+            table: _build(table, self.models.get(table)) for table in self._exposed_tables()
+        })
+
+    def _exposed_tables(self) -> Tuple[str, ...]:
+        return tuple(dict.fromkeys((*READ_DELETE_TABLES, *self.models)))
+
+    # --- Consulta (caminho quente) ---
+
+    def get(self, table: str) -> Optional[TableInfo]:
+        return self._tables.get(table)
+
+    def require(self, table: str, operation: str) -> TableInfo:
+        """Metadados da tabela se ela permite a operação; senão HTTP 400 (mesma resposta das antigas whitelists)."""
+        info = self._tables.get(table)
+        if info is None or operation not in info.operations:
+            raise HTTPException(status_code=400, detail=f"A tabela '{table}' não é válida para esta operação.")
+        return info
+
+    def model_for(self, table: str) -> Type[BaseModel]:
+        """Modelo Pydantic da tabela (ValueError se não houver), para a validação HTTP e MQTT."""
+        info = self._tables.get(table)
+        if info is None or info.model is None:
+            raise ValueError(f"Tabela '{table}' não mapeada. Verifique 'model_resolver.py' ou o nome da tabela.")
+        return info.model
+
+    def primary_keys(self) -> Dict[str, str]:
+        return {table: info.pk for table, info in self._tables.items()}
+
+    def __iter__(self):
+        return iter(self._tables.values())
+
+    # --- Introspecção (startup) ---
+
+    async def refresh(self) -> bool:
+        """Relê colunas, PK e índices do `INFORMATION_SCHEMA`. Em erro, mantém o registro atual e retorna False."""
+        tables = self._exposed_tables()
+        placeholders = ", ".join(["%s"] * len(tables))
+        try:
+            column_rows = await execute_async(
+                sql="SELECT TABLE_NAME AS table_name, COLUMN_NAME AS column_name, DATA_TYPE AS data_type, "
+                    "IS_NULLABLE AS is_nullable, COLUMN_KEY AS column_key, EXTRA AS extra FROM INFORMATION_SCHEMA.COLUMNS "
+                    f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders}) ORDER BY ORDINAL_POSITION",
+                params=tables,
+            ) or []
+            index_rows = await execute_async(
+                sql="SELECT TABLE_NAME AS table_name, INDEX_NAME AS index_name, COLUMN_NAME AS column_name "
+                    "FROM INFORMATION_SCHEMA.STATISTICS "
+                    f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders}) ORDER BY SEQ_IN_INDEX",
+                params=tables,
+            ) or []
+        except Exception as e:
+            logger.warning(f"Introspecção do schema indisponível (PK presumida como '<tabela>_id'): {getattr(e, 'detail', e)}")
+            return False
+
+        columns_by_table: Dict[str, list] = {}
+        for row in column_rows:
+            columns_by_table.setdefault(row["table_name"], []).append(row)
+        indexes_by_table: Dict[str, Dict[str, list]] = {}
+        for row in index_rows:
+            indexes_by_table.setdefault(row["table_name"], {}).setdefault(row["index_name"], []).append(row["column_name"])
+
+        tables_info = {}
+        for table in tables:
+            model = self.models.get(table)
+            rows = columns_by_table.get(table)
+            if not rows:
+                logger.warning(f"Tabela '{table}' não encontrada no banco: metadados apenas do modelo.")
+                tables_info[table] = _build(table, model)
+                continue
+            pk_columns = [row["column_name"] for row in rows if row["column_key"] == "PRI"]
+            # PK composta ou ausente: mantém a convenção (a API trabalha com uma PK inteira única).
+            pk = pk_columns[0] if len(pk_columns) == 1 else None
+            indexes = {name: tuple(columns) for name, columns in indexes_by_table.get(table, {}).items()}
+            tables_info[table] = _build(table, model, rows, pk, indexes)
+            if model is not None:
+                missing = sorted(tables_info[table].model_fields - set(tables_info[table].columns))
+                if missing:
+                    logger.warning(f"Campos do modelo sem coluna na tabela '{table}': {missing}")
+        self._tables = MappingProxyType(tables_info)
+        primary_keys = {table: info.pk for table, info in tables_info.items()}
+        logger.info(f"Registro de tabelas carregado (PKs): {primary_keys}")
+        return True
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            table: {
+                "pk": info.pk,
+                "operations": sorted(info.operations),
+                "columns": {name: column.data_type for name, column in info.columns.items()},
+                "indexes": {name: list(columns) for name, columns in info.indexes.items()},
+                "introspected": info.introspected,
+                "change_column": info.change_column,
+            }
+            for table, info in self._tables.items()
+        }
+
+
+# Instância global (Escopo de Módulo): consultada pelas rotas e pela ingestão MQTT.
+table_registry = TableRegistry(TABLE_MODEL_MAPPING)
@@ -0,0 +1,213 @@
+# app/model/topic_router.py
+
+# FLUXO E A LÓGICA:
+# 1. Uma rota associa um filtro de tópico MQTT (com curingas `+` e `#`) a uma tabela e a um mapeamento de campos
+#    (coluna -> origem do valor). O modelo Pydantic usado na validação é o da tabela em `TABLE_MODEL_MAPPING`.
+# 2. As rotas vêm de um arquivo JSON (`MQTT_ROUTES_FILE`). Sem arquivo, a rota padrão mantém o comportamento
+#    original: tudo vai para `pedidos`, com o tópico em `tipo_do_pedido` e o payload em `valor_do_pedido`.
+# 3. `TopicRouter` compila os filtros em uma árvore (trie) por nível do tópico: casar um tópico custa O(profundidade),
+#    não uma varredura de todas as regras. Quando vários filtros casam, vence o declarado primeiro.
+# 4. As origens dos campos são compiladas uma vez em funções de extração:
+#    - `$topic` (tópico inteiro), `$topic[N]` (nível N do tópico), `$payload` (JSON original),
+#    - qualquer outro texto é um caminho no payload decodificado (`valor`, `leitura.temperatura`).
+# RAZÃO DE EXISTIR: Levar cada tipo de mensagem para a sua tabela, em colunas tipadas, em vez de um blob JSON em `pedidos`.
+
+import json
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from utils import fast_json
+
+# Extrai um valor a partir de (níveis do tópico, tópico, dados decodificados, payload original).
+FieldSource = Callable[[List[str], str, Any, Optional[str]], Any]
+
+# Rota padrão: comportamento anterior ao roteamento (tudo em `pedidos`).
+DEFAULT_ROUTES = [
+    {"filter": "#", "table": "pedidos", "fields": {"tipo_do_pedido": "$topic", "valor_do_pedido": "$payload"}},
+]
+
+_MISSING = object()
+
+
+def _payload_source(levels: List[str], topic: str, data: Any, raw: Optional[str]) -> Any:
+    return raw if raw is not None else fast_json.dumps(data)
+
+
+def _topic_source(levels: List[str], topic: str, data: Any, raw: Optional[str]) -> Any:
+    return topic
+
+
+def compile_field_source(spec: str) -> FieldSource:
+    """Converte a origem textual de um campo em uma função de extração (feito uma vez, na carga das rotas)."""
+    if spec == "$payload":
+        return _payload_source
+    if spec == "$topic":
+        return _topic_source
+    if spec.startswith("$topic[") and spec.endswith("]"):
+        index = int(spec[len("$topic["):-1])
+        return lambda levels, topic, data, raw: levels[index] if -len(levels) <= index < len(levels) else None
+    if spec.startswith("$"):
+        raise ValueError(f"Origem de campo desconhecida: '{spec}'. Use $topic, $topic[N], $payload ou um caminho do payload.")
+
+    path = tuple(spec.split("."))
+
+    def from_payload(levels: List[str], topic: str, data: Any, raw: Optional[str]) -> Any:
+        value = data
+        for key in path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key, _MISSING)
+            if value is _MISSING:
+                return None
+        return value
+    return from_payload
+
+
+def validate_filter(topic_filter: str) -> List[str]:
+    """Regras do MQTT: `#` só como último nível; curingas ocupam o nível inteiro."""
+    levels = topic_filter.split("/")
+    for position, level in enumerate(levels):
+        if level == "#" and position != len(levels) - 1:
+            raise ValueError(f"Filtro inválido '{topic_filter}': '#' só pode ser o último nível.")
+        if level not in ("+", "#") and ("+" in level or "#" in level):
+            raise ValueError(f"Filtro inválido '{topic_filter}': curingas devem ocupar o nível inteiro.")
+    return levels
+
+
+def topic_matches(levels_filter: List[str], topic: str) -> bool:
+    """Um filtro já validado (lista de níveis) casa com o tópico? Mesmas regras da trie (`$` e `a/#` casando `a`)."""
+    levels = topic.split("/")
+    if topic.startswith("$") and levels_filter[0] in ("+", "#"):
+        return False
+    for position, level in enumerate(levels_filter):
+        if level == "#":
+            return True
+        if position >= len(levels) or (level != "+" and level != levels[position]):
+            return False
+    return len(levels) == len(levels_filter)
+
+
+class TopicRoute:
+    """Rota compilada: filtro, tabela, modelo e extratores de cada coluna."""
+
+    def __init__(self, topic_filter: str, table: str, fields: Mapping[str, str], model: Type[BaseModel], order: int) -> None:
+        self.filter = topic_filter
+        self.table = table
+        self.model = model
+        self.order = order # Posição na configuração: desempate quando vários filtros casam.
+        self.fields = dict(fields)
+        self._extractors: Tuple[Tuple[str, FieldSource], ...] = tuple(
+            (column, compile_field_source(source)) for column, source in fields.items()
+        )
+        unknown = set(self.fields) - set(model.model_fields)
+        if unknown:
+            raise ValueError(f"Rota '{topic_filter}': colunas {sorted(unknown)} não existem no modelo da tabela '{table}'.")
+
+    def build_row(self, topic: str, data: Any, raw: Optional[str] = None) -> Dict[str, Any]:
+        """Monta o dicionário de colunas (ainda não validado) de uma mensagem."""
+        levels = topic.split("/")
+        return {column: extract(levels, topic, data, raw) for column, extract in self._extractors}
+
+    def describe(self) -> Dict[str, Any]:
+        return {"filter": self.filter, "table": self.table, "model": self.model.__name__, "fields": self.fields}
+
+
+class _Node:
+    __slots__ = ("children", "routes", "multi")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node"] = {} # Nível literal ou "+".
+        self.routes: List[TopicRoute] = [] # Filtros que terminam exatamente neste nível.
+        self.multi: List[TopicRoute] = [] # Filtros terminados em "#" a partir deste nível.
+
+
+class TopicRouter:
+    """Trie de filtros MQTT. `match()` devolve a rota declarada primeiro entre as que casam com o tópico."""
+
+    def __init__(self, routes: Iterable[TopicRoute], cache_size: int = 4096) -> None:
+        self.routes = list(routes)
+        self._root = _Node()
+        for route in self.routes:
+            node = self._root
+            for level in validate_filter(route.filter):
+                if level == "#":
+                    node.multi.append(route)
+                    break
+                node = node.children.setdefault(level, _Node())
+            else:
+                node.routes.append(route)
+        # Os tópicos de uma bancada são poucos e se repetem: o resultado é memorizado por tópico (limitado).
+        self._cache: Dict[str, Optional[TopicRoute]] = {}
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def match(self, topic: str) -> Optional[TopicRoute]:
+        route = self._cache.get(topic, _MISSING)
+        if route is not _MISSING:
+            return route
+        route = self._match(topic)
+        with self._lock:
+            if len(self._cache) >= self._cache_size:
+                self._cache.clear()
+            self._cache[topic] = route
+        return route
+
+    def _match(self, topic: str) -> Optional[TopicRoute]:
+        levels = topic.split("/")
+        # Tópicos iniciados por "$" (ex.: $SYS) não casam com curingas no primeiro nível (regra do MQTT).
+        system_topic = topic.startswith("$")
+        best: Optional[TopicRoute] = None
+
+        def consider(candidates: List[TopicRoute]) -> None:
+            nonlocal best
+            for route in candidates:
+                if best is None or route.order < best.order:
+                    best = route
+
+        # Avança nível a nível; só os ramos literal e "+" seguem, então o custo é O(profundidade).
+        frontier = [self._root]
+        for position, level in enumerate(levels):
+            wildcards_allowed = not (system_topic and position == 0)
+            next_frontier = []
+            for node in frontier:
+                if wildcards_allowed:
+                    consider(node.multi) # "#" casa com todos os níveis restantes.
+                child = node.children.get(level)
+                if child is not None:
+                    next_frontier.append(child)
+                wildcard = node.children.get("+") if wildcards_allowed else None
+                if wildcard is not None:
+                    next_frontier.append(wildcard)
+            frontier = next_frontier
+            if not frontier:
+                return best
+        for node in frontier:
+            consider(node.routes)
+            consider(node.multi) # "a/#" também casa com "a".
+        return best
+
+    def describe(self) -> List[Dict[str, Any]]:
+        return [route.describe() for route in self.routes]
+
+
+def compile_routes(config: List[Dict[str, Any]], models: Mapping[str, Type[BaseModel]]) -> TopicRouter:
+    """Valida a configuração (tabelas mapeadas, colunas do modelo, filtros) e monta o `TopicRouter`."""
+    routes = []
+    for order, entry in enumerate(config):
+        table = entry["table"]
+        model = models.get(table)
+        if model is None:
+            raise ValueError(f"Rota '{entry.get('filter')}': tabela '{table}' não está em TABLE_MODEL_MAPPING.")
+        routes.append(TopicRoute(entry["filter"], table, entry["fields"], model, order))
+    return TopicRouter(routes)
+
+
+def load_routes(path: Optional[str], models: Mapping[str, Type[BaseModel]]) -> TopicRouter:
+    """Lê as rotas de um arquivo JSON (lista de {filter, table, fields}); sem arquivo, usa `DEFAULT_ROUTES`."""
+    config = DEFAULT_ROUTES
+    if path:
+        with open(path, "r", encoding="utf-8") as routes_file:
+            config = json.load(routes_file)
+    return compile_routes(config, models)
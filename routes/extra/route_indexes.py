@@ -0,0 +1,28 @@
+# app/routes/extra/route_indexes.py
+
+# FLUXO E A LÓGICA:
+# 1. `GET /indexes` lista as colunas filtradas no GET genérico (e as declaradas em `INDEXED_FILTER_COLUMNS`),
+#    quantas vezes foram filtradas, os índices que começam por elas e o DDL sugerido quando não há nenhum.
+# 2. `POST /indexes/migrate` cria os índices ausentes com DDL online (`ALGORITHM=INPLACE, LOCK=NONE`).
+#    É o único ponto da API que roda DDL (ALTER TABLE): só existe com `INDEX_MIGRATE_ENABLED=true` (senão, 404).
+# RAZÃO DE EXISTIR: Garantir que os filtros comuns sejam buscas no índice, não varreduras da tabela.
+
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from model.index_advisor import INDEX_MIGRATE_ENABLED, build_report, apply_missing_indexes
+
+router = APIRouter()
+
+
+@router.get("/indexes", tags=["Indexes"])
+async def indexes_report():
+    """Relatório de índices das colunas filtradas."""
+    return {"columns": await build_report()}
+
+
+@router.post("/indexes/migrate", tags=["Indexes"])
+async def indexes_migrate(table: Optional[str] = Query(None, description="Limita a migração a uma tabela.")):
+    """Cria os índices ausentes do relatório (DDL online)."""
+    if not INDEX_MIGRATE_ENABLED:
+        raise HTTPException(status_code=404, detail="Migração de índices pela API desativada (INDEX_MIGRATE_ENABLED=false).")
+    return {"applied": await apply_missing_indexes(table)}
@@ -0,0 +1,24 @@
+# app/routes/extra/route_metrics.py
+
+# FLUXO E A LÓGICA:
+# 1. Expõe `GET /metrics` no formato texto do Prometheus (sem o prefixo `/api`, onde os scrapers procuram por padrão).
+# 2. O conteúdo vem de `REGISTRY.render()`: histogramas de ingestão/DB/HTTP e gauges lidos no momento do scrape.
+# 3. Com `METRICS_ENABLED=false`, a rota responde 404.
+# RAZÃO DE EXISTIR: Acompanhar throughput e latência por estágio sem depender de logs.
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from utils.metrics import METRICS_ENABLED, REGISTRY
+
+router = APIRouter()
+
+# Versão do formato de exposição em texto do Prometheus.
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", tags=["Observability"], include_in_schema=False)
+async def metrics():
+    """Métricas da aplicação no formato de exposição do Prometheus."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Métricas desativadas (METRICS_ENABLED=false).")
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
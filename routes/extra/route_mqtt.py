@@ -3,11 +3,14 @@
 # FLUXO E A LÓGICA:
 # 1. Define as rotas HTTP para gerenciar o estado do cliente MQTT (ativar/desativar).
 # 2. As rotas chamam as funções de controle do ciclo de vida que estão em get_data_camila.py.
+#    Com `MQTT_ENGINE=async`, o cliente roda como tarefas do próprio event loop da API (o mesmo do lifespan).
 # RAZÃO DE EXISTIR: Isolamento da lógica de controle (Routes) da lógica de negócios (models) e das rotas CRUD.
 
 from fastapi import APIRouter, HTTPException
 # Importa as funções de controle do ciclo de vida
-from model.get_data_camila import start_mqtt_client, stop_mqtt_client, get_mqtt_status 
+from model.get_data_camila import (
+    start_collector, stop_collector, get_mqtt_status, get_ingest_stats, is_mqtt_enabled, get_coordination_status,
+)
 
 router = APIRouter()
 
@@ -17,11 +20,11 @@ router = APIRouter()
 
 @router.post("/mqtt/start", tags=["MQTT Control"], summary="Ativa a Subscrição MQTT")
 async def start_mqtt():
-    """Ativa o cliente MQTT para começar a consumir e persistir dados da bancada."""
-    if get_mqtt_status():
+    """Ativa o cliente MQTT para começar a consumir e persistir dados da bancada (ou entra em standby no modo leader)."""
+    if is_mqtt_enabled():
         return {"status": "running", "message": "Cliente MQTT já está ativo."}
         
-    if start_mqtt_client():
+    if await start_collector():
         return {"status": "running", "message": "Cliente MQTT ativado com sucesso."}
     else:
         raise HTTPException(status_code=500, detail="Falha crítica ao iniciar o cliente MQTT. Verifique logs e credenciais.")
@@ -29,16 +32,18 @@ async def start_mqtt():
 @router.post("/mqtt/stop", tags=["MQTT Control"], summary="Desativa a Subscrição MQTT")
 async def stop_mqtt():
     """Desativa o cliente MQTT e encerra o loop de subscrição."""
-    if not get_mqtt_status():
+    if not is_mqtt_enabled():
         return {"status": "stopped", "message": "Cliente MQTT já está inativo."}
         
-    if stop_mqtt_client():
+    if await stop_collector():
         return {"status": "stopped", "message": "Cliente MQTT desativado com sucesso."}
     else:
         raise HTTPException(status_code=500, detail="Falha ao encerrar o cliente MQTT.")
 
 @router.get("/mqtt/status", tags=["MQTT Control"], summary="Verifica o Status do Cliente MQTT")
 async def status_mqtt():
-    """Verifica se o cliente MQTT está atualmente conectado e em execução."""
-    status = "running" if get_mqtt_status() else "stopped"
-    return {"status": status, "message": f"O Cliente MQTT está atualmente {status}."}
\ No newline at end of file
+    """Verifica se o cliente MQTT está conectado e expõe a profundidade das filas e a utilização dos workers de ingestão."""
+    # standby: coleta ativada, mas sem conexão no momento (reconectando, ou outro processo detém a liderança).
+    status = "running" if get_mqtt_status() else "standby" if is_mqtt_enabled() else "stopped"
+    return {"status": status, "message": f"O Cliente MQTT está atualmente {status}.",
+            "coordination": get_coordination_status(), "ingest": get_ingest_stats()}
\ No newline at end of file
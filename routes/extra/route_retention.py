@@ -0,0 +1,39 @@
+# app/routes/extra/route_retention.py
+
+# FLUXO E A LÓGICA:
+# 1. `GET /retention` mostra as políticas carregadas, os totais acumulados e o relatório da última execução
+#    (linhas removidas, partições descartadas/criadas e segundos gastos por política).
+# 2. `POST /retention/run` executa todas as políticas imediatamente (em uma thread do pool, sem travar o event loop)
+#    e devolve o relatório. Nunca roda em paralelo com a execução agendada.
+# 3. Com `RETENTION_ENABLED=false`, as duas rotas respondem 404.
+# RAZÃO DE EXISTIR: Acompanhar (e disparar sob demanda) a limpeza de dados antigos sem acessar o servidor.
+
+from fastapi import APIRouter, HTTPException
+from starlette.concurrency import run_in_threadpool
+from model.retention import RETENTION_ENABLED, get_retention_scheduler
+
+router = APIRouter()
+
+
+def _scheduler():
+    if not RETENTION_ENABLED:
+        raise HTTPException(status_code=404, detail="Retenção desativada (RETENTION_ENABLED=false).")
+    try:
+        return get_retention_scheduler()
+    except (OSError, ValueError, TypeError) as e:
+        raise HTTPException(status_code=500, detail=f"Políticas de retenção inválidas: {e}") from e
+
+
+@router.get("/retention", tags=["Retention"])
+async def retention_status():
+    """Políticas de retenção, totais e o relatório da última execução."""
+    return _scheduler().stats()
+
+
+@router.post("/retention/run", tags=["Retention"])
+async def retention_run():
+    """Aplica todas as políticas de retenção agora e retorna o relatório."""
+    scheduler = _scheduler()
+    if not scheduler.policies:
+        raise HTTPException(status_code=400, detail="Nenhuma política de retenção configurada.")
+    return await run_in_threadpool(scheduler.run_once)
@@ -1,18 +1,65 @@
 # FLUXO E A LÓGICA:
 # 1. Recebe 'table_name' e 'item_id' da URL (Escopo de Requisição).
 # 2. Executa a dependência de Rate Limiting (Segurança).
-# 3. Valida se 'table_name' está na Whitelist (Segurança Crítica).
-# 4. Constrói a Query SQL DELETE dinâmica.
-# 5. Chama `execute` (DAO).
+# 3. Valida 'table_name' no registro de tabelas (operação "delete") e obtém dele a chave primária (Segurança Crítica).
+# 4. Obtém o DELETE pré-montado do cache de comandos.
+# 5. Chama `execute_async` (DAO assíncrono, não bloqueia o event loop).
+# 6. A variante `/delete/{table_name}/bulk` recebe uma lista de IDs e exclui tudo em UMA transação com `WHERE id IN (...)`,
+#    reportando quais IDs foram excluídos e quais não existiam. Os locks de TODAS as linhas ficam retidos até o COMMIT:
+#    o lote é limitado a `BULK_DELETE_MAX_IDS`; exclusões maiores devem ser divididas em várias requisições.
 
-from fastapi import APIRouter, HTTPException, Path, Depends
-from utils.function_execute import execute
+from typing import List
+from fastapi import APIRouter, HTTPException, Path, Depends, Body
+from utils.function_execute import execute_async, transaction_async
+from model.statement_cache import statements # Cache de SQL por tabela.
+from utils.query_cache import query_cache # Invalida o cache de leitura após escritas.
+from model.table_registry import table_registry, OP_DELETE # Tabelas expostas e suas PKs.
 # from fastapi_limiter.depends import RateLimiter
 
 router = APIRouter()
 
-# Lista de tabelas permitidas para exclusão.
-TABLES_WHITELIST = ["categoria_pedidos","pedidos"]
+# Tamanho máximo de cada `IN (...)`: limita o tamanho de cada comando. NÃO reduz os locks: os blocos rodam na mesma
+# transação e as linhas travadas por todos eles só são liberadas no COMMIT.
+BULK_DELETE_CHUNK = 1000
+# IDs por requisição: limita as linhas travadas (e o tempo de lock) de uma única transação.
+BULK_DELETE_MAX_IDS = 10000
+
+# Rota de exclusão em lote. Declarada ANTES de /{item_id}: caso contrário "bulk" seria lido como ID.
+@router.delete("/delete/{table_name}/bulk", tags=["Generic Data Management"])
+async def delete_bulk_data(
+    table_name: str = Path(..., description="Nome da tabela para exclusão"),
+    ids: List[int] = Body(..., embed=True, min_length=1, max_length=BULK_DELETE_MAX_IDS,
+                         description=f"IDs dos itens a serem excluídos (até {BULK_DELETE_MAX_IDS}; divida exclusões maiores em várias requisições).")
+):
+    """
+    Exclui vários itens de uma tabela autorizada em uma única transação, com resultado por ID.
+    Todas as linhas ficam travadas até o fim da transação: para exclusões maiores que o limite, envie vários lotes.
+    """
+
+    # 1. Verificação de Segurança (registro de tabelas)
+    pk_column = table_registry.require(table_name, OP_DELETE).pk
+    unique_ids = list(dict.fromkeys(ids)) # Remove duplicados preservando a ordem.
+    deleted: set = set()
+
+    try:
+        async with transaction_async() as cursor:
+            for start in range(0, len(unique_ids), BULK_DELETE_CHUNK):
+                chunk = unique_ids[start:start + BULK_DELETE_CHUNK]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                # Trava as linhas existentes para saber exatamente quais IDs esta transação excluiu.
+                await cursor.execute(f"SELECT `{pk_column}` FROM `{table_name}` WHERE `{pk_column}` IN ({placeholders}) FOR UPDATE", chunk)
+                deleted.update(row[0] for row in await cursor.fetchall())
+                await cursor.execute(f"DELETE FROM `{table_name}` WHERE `{pk_column}` IN ({placeholders})", chunk)
+        if deleted:
+            query_cache.invalidate(table_name)
+    except HTTPException as e:
+        raise e
+    except Exception:
+        raise HTTPException(status_code=500, detail="Erro interno do servidor durante a exclusão.")
+
+    results = [{"id": item_id, "status": "deleted" if item_id in deleted else "not_found"} for item_id in unique_ids]
+    return {"message": f"Lote processado na tabela '{table_name}'.", "total": len(unique_ids),
+            "deleted": len(deleted), "not_found": len(unique_ids) - len(deleted), "results": results}
 
 @router.delete("/delete/{table_name}/{item_id}", tags=["Generic Data Management"],
             #dependencies=[Depends(RateLimiter(times=10, seconds=60))]
@@ -23,21 +70,20 @@ async def delete_data(
 ):
     """Exclui um item de uma tabela autorizada com base no ID."""
 
-    # 1. Verificação de Segurança (Whitelist)
-    if table_name not in TABLES_WHITELIST:
-        raise HTTPException(status_code=400, detail=f"A tabela '{table_name}' não é válida para esta operação.")
+    # 1. Verificação de Segurança (registro de tabelas)
+    table = table_registry.require(table_name, OP_DELETE)
 
     try:
-        # CORREÇÃO CRÍTICA: Adiciona aspas graves (`) ao redor do nome da tabela e da coluna de ID.
-        # Isso resolve o erro de palavra reservada (ex: 'rank').
-        sql = f"DELETE FROM `{table_name}` WHERE `{table_name}_id` = %s"
+        # O cache já envolve tabela e coluna de ID em aspas graves (`), evitando erro com palavras reservadas (ex: 'rank').
+        statement = statements.delete(table_name, table.pk)
 
-        rows_affected = execute(sql=sql, params=(item_id,))
+        rows_affected = await execute_async(sql=statement.sql, params=(item_id,), kind=statement.kind)
 
         # 2. Verificação de Resultado
         if not rows_affected:
             # Retorna 404 se o DB não excluiu nada (ID não existe).
             raise HTTPException(status_code=404, detail=f"Item com ID {item_id} não encontrado ou não houve exclusão.")
+        query_cache.invalidate(table_name)
 
         return {"message": f"Item com ID {item_id} excluído com sucesso da tabela '{table_name}'.",
                 "rows_affected": rows_affected}
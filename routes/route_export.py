@@ -0,0 +1,63 @@
+# FLUXO E A LÓGICA:
+# 1. Recebe `table_name` da URL e o formato (`ndjson` ou `csv`) da query string (Escopo de Requisição).
+# 2. Valida `table_name` no registro de tabelas (operação "export") e ordena pela PK registrada (Segurança CRÍTICA).
+# 3. Abre um cursor server-side (`stream_async`) e lê a tabela em blocos de `chunk_size` linhas.
+# 4. Cada bloco é serializado e enviado imediatamente por uma `StreamingResponse`.
+# A razão de existir: Exportar tabelas inteiras (analytics) com memória constante, sem montar um array JSON gigante.
+
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, List, Literal
+from fastapi import APIRouter, HTTPException, Path, Query
+from fastapi.responses import StreamingResponse
+from utils.function_execute import stream_async # Leitura em blocos com cursor server-side.
+from model.table_registry import table_registry, OP_EXPORT # Tabelas expostas e suas PKs.
+
+router = APIRouter()
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+async def _ndjson_lines(chunks: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[str]:
+    """Uma linha JSON por registro. `default=str` cobre datetime/Decimal vindos do MySQL."""
+    async for rows in chunks:
+        yield "".join(json.dumps(row, default=str, ensure_ascii=False) + "\n" for row in rows)
+
+
+async def _csv_lines(chunks: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[str]:
+    """CSV com cabeçalho tirado da primeira linha; cada bloco é escrito num buffer pequeno e descartado."""
+    columns = None
+    async for rows in chunks:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if columns is None:
+            columns = list(rows[0].keys())
+            writer.writerow(columns)
+        writer.writerows([row.get(column) for column in columns] for row in rows)
+        yield buffer.getvalue()
+
+
+# Rota de exportação em streaming: /export/{table_name}
+@router.get("/export/{table_name}", tags=["Generic Data Management"])
+async def export_tabela(
+    table_name: str = Path(..., description="Nome da tabela para exportação"),
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Formato de saída."),
+    chunk_size: int = Query(1000, ge=1, le=50000, description="Linhas lidas do banco por bloco."),
+):
+    """Exporta uma tabela autorizada inteira em NDJSON ou CSV, em streaming e com memória constante."""
+
+    # 1. Verificação de Segurança (registro de tabelas)
+    table = table_registry.require(table_name, OP_EXPORT)
+
+    # 2. Abre o cursor (erros de DB ainda viram HTTPException aqui, antes do primeiro byte).
+    sql = f"SELECT * FROM `{table_name}` ORDER BY `{table.pk}`"
+    chunks = await stream_async(sql=sql, chunk_size=chunk_size)
+
+    # 3. Resposta em streaming: cada bloco sai assim que é lido do banco.
+    body = _ndjson_lines(chunks) if format == "ndjson" else _csv_lines(chunks)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{table_name}.{format}"'},
+    )
@@ -1,48 +1,224 @@
 # FLUXO E A LÓGICA:
-# 1. Recebe `table_name` da URL (Escopo de Requisição).
-# 2. Valida `table_name` contra a `TABLES_WHITELIST` (Segurança CRÍTICA).
-# 3. Constrói e executa a query `SELECT * FROM {table_name}`.
-# 4. Retorna os resultados do DB como JSON.
+# 1. Recebe `table_name` da URL e os parâmetros de paginação/projeção da query string (Escopo de Requisição).
+# 2. Valida `table_name` no registro de tabelas (operação "read") e obtém dele a chave primária (Segurança CRÍTICA).
+# 3. Valida `fields` contra as colunas do modelo Pydantic da tabela antes de montar o SELECT (projeção em cache).
+# 4. Converte os demais parâmetros da query string em filtros tipados (`model/query_filters.py`):
+#    `coluna=x`, `coluna__gte=10`, `coluna__in=a,b`, `tipo_do_pedido__prefix=bancada/`.
+# 5. Constrói e executa uma query paginada por keyset: `WHERE {filtros} AND {pk} > after_id ORDER BY {pk} LIMIT n`.
+# 6. Retorna uma página de resultados com o `next_cursor` para buscar a próxima.
+# 7. A consulta passa pelo cache read-through (`query_cache`): polls repetidos não chegam ao MySQL até uma escrita invalidar a tabela.
+# 8. GET condicional: a resposta leva ETag/Last-Modified da versão da tabela; com `If-None-Match` ainda válido,
+#    responde 304 sem tocar no cache nem no MySQL.
+# 9. Sincronização incremental: `since_id` devolve só as linhas inseridas depois do ID informado; `since_version`
+#    (tabelas com coluna de mudança no registro) devolve as inseridas OU alteradas desde o token da última sincronização.
+#    O token do fim de uma sincronização recua `SINCE_VERSION_MARGIN`: as linhas dessa margem voltam na próxima (o
+#    cliente deduplica por PK). Uma transação que confirma uma alteração mais antiga que a margem ainda pode escapar.
+#    Nesses modos `next_cursor` é nulo: a próxima página usa `next_since_id`/`next_since_version` enquanto `has_more`.
 # A razão de existir: Ponto de entrada para a operação de leitura (GET) de forma GENÉRICA e protegida.
 
-from fastapi import APIRouter, HTTPException, Path, Depends
-from utils.function_execute import execute # Importa a função DAO para acesso ao DB.
+from functools import lru_cache
+from datetime import datetime, timedelta
+from typing import Any, FrozenSet, List, Literal, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Path, Query, Depends, Request, Response
+from utils.function_execute import execute_async # Importa a função DAO para acesso ao DB.
+from model.table_registry import table_registry, OP_READ # Tabelas expostas, PK e colunas (montado no startup).
+from utils.query_cache import query_cache # Cache read-through com invalidação por escrita.
+from model.query_filters import FilterError, parse_filters, compile_filters, cache_key # Filtros tipados.
+from model.index_advisor import note_filters # Uso de colunas filtradas (relatório de índices).
+from utils.conditional import not_modified, validator_headers # ETag/Last-Modified por versão da tabela.
 # from fastapi_limiter.depends import RateLimiter # Importa o limitador de taxa.
 
 # Variável 'router' (Escopo Global/Módulo).
 router = APIRouter()
 
-# Variável 'TABLES_WHITELIST' (Escopo Global/Módulo): Lista de tabelas permitidas.
-# Razão: SEGURANÇA. Impede que o usuário tente acessar tabelas não expostas na API.
-TABLES_WHITELIST = ["categoria_pedidos","pedidos"]
+# Limites de paginação: nenhuma resposta materializa a tabela inteira.
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# `since_version`: ao fim de uma sincronização, o próximo token recua esta margem. Uma linha com PK menor alterada
+# depois, no mesmo segundo do `ON UPDATE`, ficaria atrás do keyset (coluna, PK) e nunca seria entregue.
+SINCE_VERSION_MARGIN = timedelta(seconds=1)
+
+# Parâmetros da própria rota: todo o resto da query string é filtro.
+RESERVED_PARAMS = ("limit", "after_id", "fields", "order", "since_id", "since_version")
+
+
+@lru_cache(maxsize=512)
+def _resolve_projection(table_name: str, pk_column: str, model_fields: Optional[FrozenSet[str]], fields: Optional[str],
+                        required: Tuple[str, ...] = ()) -> str:
+    """
+    Converte `fields=a,b` em uma lista de colunas SQL segura, validada contra o modelo Pydantic da tabela.
+    Cacheado por (tabela, fields): dashboards repetem a mesma projeção a cada poll.
+    """
+    if not fields:
+        return "*"
+
+    if model_fields is None:
+        raise HTTPException(status_code=400, detail=f"A tabela '{table_name}' não possui modelo para projeção de campos.")
+
+    allowed = model_fields | {pk_column}
+    requested: List[str] = []
+    for field in fields.split(","):
+        field = field.strip()
+        if not field or field in requested:
+            continue
+        if field not in allowed:
+            raise HTTPException(status_code=400, detail=f"Campo '{field}' inválido para a tabela '{table_name}'. Válidos: {sorted(allowed)}.")
+        requested.append(field)
+
+    # A chave primária (e a coluna de mudança, no delta) sempre acompanham a projeção: elas geram os cursores.
+    for column in reversed((pk_column, *required)):
+        if column not in requested:
+            requested.insert(0, column)
+    return ", ".join(f"`{column}`" for column in requested)
+
+
+def _version_token(row: dict, change_column: str, pk_column: str) -> str:
+    """Token de sincronização: valor da coluna de mudança + PK da última linha (desempate entre linhas do mesmo instante)."""
+    value = row[change_column]
+    return f"{value.isoformat() if isinstance(value, datetime) else value}~{row[pk_column]}"
+
+
+def _resync_token(row: dict, change_column: str) -> str:
+    """Token do fim da sincronização: o instante da última linha MENOS a margem, PK 0 (relê a margem inteira)."""
+    value = row[change_column]
+    if not isinstance(value, datetime):
+        return f"{value}~0"
+    return f"{(value - SINCE_VERSION_MARGIN).isoformat()}~0"
+
+
+def _parse_version_token(token: str) -> Optional[Tuple[Any, int]]:
+    """`0` = desde o início; senão (instante, PK). HTTP 400 se o token for inválido."""
+    if token == "0":
+        return None
+    try:
+        value, _, pk = token.rpartition("~")
+        return datetime.fromisoformat(value), int(pk)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"since_version inválido: '{token}'. Use o `next_since_version` da resposta anterior ou 0.")
+
 
 # Rota para consulta genérica: /get/{table_name}
 @router.get("/get/{table_name}", tags=["Generic Data Management"],
             #dependencies=[Depends(RateLimiter(times=20, seconds=60))]
 ) # Rate Limiter ATIVADO (Essencial para GETs).
 async def get_tabela(
-    table_name: str = Path(..., description="Nome da tabela para consulta")
+    request: Request,
+    response: Response,
+    table_name: str = Path(..., description="Nome da tabela para consulta"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Quantidade máxima de linhas por página."),
+    after_id: Optional[int] = Query(None, description="Cursor: `next_cursor` da página anterior (ID de onde continuar)."),
+    fields: Optional[str] = Query(None, description="Colunas a retornar, separadas por vírgula (ex: tipo_do_pedido,valor_do_pedido)."),
+    order: Literal["asc", "desc"] = Query("asc", description="Ordenação pela chave primária."),
+    since_id: Optional[int] = Query(None, description="Delta: apenas linhas com ID maior (use `next_since_id` da resposta anterior)."),
+    since_version: Optional[str] = Query(None, description="Delta: linhas inseridas/alteradas desde o token (`next_since_version`; 0 = tudo)."),
 ):
-    """Consulta genérica e segura para tabelas autorizadas, protegida por Rate Limiting."""
-    
-    # 1. Verificação de Segurança (Whitelist)
-    if table_name not in TABLES_WHITELIST:
-        # Erro 400 se a tabela não estiver na lista branca.
-        raise HTTPException(status_code=400, detail=f"A tabela '{table_name}' não é válida para esta consulta.")
-    
+    """
+    Consulta genérica, paginada por cursor (keyset) e segura para tabelas autorizadas, protegida por Rate Limiting.
+    Filtros: `coluna=valor`, `coluna__gt|gte|lt|lte=valor`, `coluna__in=a,b,c`, `coluna__prefix=texto`.
+    Responde 304 se `If-None-Match` ainda corresponde à versão da tabela.
+    """
+
+    # 1. Verificação de Segurança (registro de tabelas): erro 400 se a tabela não for exposta para leitura.
+    table = table_registry.require(table_name, OP_READ)
+    pk_column = table.pk
+
+    # 2. GET condicional: nada mudou desde a cópia do cliente -> 304, sem cache nem MySQL.
+    cached = not_modified(request, table_name)
+    if cached is not None:
+        return cached
+    # Validadores lidos ANTES da consulta: uma escrita durante a consulta gera um ETag novo no próximo poll.
+    headers = validator_headers(table_name)
+
+    cursors = sum(value is not None for value in (after_id, since_id, since_version))
+    if cursors > 1:
+        raise HTTPException(status_code=400, detail="Use apenas um entre 'after_id', 'since_id' e 'since_version'.")
+    if since_version is not None and table.change_column is None:
+        raise HTTPException(status_code=400, detail=f"A tabela '{table_name}' não possui coluna de mudança para 'since_version' (use 'since_id').")
+    change_column = table.change_column if since_version is not None else None
+
+    projection = _resolve_projection(table_name, pk_column, table.model_fields if table.model else None, fields,
+                                     (change_column,) if change_column else ())
     try:
+        filters = parse_filters(table.model, pk_column, request.query_params.multi_items(), RESERVED_PARAMS)
+    except FilterError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if filters:
+        note_filters(table_name, [query_filter.column for query_filter in filters])
+
+    try:
+        # 3. Filtros + paginação por keyset: o índice da PK posiciona direto no cursor (sem OFFSET, custo constante por página).
+        conditions, filter_params = compile_filters(filters)
+        if since_id is not None or since_version is not None:
+            order = "asc" # O delta sempre avança do token para frente.
+        comparison = ">" if order == "asc" else "<"
+        if after_id is not None or since_id is not None:
+            conditions.append(f"`{pk_column}` {comparison} %s")
+            filter_params.append(after_id if after_id is not None else since_id)
+        order_by = f"`{pk_column}` {order.upper()}"
+        if change_column:
+            # Keyset em (coluna de mudança, PK): pagina sem repetir nem pular linhas DENTRO de uma sincronização. Entre
+            # sincronizações, o token final recua `SINCE_VERSION_MARGIN` (veja `_resync_token`).
+            version = _parse_version_token(since_version)
+            if version is not None:
+                conditions.append(f"(`{change_column}` > %s OR (`{change_column}` = %s AND `{pk_column}` > %s))")
+                filter_params.extend((version[0], version[0], version[1]))
+            order_by = f"`{change_column}` ASC, `{pk_column}` ASC"
+            note_filters(table_name, [change_column])
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        params = tuple(filter_params) + (limit + 1,)
+
         # CORREÇÃO: Adiciona aspas graves (`) ao redor do nome da tabela.
-        sql = f"SELECT * FROM `{table_name}`"
-        
-        result = execute(sql=sql) # Envia para a camada DAO.
-        
-        if result is None or len(result) == 0:
+        sql = f"SELECT {projection} FROM `{table_name}`{where} ORDER BY {order_by} LIMIT %s"
+
+        # Chave do cache: tabela + parâmetros da consulta (a geração da tabela é adicionada pelo cache).
+        cache_params = (limit, after_id, since_id, since_version, projection, order, cache_key(filters))
+        result = await query_cache.get_or_load(
+            table_name, cache_params, lambda: execute_async(sql=sql, params=params) # Envia para a camada DAO.
+        )
+
+        if not result and not cursors and not filters:
             # Erro 404 se o DB não retornar dados (ex: tabela vazia).
             raise HTTPException(status_code=404, detail=f"Nenhum dado encontrado para a tabela '{table_name}'.")
 
-        return result
+        # Uma linha a mais que o limite indica que existe próxima página.
+        rows = result[:limit]
+        delta = since_id is not None or since_version is not None
+        # No delta a continuação é `next_since_*` + `has_more`: um `after_id` ignoraria o token (e, em `since_version`,
+        # a ordem não é por ID).
+        next_cursor = rows[-1][pk_column] if len(result) > limit and not delta else None
+        response.headers.update(headers)
+
+        body = {"data": rows, "next_cursor": next_cursor, "limit": limit, "order": order}
+        # Delta: o token da próxima sincronização (igual ao enviado se não houve mudança); `has_more` pede outra página já.
+        if since_id is not None:
+            body["next_since_id"] = rows[-1][pk_column] if rows else since_id
+            body["has_more"] = len(result) > limit
+        elif since_version is not None:
+            body["has_more"] = len(result) > limit
+            if not rows:
+                body["next_since_version"] = since_version
+            elif body["has_more"]:
+                body["next_since_version"] = _version_token(rows[-1], change_column, pk_column)
+            else:
+                # Fim da sincronização: a próxima relê a margem; o cliente descarta por PK as linhas já recebidas.
+                body["next_since_version"] = _resync_token(rows[-1], change_column)
+        return body
     except HTTPException as e:
         raise e
     except Exception:
-        # Este catch será raramente atingido, pois `execute` deve levantar HTTPException.
-        raise HTTPException(status_code=500, detail="Erro interno durante a consulta ao banco.")
\ No newline at end of file
+        # Este catch será raramente atingido, pois `execute_async` deve levantar HTTPException.
+        raise HTTPException(status_code=500, detail="Erro interno durante a consulta ao banco.")
+
+
+# Rota de diagnóstico do cache de consultas: /cache/stats
+@router.get("/cache/stats", tags=["Cache"])
+async def cache_stats():
+    """Contadores do cache de leitura (hits, misses, evicções, expirações, invalidações) para ajuste de TTL e tamanho."""
+    return query_cache.stats()
+
+
+# Rota de diagnóstico do registro de tabelas: /tables
+@router.get("/tables", tags=["Schema"])
+async def tables_registry():
+    """Tabelas expostas com operações permitidas, PK, colunas e índices (lidos do schema no startup)."""
+    return table_registry.describe()
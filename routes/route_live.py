@@ -0,0 +1,102 @@
+# app/routes/route_live.py
+
+# FLUXO E A LÓGICA:
+# 1. `/live/ws` (WebSocket) e `/live/sse` (Server-Sent Events) assinam o `live_hub` com filtros de tópico MQTT
+#    (`topics=bancada/camila/#,outro/+/x`) e recebem as mensagens no momento em que chegam ao coletor.
+# 2. Cada envio é um array JSON de quadros `{"topic", "received_at", "data"}` (um lote por intervalo).
+#    Com `coalesce=true` (padrão), cada tópico aparece no máximo uma vez por lote, com o valor mais recente.
+# 3. Um assinante lento é desconectado pelo hub: o WebSocket fecha com 1013 e o SSE envia `event: dropped`.
+# 4. Nada aqui consulta o MySQL.
+# RAZÃO DE EXISTIR: Dashboards em tempo real sem poll no GET.
+
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from model.live_hub import LIVE_ENABLED, LiveHubFull, live_hub # Fan-out das mensagens MQTT.
+
+router = APIRouter()
+
+
+async def _wait_disconnect(websocket: WebSocket) -> None:
+    """Consome o que o cliente enviar (ignorado) até a desconexão."""
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+@router.websocket("/live/ws")
+async def live_websocket(
+    websocket: WebSocket,
+    topics: str = Query("#", description="Filtros de tópico MQTT separados por vírgula."),
+    coalesce: bool = Query(True, description="Só o valor mais recente de cada tópico por lote."),
+):
+    """Mensagens MQTT em tempo real via WebSocket."""
+    if not LIVE_ENABLED:
+        await websocket.close(code=1008, reason="Tempo real desativado (LIVE_ENABLED).")
+        return
+    try:
+        subscriber = live_hub.subscribe(topics.split(","), coalesce)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e)[:120])
+        return
+    except LiveHubFull as e:
+        await websocket.close(code=1013, reason=str(e)[:120])
+        return
+
+    await websocket.accept()
+    receiver = asyncio.create_task(_wait_disconnect(websocket))
+    try:
+        async for frames in subscriber.batches():
+            if receiver.done():
+                break
+            if frames:
+                await websocket.send_text(f"[{','.join(frames)}]")
+        if subscriber.dropped:
+            await websocket.close(code=1013, reason="Consumidor lento: reconecte.")
+        elif subscriber.closed and not receiver.done():
+            await websocket.close(code=1001)
+    except (WebSocketDisconnect, RuntimeError): # Cliente saiu no meio de um envio.
+        pass
+    finally:
+        receiver.cancel()
+        live_hub.unsubscribe(subscriber)
+
+
+@router.get("/live/sse", tags=["Live"])
+async def live_sse(
+    request: Request,
+    topics: str = Query("#", description="Filtros de tópico MQTT separados por vírgula."),
+    coalesce: bool = Query(True, description="Só o valor mais recente de cada tópico por lote."),
+):
+    """Mensagens MQTT em tempo real via Server-Sent Events (`data:` = array JSON de quadros)."""
+    if not LIVE_ENABLED:
+        raise HTTPException(status_code=404, detail="Tempo real desativado (LIVE_ENABLED).")
+    try:
+        subscriber = live_hub.subscribe(topics.split(","), coalesce)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LiveHubFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n" # Reconexão automática do EventSource.
+            async for frames in subscriber.batches():
+                if await request.is_disconnected():
+                    break
+                # Lista vazia: heartbeat (comentário SSE) mantém proxies com a conexão aberta.
+                yield f"data: [{','.join(frames)}]\n\n" if frames else ": ping\n\n"
+            if subscriber.dropped:
+                yield "event: dropped\ndata: {}\n\n"
+        finally:
+            live_hub.unsubscribe(subscriber)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/live/stats", tags=["Live"])
+async def live_stats():
+    """Assinantes conectados e contadores do fan-out (publicados, entregues, coalescidos, descartados por lentidão)."""
+    return live_hub.stats()
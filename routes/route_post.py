@@ -1,20 +1,25 @@
 # FLUXO E A LÓGICA:
 # 1. Recebe 'table_name' da URL e o corpo via `request_body` (Escopo de Requisição).
 # 2. Chama `validate_body` (Dependência) para obter o dicionário seguro `data_dict`.
-# 3. Constrói a *query* SQL `INSERT` dinamicamente usando as chaves e valores de `data_dict`.
-# 4. Chama `execute` (DAO) para rodar o comando SQL.
+# 3. Obtém o `INSERT` pré-montado do cache de comandos (`statement_cache`) para as colunas de `data_dict`.
+# 4. Chama `execute_async` (DAO assíncrono) para rodar o comando SQL sem bloquear o event loop.
+# 5. A variante `/insert/{table_name}/bulk` valida um lote inteiro (`validate_bulk_body`) e insere tudo em UMA transação
+#    com `executemany` (INSERT multi-linha), reportando o resultado de cada item (sem os IDs gerados).
 # A razão de existir: Ponto de entrada para a operação de escrita (POST) de forma GENÉRICA.
 
-from fastapi import APIRouter, HTTPException, Path, Depends, Body 
-from typing import Dict, Any
-from utils.function_execute import execute
+from fastapi import APIRouter, HTTPException, Path, Depends, Body, Query
+from typing import Dict, Any, List, Tuple
+from utils.function_execute import execute_async, transaction_async
+from model.statement_cache import statements # Cache de SQL por (tabela, colunas): sem montagem de string por requisição.
+from utils.query_cache import query_cache # Invalida o cache de leitura após escritas.
+from model.table_registry import table_registry, OP_INSERT # Tabelas que aceitam inserção.
 import logging 
-from utils.dependencies import validate_body # Importa a dependência de validação (Camada de Lógica).
+from utils.dependencies import validate_body, validate_bulk_body, BulkValidation # Importa as dependências de validação (Camada de Lógica).
 # from fastapi_limiter.depends import RateLimiter # Importa o limitador de taxa (Camada de Segurança).
 
 # Variável 'router' (Escopo Global/Módulo): Objeto APIRouter para agrupar rotas.
 router = APIRouter()
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s') # Configuração básica de log.
+logger = logging.getLogger(__name__) # Logger do módulo (configurado em utils/logging_config.py).
 
 # Rota para inserir dados genéricos: /insert/{table_name}
 @router.post("/insert/{table_name}", tags=["Generic Data Management"], 
@@ -33,19 +38,18 @@ async def insert_data(
     data_dict: Dict[str, Any] = Depends(validate_body) 
 ):
     """Insere um novo item em uma tabela autorizada com base em um modelo Pydantic."""
+    table_registry.require(table_name, OP_INSERT)
     
-    # Construção Dinâmica da Query SQL (Usando apenas os dados validados de data_dict)
-    columns = ", ".join(data_dict.keys()) # Ex: "rank_name"
-    placeholders = ", ".join(["%s"] * len(data_dict)) # Ex: "%s"
+    # Comando do cache (Usando apenas as colunas validadas de data_dict)
+    statement = statements.insert(table_name, tuple(data_dict.keys()))
     values = tuple(data_dict.values()) # Valores que serão passados de forma segura.
 
     try:
-        # CORREÇÃO CRÍTICA: Adiciona aspas graves (`) ao redor do nome da tabela.
-        sql = f"INSERT INTO `{table_name}` ({columns}) VALUES ({placeholders})"
-        new_id = execute(sql=sql, params=values) # Envia para a camada DAO.
+        new_id = await execute_async(sql=statement.sql, params=values, kind=statement.kind) # Envia para a camada DAO.
         
         if not new_id:
             raise HTTPException(status_code=500, detail="Não foi possível inserir os dados.")
+        query_cache.invalidate(table_name)
 
         return {"message": f"Dados inseridos com sucesso na tabela '{table_name}'.", "new_id": new_id}
     
@@ -53,5 +57,47 @@ async def insert_data(
         raise e
     except Exception as e:
         # Este catch geralmente só será atingido se 'function_execute' falhar em lançar a HTTPException (ex: código antigo).
-        logging.error(f"Erro inesperado na rota POST: {e}")
-        raise HTTPException(status_code=500, detail="Erro interno do servidor.")
\ No newline at end of file
+        logger.error(f"Erro inesperado na rota POST: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor.")
+
+# Rota para inserir dados genéricos em lote: /insert/{table_name}/bulk
+@router.post("/insert/{table_name}/bulk", tags=["Generic Data Management"])
+async def insert_bulk_data(
+    table_name: str = Path(..., description="Nome da tabela para inserção."),
+    all_or_nothing: bool = Query(False, description="Se verdadeiro, nenhum item é inserido quando algum for inválido."),
+    # Corpo: JSON array de objetos ou NDJSON (Content-Type: application/x-ndjson), validado em uma passada.
+    batch: BulkValidation = Depends(validate_bulk_body)
+):
+    """
+    Insere vários itens de uma vez em uma única transação, com resultado por item (até `BULK_INSERT_MAX_ITEMS`; acima
+    disso, 413). Os IDs gerados NÃO são devolvidos: o INSERT multi-linha só informa o ID da primeira linha do último
+    comando, e os IDs de um lote não são garantidamente contíguos. Quem precisa dos IDs usa `/insert/{table_name}`.
+    """
+    table_registry.require(table_name, OP_INSERT)
+
+    if all_or_nothing and batch.errors:
+        raise HTTPException(status_code=422, detail={"message": "Lote rejeitado: existem itens inválidos.", "errors": batch.errors})
+
+    # Agrupa as linhas pelo conjunto de colunas (campos None são omitidos, então o conjunto pode variar).
+    groups: Dict[Tuple[str, ...], List[Tuple[Any, ...]]] = {}
+    for _, data_dict in batch.valid:
+        groups.setdefault(tuple(data_dict.keys()), []).append(tuple(data_dict.values()))
+
+    try:
+        if groups:
+            async with transaction_async() as cursor:
+                for columns, rows in groups.items():
+                    await cursor.executemany(statements.insert(table_name, columns).sql, rows)
+            query_cache.invalidate(table_name)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Erro inesperado na rota POST bulk: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor.")
+
+    results = [{"index": index, "status": "inserted"} for index, _ in batch.valid]
+    results += [{"index": error["index"], "status": "invalid", "errors": error["errors"]} for error in batch.errors]
+    results.sort(key=lambda result: result["index"])
+
+    return {"message": f"Lote processado na tabela '{table_name}'.", "total": batch.total,
+            "inserted": len(batch.valid), "invalid": len(batch.errors), "results": results}
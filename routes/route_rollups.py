@@ -0,0 +1,67 @@
+# FLUXO E A LÓGICA:
+# 1. Recebe o tópico, o campo, a resolução e o intervalo de tempo da query string (Escopo de Requisição).
+# 2. Lê os baldes pré-agregados de `mqtt_rollups` (gravados pela ingestão MQTT), sem tocar nas linhas brutas.
+# 3. Cada balde volta com count/min/max/last e a média (`sum / count`) já calculada.
+# 4. A consulta passa pelo cache read-through (`query_cache`), invalidado a cada flush dos rollups.
+# 5. Com intervalo explícito (`start` e `end`), um `If-None-Match` ainda válido recebe 304 sem consulta.
+# A razão de existir: Servir gráficos de médias por minuto/hora lendo milhares de baldes em vez de milhões de linhas.
+
+import time
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from utils.function_execute import execute_async # DAO assíncrono.
+from utils.query_cache import query_cache # Cache read-through com invalidação por escrita.
+from model.rollups import ROLLUP_TABLE # Tabela gravada pelo RollupFlusher.
+from utils.conditional import not_modified, validator_headers # ETag/Last-Modified por versão da tabela.
+
+router = APIRouter()
+
+# Limite de baldes por resposta (ex.: ~7 dias em resolução de 1 minuto).
+MAX_ROLLUP_POINTS = 10000
+
+
+@router.get("/rollups", tags=["Rollups"])
+async def get_rollups(
+    request: Request,
+    response: Response,
+    topic: str = Query(..., description="Tópico MQTT exato (ex: bancada/camila/sensor/temperatura)."),
+    field: str = Query("valor", description="Campo numérico agregado (MQTT_ROLLUP_FIELDS)."),
+    resolution: int = Query(60, ge=1, description="Tamanho do balde em segundos (MQTT_ROLLUP_RESOLUTIONS)."),
+    start: Optional[float] = Query(None, description="Início do intervalo (epoch em segundos). Padrão: 24h atrás."),
+    end: Optional[float] = Query(None, description="Fim do intervalo (epoch em segundos). Padrão: agora."),
+    limit: int = Query(MAX_ROLLUP_POINTS, ge=1, le=MAX_ROLLUP_POINTS, description="Máximo de baldes retornados."),
+):
+    """Série temporal agregada (count/avg/min/max/last por balde) de um tópico e campo."""
+    end = end if end is not None else time.time()
+    start = start if start is not None else end - 86400
+    if start > end:
+        raise HTTPException(status_code=400, detail="'start' deve ser menor ou igual a 'end'.")
+    # Sem intervalo explícito a janela "últimas 24h" desliza com o relógio: só revalida com start/end fixos.
+    if "start" in request.query_params and "end" in request.query_params:
+        cached = not_modified(request, ROLLUP_TABLE)
+        if cached is not None:
+            return cached
+        response.headers.update(validator_headers(ROLLUP_TABLE))
+
+    sql = (
+        f"SELECT `bucket_start`, `count`, `sum`, `min`, `max`, `last`, `last_at` FROM `{ROLLUP_TABLE}` "
+        "WHERE `topic` = %s AND `field` = %s AND `resolution` = %s AND `bucket_start` BETWEEN %s AND %s "
+        "ORDER BY `bucket_start` LIMIT %s"
+    )
+    # O início do balde é múltiplo da resolução: alinha `start` para incluir o balde que o contém.
+    params = (topic, field, resolution, int(start // resolution) * resolution, int(end), limit)
+    rows = await query_cache.get_or_load(ROLLUP_TABLE, params, lambda: execute_async(sql=sql, params=params)) or []
+
+    points = [
+        {
+            "bucket_start": row["bucket_start"],
+            "count": row["count"],
+            "avg": row["sum"] / row["count"] if row["count"] else None,
+            "min": row["min"],
+            "max": row["max"],
+            "last": row["last"],
+            "last_at": row["last_at"],
+        }
+        for row in rows
+    ]
+    return {"topic": topic, "field": field, "resolution": resolution, "start": start, "end": end, "data": points}
@@ -1,22 +1,71 @@
 # FLUXO E A LÓGICA:
 # 1. Recebe 'table_name' e 'item_id' da URL.
 # 2. Chama `validate_body` (Dependência CRÍTICA) para obter `data_dict` (dados seguros e limpos).
-# 3. Constrói a Query SQL UPDATE dinâmica (SET {coluna} = %s).
+# 3. Obtém o UPDATE pré-montado do cache de comandos (SET `coluna` = %s) para as colunas de `data_dict`.
 # 4. A tupla de valores (`values`) é construída com os dados de `data_dict` + `item_id` (para o WHERE).
-# 5. Chama `execute` (DAO).
+# 5. Chama `execute_async` (DAO assíncrono, não bloqueia o event loop).
 # 6. Retorna 404 se o ID não for encontrado ou se o UPDATE não alterar nenhuma linha.
+# 7. A variante `/update/{table_name}/bulk` valida o lote em uma passada (`validate_bulk_update_body`) e aplica todos os
+#    UPDATEs em UMA transação/conexão, reportando o resultado de cada item.
 # A razão de existir: Fornecer um endpoint PUT genérico, seguro e capaz de fazer atualizações parciais (PATCH-like).
 
 from fastapi import APIRouter, HTTPException, Path, Depends, Body 
 from typing import Dict, Any
-from utils.function_execute import execute # Importa a função DAO para acesso ao DB.
-from utils.dependencies import validate_body # Importa a dependência de validação (CRÍTICA).
+from utils.function_execute import execute_async, transaction_async # Importa as funções DAO para acesso ao DB.
+from model.statement_cache import statements # Cache de SQL por (tabela, colunas).
+from utils.query_cache import query_cache # Invalida o cache de leitura após escritas.
+from model.table_registry import table_registry, OP_UPDATE # Tabelas expostas e suas PKs.
+from utils.dependencies import validate_body, validate_bulk_update_body, BulkValidation # Importa as dependências de validação (CRÍTICA).
 # from fastapi_limiter.depends import RateLimiter # Importa o limitador de taxa (Camada de Segurança).
 import logging
 
 # Variável 'router' (Escopo Global/Módulo).
 router = APIRouter()
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__) # Logger do módulo (configurado em utils/logging_config.py).
+
+# Rota de atualização em lote. Declarada ANTES de /{item_id}: caso contrário "bulk" seria lido como ID.
+@router.put("/update/{table_name}/bulk", tags=["Generic Data Management"])
+async def update_bulk_data(
+    table_name: str = Path(..., description="Nome da tabela para atualização."),
+    # Corpo: JSON array (ou NDJSON) de objetos com a chave primária da tabela + campos a atualizar.
+    batch: BulkValidation = Depends(validate_bulk_update_body)
+):
+    """Atualiza vários itens em uma única transação, com resultado por item (até `BULK_UPDATE_MAX_ITEMS`; acima disso, 413)."""
+
+    pk_column = table_registry.require(table_name, OP_UPDATE).pk
+    results = [{"index": error["index"], "status": "invalid", "errors": error["errors"]} for error in batch.errors]
+    updated = 0
+
+    try:
+        if batch.valid:
+            # O driver executa UPDATEs de executemany um a um de qualquer forma; o laço explícito na mesma
+            # transação/conexão custa o mesmo e devolve o rowcount de cada item.
+            async with transaction_async() as cursor:
+                for index, data_dict in batch.valid:
+                    item_id = data_dict.pop(pk_column)
+                    columns = tuple(data_dict.keys())
+                    if not columns:
+                        results.append({"index": index, "status": "invalid", "errors": ["Nenhum campo para atualizar."]})
+                        continue
+                    statement = statements.update(table_name, columns, pk_column)
+                    await cursor.execute(statement.sql, (*data_dict.values(), item_id))
+                    if cursor.rowcount:
+                        updated += 1
+                        results.append({"index": index, "id": item_id, "status": "updated"})
+                    else:
+                        results.append({"index": index, "id": item_id, "status": "not_found_or_unchanged"})
+            if updated:
+                query_cache.invalidate(table_name)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Erro inesperado na rota PUT bulk: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor.")
+
+    results.sort(key=lambda result: result["index"])
+    return {"message": f"Lote processado na tabela '{table_name}'.", "total": batch.total,
+            "updated": updated, "invalid": sum(1 for result in results if result["status"] == "invalid"),
+            "results": results}
 
 @router.put("/update/{table_name}/{item_id}", tags=["Generic Data Management"],
             #dependencies=[Depends(RateLimiter(times=5, seconds=30))]
@@ -40,23 +89,20 @@ async def update_data(
         # Deve ser validado pelo Pydantic/validate_body, mas é uma verificação defensiva.
         raise HTTPException(status_code=400, detail="Corpo da requisição não pode ser vazio.")
     
-    # 1. Construção Dinâmica da Query SQL de UPDATE
-    # Cria a parte "coluna = %s" para cada campo presente em data_dict.
-    set_clauses = [f"{column} = %s" for column in data_dict.keys()]
-    sql_set = ", ".join(set_clauses)
+    # 1. Comando do cache: "UPDATE `tabela` SET `coluna` = %s ... WHERE `pk` = %s" (PK do registro de tabelas).
+    statement = statements.update(table_name, tuple(data_dict.keys()), table_registry.require(table_name, OP_UPDATE).pk)
     
     # Tupla de valores para o SQL: valores dos campos + ID do item (para o WHERE).
-    values = tuple(list(data_dict.values()) + [item_id])
+    values = (*data_dict.values(), item_id)
 
     try:
-        # CORREÇÃO CRÍTICA: Adiciona aspas graves (`) ao redor do nome da tabela e da coluna de ID.
-        sql = f"UPDATE `{table_name}` SET {sql_set} WHERE `{table_name}_id` = %s"
-        rows_affected = execute(sql=sql, params=values) # Envia para a camada DAO.
+        rows_affected = await execute_async(sql=statement.sql, params=values, kind=statement.kind) # Envia para a camada DAO.
         
         # 2. Verificação de Resultado
         if not rows_affected:
             # Retorna 404 se o ID não existe ou se não houve alteração.
             raise HTTPException(status_code=404, detail=f"Item com ID {item_id} não encontrado ou não houve alteração.")
+        query_cache.invalidate(table_name)
 
         return {"message": f"Item com ID {item_id} atualizado com sucesso na tabela '{table_name}'.", 
                 "rows_affected": rows_affected}
@@ -64,5 +110,5 @@ async def update_data(
     except HTTPException as e:
         raise e
     except Exception as e:
-        logging.error(f"Erro inesperado na rota PUT: {e}")
+        logger.error(f"Erro inesperado na rota PUT: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor.")
\ No newline at end of file
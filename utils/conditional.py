@@ -0,0 +1,73 @@
+# app/utils/conditional.py
+
+# FLUXO E A LÓGICA:
+# 1. Cada tabela tem uma versão em memória (`query_cache.version()`), avançada por toda escrita que passa pela API
+#    ou pela ingestão MQTT (as mesmas chamadas a `query_cache.invalidate()`).
+# 2. `not_modified()` compara `If-None-Match` (ETag) ou `If-Modified-Since` com a versão atual e devolve uma resposta
+#    304 pronta, ANTES de qualquer acesso ao MySQL ou ao cache.
+# 3. `validator_headers()` gera `ETag`, `Last-Modified` e `Cache-Control: no-cache` para as respostas 200.
+# 4. O ETag inclui um identificador do processo: versões de processos diferentes (workers, restart) nunca se confundem.
+#    Com vários processos (`WEB_CONCURRENCY` > 1, ou `MQTT_COORDINATION` leader/shared, em que a ingestão grava por
+#    outro processo), uma escrita em um processo não avança a versão dos outros: `ETAG_MAX_STALENESS` limita por
+#    quanto tempo um 304 pode ser servido. Vazio = automático: 0 (só a versão local) com um único processo e
+#    `_MULTI_PROCESS_STALENESS` segundos com vários. `If-Modified-Since` só vale com 0.
+# RAZÃO DE EXISTIR: Dashboards fazem poll da mesma consulta; sem mudança, a resposta é um 304 vazio.
+
+import os
+import time
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from fastapi import Request, Response
+
+from utils.query_cache import query_cache
+
+load_dotenv()
+
+_MULTI_PROCESS_STALENESS = 5.0
+# A versão em memória só vê as escritas deste processo.
+_MULTI_PROCESS = (int(os.getenv("WEB_CONCURRENCY", 1)) > 1
+                  or os.getenv("MQTT_COORDINATION", "none").lower() != "none")
+ETAG_MAX_STALENESS = float(os.getenv("ETAG_MAX_STALENESS") or (_MULTI_PROCESS_STALENESS if _MULTI_PROCESS else 0))
+
+BOOT_ID = uuid.uuid4().hex[:8]
+
+
+def table_etag(table: str) -> str:
+    generation, _ = query_cache.version(table)
+    window = f"-{int(time.time() // ETAG_MAX_STALENESS)}" if ETAG_MAX_STALENESS > 0 else ""
+    return f'W/"{table}-{BOOT_ID}-{generation}{window}"'
+
+
+def validator_headers(table: str) -> Dict[str, str]:
+    """ETag/Last-Modified da versão atual da tabela. `no-cache`: o cliente sempre revalida (barato: 304)."""
+    _, modified_at = query_cache.version(table)
+    return {
+        "ETag": table_etag(table),
+        "Last-Modified": formatdate(modified_at, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+
+def not_modified(request: Request, table: str) -> Optional[Response]:
+    """Resposta 304 se a cópia do cliente ainda vale; None se é preciso consultar."""
+    headers = validator_headers(table)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match tem precedência sobre If-Modified-Since (RFC 9110); comparação fraca.
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or headers["ETag"].removeprefix("W/") in tags:
+            return Response(status_code=304, headers=headers)
+        return None
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and ETAG_MAX_STALENESS <= 0:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return None
+        _, modified_at = query_cache.version(table)
+        if int(modified_at) <= since: # Last-Modified tem resolução de segundos.
+            return Response(status_code=304, headers=headers)
+    return None
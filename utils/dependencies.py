@@ -3,20 +3,35 @@
 # FLUXO E A LÓGICA:
 # 1. **`validate_data_core`** faz a validação Pydantic de dados brutos (chamada pelo MQTT).
 # 2. **`validate_body`** é a dependência HTTP que usa `validate_data_core` e é injetada nas rotas POST/PUT.
+# 3. **`validate_bulk_core`** valida um LOTE inteiro em uma passada com `TypeAdapter(list[Model])`, reportando erros por item.
+# 4. **`validate_bulk_body`** / **`validate_bulk_update_body`** são as dependências HTTP das rotas `/bulk` (JSON array ou NDJSON).
+#    O lote inteiro vira UMA transação: acima de `BULK_INSERT_MAX_ITEMS` / `BULK_UPDATE_MAX_ITEMS` itens a requisição é
+#    recusada com 413 (locks e memória limitados; divida lotes maiores em várias requisições).
 # RAZÃO DE EXISTIR: Camada de Validação Centralizada e reutilizável.
 
-from fastapi import HTTPException, Path, Body 
-from pydantic import BaseModel, ValidationError, HttpUrl 
-from typing import Dict, Any 
-from model.model_resolver import get_model_for_table 
+from fastapi import HTTPException, Path, Body, Request
+from pydantic import BaseModel, ValidationError, HttpUrl, TypeAdapter
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple, Type
+from functools import lru_cache
+from model.table_registry import table_registry # Modelo e PK de cada tabela (resolvidos no startup).
 import json
 import logging
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__) # Logger do módulo (configurado em utils/logging_config.py).
+
+# Itens por requisição nas rotas /bulk (mesmo limite da exclusão em lote, `BULK_DELETE_MAX_IDS`).
+BULK_INSERT_MAX_ITEMS = 10000
+BULK_UPDATE_MAX_ITEMS = 10000
 
 
 # --- FUNÇÃO CORE DE VALIDAÇÃO (Reutilizável pelo MQTT) ---
 
+def _to_db_dict(validated_data: BaseModel) -> Dict[str, Any]:
+    """Converte um modelo validado no dicionário gravado no DB (sem campos None, HttpUrl como str)."""
+    data_dict = validated_data.model_dump(exclude_none=True)
+    # Conversão de Tipos Complexos (HttpUrl para str)
+    return {key: str(value) if isinstance(value, HttpUrl) else value for key, value in data_dict.items()}
+
 def validate_data_core(table_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Função de validação core que pode ser chamada diretamente por serviços NÃO-HTTP (como MQTT).
@@ -24,21 +39,14 @@ def validate_data_core(table_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
     """
     try:
         # 1. Resolução do Modelo
-        model = get_model_for_table(table_name)
+        model = table_registry.model_for(table_name)
     except ValueError as e:
         raise ValueError(f"Tabela '{table_name}' não mapeada. Detalhe: {e}")
 
     # 2. Validação Pydantic
     try:
         validated_data = model.model_validate(data) 
-        data_dict = validated_data.model_dump(exclude_none=True)
-        
-        # 3. Conversão de Tipos Complexos (HttpUrl para str)
-        converted_data_dict = {}
-        for key, value in data_dict.items():
-            converted_data_dict[key] = str(value) if isinstance(value, HttpUrl) else value
-            
-        return converted_data_dict
+        return _to_db_dict(validated_data)
             
     except ValidationError as e:
         # Lança o erro de validação (para ser capturado pelo chamador)
@@ -71,4 +79,114 @@ async def validate_body(
         error_detail = json.loads(e.json()) 
         raise HTTPException(status_code=422, detail=f"Erro de validação de dados: {error_detail}")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro interno de validação: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Erro interno de validação: {e}")
+
+
+# --- VALIDAÇÃO EM LOTE (rotas /bulk) ---
+
+class BulkValidation(NamedTuple):
+    """Resultado da validação de um lote: itens válidos (índice, dados) e erros por item."""
+    valid: List[Tuple[int, Dict[str, Any]]]
+    errors: List[Dict[str, Any]]
+    total: int
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """TypeAdapter(list[Model]) construído uma vez por modelo (a compilação do schema é cara)."""
+    return TypeAdapter(List[model])
+
+
+def validate_bulk_core(table_name: str, items: List[Any], id_column: Optional[str] = None) -> BulkValidation:
+    """
+    Valida um lote em UMA passada com `TypeAdapter(list[Model])`.
+    Se `id_column` for informado (atualização em lote), cada item precisa trazê-lo como inteiro; ele é
+    separado do corpo antes da validação e devolvido junto dos dados validados.
+    """
+    model = table_registry.model_for(table_name) # ValueError se a tabela não estiver mapeada.
+
+    errors: List[Dict[str, Any]] = []
+    candidates: List[Tuple[int, Any]] = []
+    for index, item in enumerate(items):
+        if id_column is not None:
+            if not isinstance(item, dict) or not isinstance(item.get(id_column), int):
+                errors.append({"index": index, "errors": [f"Campo '{id_column}' (inteiro) é obrigatório."]})
+                continue
+            item = {key: value for key, value in item.items() if key != id_column}
+        candidates.append((index, item))
+
+    adapter = _list_adapter(model)
+    payloads = [item for _, item in candidates]
+    try:
+        validated = adapter.validate_python(payloads)
+    except ValidationError as e:
+        # O primeiro elemento de `loc` é a posição na lista: agrupa os erros por item.
+        failed: Dict[int, List[Any]] = {}
+        for error in e.errors(include_url=False):
+            failed.setdefault(error["loc"][0], []).append({"loc": error["loc"][1:], "msg": error["msg"]})
+        errors.extend({"index": candidates[position][0], "errors": item_errors} for position, item_errors in failed.items())
+        candidates = [candidate for position, candidate in enumerate(candidates) if position not in failed]
+        # Segunda (e última) passada apenas com os itens que não falharam.
+        validated = adapter.validate_python([item for _, item in candidates])
+
+    valid = []
+    for (index, _), model_instance in zip(candidates, validated):
+        data_dict = _to_db_dict(model_instance)
+        if id_column is not None:
+            data_dict[id_column] = items[index][id_column]
+        valid.append((index, data_dict))
+
+    errors.sort(key=lambda error: error["index"])
+    return BulkValidation(valid=valid, errors=errors, total=len(items))
+
+
+def _too_many_items(max_items: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Lote acima de {max_items} itens: divida-o em várias requisições.")
+
+
+async def _read_bulk_items(request: Request, max_items: int) -> List[Any]:
+    """Lê o corpo como JSON array ou, com Content-Type NDJSON, como um objeto JSON por linha (até `max_items`)."""
+    body = await request.body()
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            lines = [line for line in body.splitlines() if line.strip()]
+            if len(lines) > max_items: # Recusa antes de decodificar.
+                raise _too_many_items(max_items)
+            return [json.loads(line) for line in lines]
+        items = json.loads(body)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Corpo inválido: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="O corpo de uma operação em lote deve ser um array JSON ou NDJSON.")
+    if len(items) > max_items:
+        raise _too_many_items(max_items)
+    return items
+
+
+async def _validate_bulk_request(request: Request, table_name: str, id_column: Optional[str], max_items: int) -> BulkValidation:
+    items = await _read_bulk_items(request, max_items)
+    if not items:
+        raise HTTPException(status_code=400, detail="O lote está vazio.")
+    try:
+        return validate_bulk_core(table_name, items, id_column=id_column)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def validate_bulk_body(
+    request: Request,
+    table_name: str = Path(..., description="Nome da tabela de destino.")
+) -> BulkValidation:
+    """Dependência HTTP das inserções em lote."""
+    return await _validate_bulk_request(request, table_name, id_column=None, max_items=BULK_INSERT_MAX_ITEMS)
+
+
+async def validate_bulk_update_body(
+    request: Request,
+    table_name: str = Path(..., description="Nome da tabela de destino.")
+) -> BulkValidation:
+    """Dependência HTTP das atualizações em lote: cada item traz a chave primária da tabela (registro de tabelas)."""
+    info = table_registry.get(table_name)
+    if info is None:
+        raise HTTPException(status_code=400, detail=f"A tabela '{table_name}' não é válida para esta operação.")
+    return await _validate_bulk_request(request, table_name, id_column=info.pk, max_items=BULK_UPDATE_MAX_ITEMS)
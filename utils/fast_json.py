@@ -0,0 +1,33 @@
+# app/utils/fast_json.py
+
+# FLUXO E A LÓGICA:
+# 1. Usa `orjson` quando está instalado (parser/serializador em Rust, várias vezes mais rápido) e cai para o `json`
+#    da biblioteca padrão quando não está. `orjson` é opcional: nada muda no comportamento além da velocidade.
+# 2. `loads()` aceita str ou bytes; erros de sintaxe levantam `json.JSONDecodeError` nos dois casos
+#    (o `orjson.JSONDecodeError` é subclasse dele).
+# 3. `dumps()` sempre devolve str (pronta para uma coluna de texto ou uma linha NDJSON).
+# RAZÃO DE EXISTIR: O parse/serialização de JSON é o maior custo de CPU por mensagem na ingestão MQTT.
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError: # Dependência opcional.
+    orjson = None
+
+HAS_ORJSON = orjson is not None
+
+
+def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """Decodifica um documento JSON (str ou bytes UTF-8)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(value: Any) -> str:
+    """Serializa para JSON compacto. Tipos não nativos (datetime, Decimal, ...) viram str."""
+    if orjson is not None:
+        return orjson.dumps(value, default=str).decode("utf-8")
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
@@ -1,31 +1,159 @@
 # FLUXO E A LÓGICA:
-# 1. Inicializa o objeto de conexão com o banco de dados (Database).
+# 1. Inicializa o objeto de conexão com o banco de dados (Database), que mantém o pool de conexões.
 # 2. A função 'execute' encapsula a execução SQL.
-# 3. 'execute' realiza a conexão, chama o método do DB, e desconecta.
-# 4. Trata erros do DB, transformando-os em HTTPException 500 DETALHADO.
+# 3. 'execute' empresta uma conexão do pool, chama o método do DB e devolve a conexão (sem novo handshake por comando).
+#    'execute_statement' recebe um comando do cache (statement_cache.py) e o executa como prepared statement.
+# 4. 'execute_many' faz o mesmo para lotes: vários conjuntos de parâmetros em uma única transação.
+#    'execute_batches' grava vários comandos (um por tabela/colunas do lote MQTT) numa mesma transação.
+# 5. 'execute_async'/'execute_many_async' são as versões não bloqueantes usadas pelas rotas `async def` (pool aiomysql).
+# 6. 'transaction_async' entrega um cursor dentro de uma única transação (rotas de operações em lote).
+# 7. 'stream_async' entrega SELECTs grandes em blocos via cursor server-side (exportação em streaming).
+# 8. Trata erros do DB, transformando-os em HTTPException 500 DETALHADO (503 se o pool estiver esgotado).
 
-from fastapi import HTTPException 
-from model.db import Database 
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+from model.db import Database, PoolTimeoutError
+from model.async_db import AsyncDatabase
+from model.statement_cache import CompiledStatement
+from utils.metrics import register_gauge
+
+logger = logging.getLogger(__name__)
 
 # Inicializa o objeto de banco de dados globalmente
 db = Database()
+# Acesso assíncrono para as rotas HTTP (o `db` síncrono fica para as threads do MQTT)
+async_db = AsyncDatabase()
+
+def _pool_samples():
+    """Conexões livres/em uso de cada pool (lido apenas no scrape de /metrics)."""
+    for pool_name, stats in (("sync", db.pool_stats()), ("async", async_db.pool_stats())):
+        if stats:
+            yield {"pool": pool_name, "state": "idle"}, stats["idle"]
+            yield {"pool": pool_name, "state": "in_use"}, stats["in_use"]
+
+register_gauge("db_pool_connections", "Conexões dos pools do MySQL por estado.", _pool_samples)
+
+def _raise_db_error(e: Exception):
+    """Traduz um erro de acesso ao banco para HTTPException (503 para pool esgotado, 500 para o resto)."""
+    if isinstance(e, (PoolTimeoutError, asyncio.TimeoutError)):
+        logger.warning(f"SQL ERRO 503: {e}")
+        # Todas as conexões ocupadas: o cliente pode tentar novamente.
+        raise HTTPException(status_code=503, detail=f"Banco de dados ocupado: {e or 'tempo de espera por conexão esgotado'}") from e
+
+    # --- BLOCO CRÍTICO PARA DEBUG: REVELA O ERRO ---
+    detail_message = f"Erro no banco de dados: {type(e).__name__}: {e}"
+    logger.error(f"SQL ERRO 500: {detail_message}") # Registra o erro (saída estruturada via logging_config)
+
+    # Lança erro HTTP 500 para o FastAPI com a mensagem detalhada do MySQL
+    # `from e`: quem chama fora do HTTP (ingestão MQTT) ainda consegue ver o erro original em `__cause__`.
+    raise HTTPException(status_code=500, detail=detail_message) from e
+
+def execute(sql: str, params: tuple = None):
+    """
+    Executa um comando SQL usando uma conexão emprestada do pool (Database).
+    """
+    try:
+        # A conexão é devolvida ao pool ao sair do bloco, mesmo em caso de erro.
+        with db.borrow() as connection:
+            return db.execute_comand(sql, params, connection=connection)
+    except Exception as e:
+        _raise_db_error(e)
+
+def execute_statement(statement: CompiledStatement, params: tuple = None):
+    """
+    Executa um comando pré-montado do cache como prepared statement reutilizado na conexão do pool.
+    """
+    try:
+        with db.borrow() as connection:
+            return db.execute_prepared(statement, params, connection=connection)
+    except Exception as e:
+        _raise_db_error(e)
+
+def execute_many(sql: str, params_seq: list):
+    """
+    Executa o mesmo comando SQL para cada tupla de `params_seq` em uma única transação (INSERT multi-linha).
+    """
+    try:
+        with db.borrow() as connection:
+            return db.execute_many(sql, params_seq, connection=connection)
+    except Exception as e:
+        _raise_db_error(e)
+
+def execute_batches(batches: list):
+    """
+    Executa cada `(sql, params_seq)` de `batches` em uma ÚNICA transação: uma falha desfaz todos.
+    """
+    try:
+        with db.borrow() as connection:
+            return db.execute_batches(batches, connection=connection)
+    except Exception as e:
+        _raise_db_error(e)
+
+async def execute_async(sql: str, params: tuple = None, kind: str = None):
+    """
+    Versão assíncrona de `execute`: não bloqueia o event loop enquanto espera o MySQL.
+    `kind` vem de um `CompiledStatement` e evita re-analisar o SQL.
+    """
+    try:
+        return await async_db.execute_comand(sql, params, kind=kind)
+    except Exception as e:
+        _raise_db_error(e)
+
+async def execute_many_async(sql: str, params_seq: list):
+    """
+    Versão assíncrona de `execute_many`: um lote de parâmetros em uma única transação.
+    """
+    try:
+        return await async_db.execute_many(sql, params_seq)
+    except Exception as e:
+        _raise_db_error(e)
 
-def execute(sql: str, params: tuple = None): 
+async def execute_batches_async(batches: list):
     """
-    Executa um comando SQL usando a conexão do banco (Database).
+    Versão assíncrona de `execute_batches`: todos os comandos confirmados juntos (ou nenhum).
     """
     try:
-        db.connect() # Tentará a conexão, e levantará o erro de conexão se falhar (graças à correção em db.py).
-        result = db.execute_comand(sql, params) 
-        db.disconnect() 
-        return result 
+        return await async_db.execute_batches(batches)
     except Exception as e:
-        # Garante que a conexão seja sempre fechada, mesmo em caso de erro
-        db.disconnect() 
-        
-        # --- BLOCO CRÍTICO PARA DEBUG: REVELA O ERRO ---
-        detail_message = f"Erro no banco de dados: {type(e).__name__}: {e}"
-        print(f"DEBUG SQL ERRO 500: {detail_message}") # Imprime o erro no seu console/terminal
-        
-        # Lança erro HTTP 500 para o FastAPI com a mensagem detalhada do MySQL
-        raise HTTPException(status_code=500, detail=detail_message)
\ No newline at end of file
+        _raise_db_error(e)
+
+@asynccontextmanager
+async def transaction_async():
+    """
+    Transação assíncrona: todos os comandos executados no cursor entregue são confirmados juntos (ou nenhum).
+    """
+    try:
+        async with async_db.transaction() as cursor:
+            yield cursor
+    except HTTPException:
+        raise
+    except Exception as e:
+        _raise_db_error(e)
+
+async def stream_async(sql: str, params: tuple = None, chunk_size: int = 1000):
+    """
+    Retorna um iterador assíncrono de blocos de linhas (cursor server-side).
+    O primeiro bloco é lido aqui, antes da resposta começar: erros de conexão/SQL ainda viram HTTPException.
+    """
+    chunks = async_db.stream(sql, params, chunk_size)
+    first = None
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        pass
+    except Exception as e:
+        await chunks.aclose()
+        _raise_db_error(e)
+
+    async def _all_chunks():
+        try:
+            if first:
+                yield first
+                async for chunk in chunks:
+                    yield chunk
+        finally:
+            await chunks.aclose()
+
+    return _all_chunks()
@@ -0,0 +1,164 @@
+# app/utils/logging_config.py
+
+# FLUXO E A LÓGICA:
+# 1. `setup_logging()` é chamado uma única vez no startup (app/main.py) e substitui os `logging.basicConfig` espalhados.
+# 2. Os módulos registram em `logging.getLogger(__name__)`; o root só tem um `QueueHandler` (não bloqueante):
+#    a thread que loga apenas enfileira o registro, e uma `QueueListener` em thread própria formata e escreve no stdout.
+# 3. Com a fila cheia (stdout lento), o registro é descartado e contado, em vez de travar o paho ou o event loop.
+# 4. A saída é JSON (uma linha por evento, com os campos de `extra=`) ou texto, conforme `LOG_FORMAT`.
+# 5. `LOG_LEVELS` define níveis por logger (ex.: `model.get_data_camila=WARNING,uvicorn.access=WARNING`).
+# 6. `LogSampler` decide, antes de montar a mensagem, se um payload do caminho de ingestão deve ser logado
+#    (1 a cada N mensagens e no máximo M por segundo).
+# RAZÃO DE EXISTIR: Sob alta taxa de mensagens, formatar e escrever logs de forma síncrona virava o gargalo.
+
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower() # json | text
+LOG_LEVELS = os.getenv("LOG_LEVELS", "") # logger=NIVEL,logger=NIVEL
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+LOG_PAYLOAD_SAMPLE_EVERY = int(os.getenv("LOG_PAYLOAD_SAMPLE_EVERY", 1000))
+LOG_PAYLOAD_MAX_PER_SECOND = float(os.getenv("LOG_PAYLOAD_MAX_PER_SECOND", 5))
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+
+# Atributos padrão de um LogRecord: o que não estiver aqui veio de `extra=` e vai para o JSON.
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro: ts, level, logger, msg, campos de `extra=` e a exceção (se houver)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler com fila limitada: quando cheia, descarta o registro e conta, sem bloquear quem loga."""
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Só resolve `msg % args` e o traceback (que referenciam objetos vivos); a formatação final fica na listener.
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogSampler:
+    """Amostragem de logs do caminho quente: deixa passar 1 a cada `every` chamadas, até `max_per_second` por segundo."""
+
+    def __init__(self, every: int = 1000, max_per_second: float = 5.0) -> None:
+        self.every = max(every, 1)
+        self.max_per_second = max_per_second
+        self._calls = itertools.count()
+        self._window = 0
+        self._in_window = 0
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def allow(self) -> bool:
+        # `next()` em itertools.count é atômico no CPython: o caso comum (amostra recusada) não pega lock.
+        if next(self._calls) % self.every:
+            self.suppressed += 1
+            return False
+        with self._lock:
+            window = int(time.monotonic())
+            if window != self._window:
+                self._window, self._in_window = window, 0
+            if self._in_window >= self.max_per_second:
+                self.suppressed += 1
+                return False
+            self._in_window += 1
+            return True
+
+
+# Estado do setup (Escopo de Módulo).
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels: Dict[str, str] = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging() -> None:
+    """Configura o root logger com a fila não bloqueante. Chamadas repetidas não duplicam handlers."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+
+    _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, output, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(LOG_LEVEL)
+    for name, level in _parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Esvazia a fila e para a thread de escrita (desligamento da aplicação)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats() -> Dict[str, Any]:
+    """Profundidade da fila de logs e registros descartados por fila cheia."""
+    if _queue_handler is None:
+        return {"queue_depth": 0, "dropped": 0}
+    return {"queue_depth": _queue_handler.queue.qsize(), "dropped": _queue_handler.dropped}
@@ -0,0 +1,205 @@
+# app/utils/metrics.py
+
+# FLUXO E A LÓGICA:
+# 1. Define métricas no estilo Prometheus (Counter, Gauge, Histogram) com rótulos, sem dependências externas.
+# 2. As métricas da aplicação são declaradas aqui (ingestão MQTT por estágio, DB por tipo de comando, rotas HTTP, pools/filas).
+# 3. `REGISTRY.render()` gera o formato texto do Prometheus, servido pela rota `/metrics`.
+# 4. Com `METRICS_ENABLED=false`, `observe`/`inc`/`set` retornam na primeira linha (custo de um teste booleano).
+# RAZÃO DE EXISTIR: Saber se a lentidão da ingestão está no decode, na validação, na conexão ou no INSERT.
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Buckets padrão (segundos): de 100µs a 10s, cobrindo decode/validação (µs) e queries/lotes (ms–s).
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[Dict[str, str], float]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Contador monotônico."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, *labelvalues: str) -> None:
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in items]
+
+
+class Gauge(_Metric):
+    """Valor instantâneo. Com `callback`, o valor é lido só no momento do scrape (sem custo no caminho quente)."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Iterable[Sample]]] = None, kind: str = "gauge") -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self.callback = callback
+        self.kind = kind # Um callback pode expor contadores já mantidos por outro componente.
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def render(self) -> List[str]:
+        if self.callback is not None:
+            try:
+                samples = list(self.callback())
+            except Exception:
+                samples = []
+            lines = [f"{self.name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}"
+                     for labels, value in samples]
+            return self.header() + lines if lines else []
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in items]
+
+
+class Histogram(_Metric):
+    """Histograma cumulativo de buckets fixos (formato Prometheus)."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por conjunto de rótulos: [contagens por bucket (+Inf no fim)], soma, total.
+        self._series: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        if not METRICS_ENABLED:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labelvalues: str) -> Iterator[None]:
+        """Cronometra o bloco `with` e observa a duração em segundos."""
+        if not METRICS_ENABLED:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labelvalues)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(series[0]), series[1], series[2]) for labels, series in self._series.items()]
+        lines = self.header()
+        for labels, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = ("le", _format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    """Conjunto de métricas exportadas em `/metrics`."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- Métricas da aplicação ---
+
+# Ingestão MQTT por estágio: receive (callback do paho inteiro), decode (JSON), queue (espera na fila),
+# validate (Pydantic do lote), persist (escrita do lote no DB).
+MQTT_STAGE_SECONDS = REGISTRY.register(Histogram(
+    "mqtt_ingest_stage_seconds", "Duração de cada estágio da ingestão MQTT.", ("stage",)))
+MQTT_MESSAGES_TOTAL = REGISTRY.register(Counter(
+    "mqtt_ingest_messages_total", "Mensagens MQTT por resultado.", ("outcome",)))
+
+# Banco de dados.
+DB_CONNECT_SECONDS = REGISTRY.register(Histogram(
+    "db_connect_seconds", "Tempo para abrir uma conexão física com o MySQL (handshake + autenticação).", ("pool",)))
+DB_QUERY_SECONDS = REGISTRY.register(Histogram(
+    "db_query_seconds", "Duração dos comandos SQL por tipo.", ("pool", "kind")))
+
+# HTTP.
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Latência das rotas HTTP.", ("method", "route", "status")))
+
+
+def register_gauge(name: str, documentation: str, callback: Callable[[], Iterable[Sample]], kind: str = "gauge") -> Gauge:
+    """Gauge lido no scrape (pools, filas, cache). `kind="counter"` para contadores mantidos por outro componente."""
+    return REGISTRY.register(Gauge(name, documentation, callback=callback, kind=kind))
@@ -0,0 +1,203 @@
+# app/utils/query_cache.py
+
+# FLUXO E A LÓGICA:
+# 1. `QueryCache.get_or_load()` é um cache read-through: a chave é (tabela, geração da tabela, parâmetros da consulta).
+# 2. Em um "miss", a consulta ao DB roda uma única vez e o resultado é guardado com TTL.
+# 3. Toda escrita (rotas POST/PUT/DELETE e ingestão MQTT) chama `invalidate(table)`: a geração da tabela avança e as
+#    entradas antigas deixam de ser alcançáveis (e são removidas do backend em memória).
+# 4. O armazenamento é plugável (`CacheBackend`): em memória com LRU + limite de entradas por padrão, ou desativado.
+# 5. `stats()` expõe hits, misses, evicções, expirações e invalidações para ajuste de TTL/tamanho.
+# 6. A geração é também a VERSÃO da tabela: `version()` devolve (geração, instante da última escrita), usados nos
+#    ETag/Last-Modified das rotas GET (`utils/conditional.py`).
+# RAZÃO DE EXISTIR: Dashboards consultam a mesma página a cada poucos segundos; sem cache, cada consulta vai ao MySQL.
+
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from utils.metrics import register_gauge
+
+load_dotenv()
+
+QUERY_CACHE_BACKEND = os.getenv("QUERY_CACHE_BACKEND", "memory") # memory | none
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", 5))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", 256))
+
+_MISSING = object()
+
+CacheKey = Tuple[str, int, Hashable] # (tabela, geração, parâmetros)
+
+
+class CacheBackend(ABC):
+    """Interface do armazenamento do cache. Implementações precisam ser thread-safe (o MQTT invalida a partir de threads)."""
+
+    @abstractmethod
+    def get(self, key: CacheKey) -> Any:
+        """Retorna o valor ou `_MISSING`."""
+
+    @abstractmethod
+    def set(self, key: CacheKey, value: Any, ttl: float) -> None:
+        ...
+
+    def drop_table(self, table: str) -> int:
+        """Remove as entradas de uma tabela (opcional: a mudança de geração já as torna inalcançáveis)."""
+        return 0
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class NullBackend(CacheBackend):
+    """Cache desativado: toda consulta é um miss."""
+
+    def get(self, key: CacheKey) -> Any:
+        return _MISSING
+
+    def set(self, key: CacheKey, value: Any, ttl: float) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+class InMemoryLRUBackend(CacheBackend):
+    """Cache em processo: OrderedDict em ordem LRU, TTL por entrada e limite de entradas."""
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: CacheKey) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                return _MISSING
+            self._entries.move_to_end(key) # Marca como usada recentemente.
+            return value
+
+    def set(self, key: CacheKey, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False) # Remove a menos usada recentemente.
+                self.evictions += 1
+
+    def drop_table(self, table: str) -> int:
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == table]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "evictions": self.evictions, "expirations": self.expirations}
+
+
+class QueryCache:
+    """Fachada do cache: gerações por tabela (invalidação O(1)), contadores e backend plugável."""
+
+    def __init__(self, backend: CacheBackend, ttl: float = 5.0) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self._generations: Dict[str, int] = {}
+        self._modified_at: Dict[str, float] = {} # Epoch da última escrita por tabela (Last-Modified).
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def set_backend(self, backend: CacheBackend) -> None:
+        """Troca o armazenamento (ex.: um backend compartilhado entre processos)."""
+        self.backend = backend
+
+    def generation(self, table: str) -> int:
+        return self._generations.get(table, 0)
+
+    def version(self, table: str) -> Tuple[int, float]:
+        """(geração, epoch da última escrita). Sem escrita neste processo, o instante do startup."""
+        return self._generations.get(table, 0), self._modified_at.get(table, self.started_at)
+
+    async def get_or_load(self, table: str, params: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Retorna o valor em cache ou executa `loader()` e guarda o resultado."""
+        # A geração é lida ANTES da consulta: se uma escrita acontecer durante o `loader`, o resultado
+        # fica guardado sob a geração antiga e nunca é servido.
+        generation = self.generation(table)
+        key = (table, generation, params)
+        value = self.backend.get(key)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = await loader()
+        self.backend.set(key, value, self.ttl)
+        return value
+
+    def invalidate(self, table: str) -> None:
+        """Chamado após qualquer escrita na tabela."""
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            self._modified_at[table] = time.time()
+            self.invalidations += 1
+        self.backend.drop_table(table)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            **self.backend.stats(),
+        }
+
+
+def _backend_from_env() -> CacheBackend:
+    if QUERY_CACHE_BACKEND == "none":
+        return NullBackend()
+    if QUERY_CACHE_BACKEND == "memory":
+        return InMemoryLRUBackend(max_entries=QUERY_CACHE_MAX_ENTRIES)
+    raise ValueError(f"QUERY_CACHE_BACKEND inválido: '{QUERY_CACHE_BACKEND}'. Use 'memory' ou 'none'.")
+
+
+# Instância global (Escopo de Módulo), compartilhada pelas rotas e pela ingestão MQTT.
+query_cache = QueryCache(_backend_from_env(), ttl=QUERY_CACHE_TTL)
+
+
+def _cache_samples():
+    stats = query_cache.stats()
+    for event in ("hits", "misses", "invalidations", "evictions", "expirations"):
+        if event in stats:
+            yield {"event": event}, stats[event]
+
+
+register_gauge("query_cache_events_total", "Contadores do cache de leitura das rotas GET.", _cache_samples, kind="counter")
@@ -7,10 +7,12 @@
 
 from typing import Dict, Any
 from fastapi import HTTPException
-from utils.function_execute import execute # Importa a função DAO
+from utils.function_execute import execute_statement # Importa a função DAO (prepared statements)
+from model.statement_cache import statements # Cache de SQL por (tabela, colunas)
+from utils.query_cache import query_cache # Invalida o cache de leitura após escritas
 import logging
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__) # Logger do módulo (configurado em utils/logging_config.py).
 
 def insert_data_core(table_name: str, data_to_insert: Dict[str, Any]) -> int:
     """
@@ -18,21 +20,20 @@ def insert_data_core(table_name: str, data_to_insert: Dict[str, Any]) -> int:
     Retorna o ID do novo item ou levanta uma exceção HTTPException.
     """
     
-    # 1. Construção e Execução SQL
-    columns = ", ".join(data_to_insert.keys()) 
-    placeholders = ", ".join(["%s"] * len(data_to_insert)) 
+    # 1. Comando do cache e Execução SQL
+    statement = statements.insert(table_name, tuple(data_to_insert.keys()))
     values = tuple(data_to_insert.values())
     
     try:
-        # SQL para INSERT seguro
-        sql = f"INSERT INTO `{table_name}` ({columns}) VALUES ({placeholders})"
-        new_id = execute(sql=sql, params=values) 
+        # INSERT seguro, executado como prepared statement na conexão do pool
+        new_id = execute_statement(statement, params=values) 
         
         if not new_id:
             # Erro 500 se o DB não retornar o ID (falha interna)
             raise HTTPException(status_code=500, detail=f"Não foi possível inserir os dados na tabela '{table_name}'.")
 
-        logging.info(f"Dados inseridos em '{table_name}'. Novo ID: {new_id}")
+        query_cache.invalidate(table_name)
+        logger.info(f"Dados inseridos em '{table_name}'. Novo ID: {new_id}")
         return new_id
     
     except HTTPException as e:
@@ -40,5 +41,5 @@ def insert_data_core(table_name: str, data_to_insert: Dict[str, Any]) -> int:
         raise e
     except Exception as e:
         # Captura erros inesperados e os transforma em erro HTTP 500
-        logging.error(f"Erro inesperado no DB durante inserção em '{table_name}': {e}")
+        logger.error(f"Erro inesperado no DB durante inserção em '{table_name}': {e}")
         raise HTTPException(status_code=500, detail=f"Falha na inserção: {type(e).__name__}: {e}")
\ No newline at end of file